@@ -0,0 +1,45 @@
+import glob
+import matplotlib.pyplot as plt
+
+import sys
+sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
+from rfnoc_ofdm.calibration import calibrate_threshold, capture_noise_floor, metric_capture_noise_floor, simulate_noise_floor
+from rfnoc_ofdm.plotting import plot_noise_floor
+
+# Signal parameters (must match the frames of create_tx.py)
+K = 1024                # Number of subcarriers
+CP = 128                # Length of the cyclic prefix
+M = 4                   # Oversampling factor
+pfas = [1e-4, 1e-5, 1e-6]   # Target false alarm rates (fraction of the noise-only samples above the threshold)
+
+# Noise-only data: raw captures received without transmission (rx_to_file --datapath raw), metric
+# captures of the FPGA (rx_to_file --datapath schmidl_cox --sc_output_select 1), or simulated noise
+# when no capture is found
+raw_captures = sorted(glob.glob("../data/noise.raw/*_raw*.fc32.dat"))
+raw_format = "fc32"
+metric_captures = sorted(glob.glob("../data/noise.raw/*.metricLSB.int32.dat"))
+simulated_samples = 1 << 26
+
+
+# Stream the noise-only data through the metric
+if metric_captures:
+    statistics = metric_capture_noise_floor(metric_captures, window=CP * M)
+elif raw_captures:
+    statistics = capture_noise_floor(raw_captures, raw_format, K=K, CP=CP, M=M)
+else:
+    statistics = simulate_noise_floor(simulated_samples, K=K, CP=CP, M=M, seed=0)
+
+print(f"Noise-only samples: {statistics.n_samples}")
+print(f"Normalized metric: mean {statistics.mean:.3e}, std {statistics.std:.3e}, max {statistics.max:.3e}")
+
+calibrations = [calibrate_threshold(statistics, pfa, window=CP * M) for pfa in pfas if pfa * statistics.n_samples >= 1]
+for calibration in calibrations:
+    register = f" => {calibration.option} (0x{calibration.register:08X})" if calibration.from_register else ""
+    print(f"Pfa {calibration.pfa:g}: threshold {calibration.threshold:.4e}{register}"
+          + ("" if calibration.exact else " (interpolated)"))
+if not statistics.from_register:
+    print("Warning: no metric capture found, the FPGA register does not follow the scale of the normalized "
+          "metric (see rfnoc_ofdm.calibration), capture the metric (.metricLSB.int32) to calibrate --sc_threshold")
+
+plot_noise_floor(statistics, calibrations)
+plt.show()
@@ -21,7 +21,7 @@ threshold = 10485760    # Threshold for the Schmidl-Cox algorithm => found by te
 
 # Create the signal
 ofdm_signal = ofdmFrame(K=K, CP=CP, M=M, N=N, preamble_mod=preamble_mod, payload_mod=payload_mod, Nt=Nt, Nf=Nf, random_seed=random_seed)
-filename = ofdm_signal.save_tsymbols_txt(auto_filename=True)
+filename = ofdm_signal.save_tsymbols_bin(auto_filename=True)
 
 # Print useful information necessary to run the receiver `rx_to_file` program
 print(f"Signal parameters:")
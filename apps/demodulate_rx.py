@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 
 import sys
 sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
+from rfnoc_ofdm.cache import StageCache, get_frame_params
 from rfnoc_ofdm.ofdm_frame import ofdmFrame
 from rfnoc_ofdm.plotting import plot_constellation
 
@@ -19,13 +20,32 @@ Nf = 1                  # Frequency domain pilot spacing
 random_seed = 42        # Random seed for reproducibility => THIS MUST BE THE SAME AS IN THE `create_tx.py` FILE!
 
 filename = "../data/mean_all.all/rx_samples_schmidl_cox_fft.signal.fc32.dat"  # File to load the received signal
-    
+cache_dir = None        # Directory to cache the received symbols and channel estimate in (e.g. "../data/.cache"), None to disable
+subcarrier_idx_to_skip = 2  # Position of the K subcarriers in the output of the hardware FFT (see `reshape_after_hardware_fft`)
+
 # Create the signal
 ofdm_signal = ofdmFrame(K=K, CP=CP, M=M, N=N, preamble_mod=preamble_mod, payload_mod=payload_mod, Nt=Nt, Nf=Nf, random_seed=random_seed)
-ofdm_signal.load_tysmbol_bin(filename, type="fc32")
-ofdm_signal.reshape_after_hardware_fft()
-# ofdm_signal.demodulate_frame()
-ofdm_signal.estimate_channel()
+
+def demodulate():
+    ofdm_signal.load_tysmbol_bin(filename, type="fc32")
+    ofdm_signal.reshape_after_hardware_fft(subcarrier_idx_to_skip)
+    # ofdm_signal.demodulate_frame()
+    return ofdm_signal.fsymbols_payload_rx
+
+def estimate_channel():
+    ofdm_signal.estimate_channel()
+    return ofdm_signal.H_interp
+
+if cache_dir is None:
+    demodulate()
+    estimate_channel()
+else:
+    # Load the results of a previous run on the same capture (memory mapped) instead of recomputing them
+    cache = StageCache(cache_dir)
+    params = get_frame_params(ofdm_signal)
+    ofdm_signal.fsymbols_payload_rx, key = cache.run_stage(filename, "fsymbols_payload_rx", demodulate, params,
+                                                           subcarrier_idx_to_skip=subcarrier_idx_to_skip)
+    ofdm_signal.H_interp, _ = cache.run_stage(filename, "H_interp", estimate_channel, params, parent=key)
 ofdm_signal.equalize()
 plot_constellation(ofdm_signal)
 plt.savefig("../data/mean_all.all/constellation_rx_samples_schmidl_cox_fft.signal.fc32.pdf")
@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import sys
 sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
 from rfnoc_ofdm.plotting import colors, use_latex, long
+from rfnoc_ofdm.capture import get_num_samples, read_detection_trailer, read_samples
 
 
 # filename = "../data/mean_all.all/rx_samples_schmidl_cox.signal_detected_idx.sc16.dat"
@@ -25,36 +26,17 @@ def load_tsymbols_txt(filename: str) -> np.ndarray:
     rx_sig = np.squeeze(rx_sig)
     return rx_sig
     
-def load_tysmbol_bin(filename: str, type: str="fc32") -> np.ndarray:
-    """
-    Load a file containing a I/Q signal. The file has the same format as
-    the save function.        
-    """
-    with open(filename, "rb") as file:
-        if type == "fc32":
-            data = np.fromfile(file, dtype=np.float32)
-        elif type == "sc16":
-            data = np.fromfile(file, dtype=np.int16)
-        data = data.astype(np.complex64)
-            
-        rx_sig = data[0::2] + 1j * data[1::2]
-        rx_sig.reshape(-1, 1)
-        rx_sig = np.squeeze(rx_sig)
-    return rx_sig
-
 def print_last_sample_as_uint32(filename: str) -> tuple:
     """
     Print the last sample of the received signal as uint32 (sc16 format => 2x uint16).
     """
-    with open(filename, "rb") as file:
-        data = np.fromfile(file, dtype=np.uint16)
-        detected_point = data[-2] * 2**16 + data[-1]
-        start_forwaring = detected_point + (K // 2) * M - (CP // 2) * M
-        samples_forwarded = (len(data) / 2) - start_forwaring
-        
-        print(f"Last sample as uint32, metric maximum: {detected_point} (composed of {hex(data[-2])} and {hex(data[-1])})")
-        print(f"Start forwarding index: {start_forwaring}")
-        print(f"Samples forwarded: {samples_forwarded}")
+    detected_point = read_detection_trailer(filename)  # Only the last sample is read
+    start_forwaring = detected_point + (K // 2) * M - (CP // 2) * M
+    samples_forwarded = get_num_samples(filename, "sc16") - start_forwaring
+    
+    print(f"Last sample as uint32, metric maximum: {detected_point} (composed of {hex(detected_point >> 16)} and {hex(detected_point & 0xFFFF)})")
+    print(f"Start forwarding index: {start_forwaring}")
+    print(f"Samples forwarded: {samples_forwarded}")
     return detected_point, start_forwaring, samples_forwarded
 
 def plot_received_signal(rx_sig: np.ndarray) -> None:
@@ -78,10 +60,7 @@ def plot_received_signal(rx_sig: np.ndarray) -> None:
 
 signal = None
 if is_binary:
-    if format == "fc32":
-        signal = load_tysmbol_bin(filename, type="fc32")
-    elif format == "sc16":
-        signal = load_tysmbol_bin(filename, type="sc16")
+    signal = read_samples(filename, format)
 else:
     signal = load_tsymbols_txt(filename)
 
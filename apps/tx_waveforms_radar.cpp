@@ -31,9 +31,16 @@
 #include <iostream>
 #include <csignal>
 #include <fstream>
+#include <complex>
+#include <cstring>
 
 namespace po = boost::program_options;
 
+//binary waveform files written by rfnoc_ofdm.waveform (ofdmFrame.save_tsymbols_bin)
+static const char WAVEFORM_MAGIC[] = "RFNOCWAV";
+static const size_t WAVEFORM_MAGIC_SIZE = 8;
+static const size_t WAVEFORM_HEADER_SIZE = 128;
+
 /***********************************************************************
  * Signal handlers
  **********************************************************************/
@@ -55,7 +62,7 @@ int UHD_SAFE_MAIN(int argc, char *argv[]){
     po::options_description desc("Allowed options");
     desc.add_options()
         ("help", "help message")
-        ("file", po::value<std::string>(&file)->default_value("custom_wave.txt"), "name of the file to read binary samples from")
+        ("file", po::value<std::string>(&file)->default_value("custom_wave.txt"), "name of the waveform file (binary waveform or text, one I/Q value per line)")
         ("sig_len", po::value<uint64_t>(&sig_len)->default_value(4), "total number of samples in one period")
         ("args", po::value<std::string>(&args)->default_value(""), "single uhd device address args")
         ("spb", po::value<uint64_t>(&spb)->default_value(0), "samples per buffer, 0 for default")
@@ -83,8 +90,6 @@ int UHD_SAFE_MAIN(int argc, char *argv[]){
         return ~0;
     }
 
-    std::vector<double> real_wave_samples(sig_len); 	//real samples will be loaded here
-    std::vector<double> imag_wave_samples(sig_len);     //imaginary samples will be loaded here
     std::vector<std::complex<float> > wave_samples(sig_len); //complex samples as combination of real_wave and imag_wave
 
     //create a usrp device
@@ -237,9 +242,56 @@ int UHD_SAFE_MAIN(int argc, char *argv[]){
     //send data until the signal handler gets called
     //or if we accumulate the number of samples specified (unless it's 0)
     uint64_t num_acc_samps = 0;
-    std::ifstream infile(file, std::ifstream::in);
-	if(infile.is_open()){
-		//std::cout << "opened" << std::endl;
+    std::ifstream infile(file, std::ifstream::in | std::ifstream::binary);
+	if(not infile.is_open())
+		throw std::runtime_error("could not open the file...");
+
+	char magic[WAVEFORM_MAGIC_SIZE] = {0};
+	infile.read(magic, WAVEFORM_MAGIC_SIZE);
+	if(infile.gcount() == WAVEFORM_MAGIC_SIZE and std::memcmp(magic, WAVEFORM_MAGIC, WAVEFORM_MAGIC_SIZE) == 0){
+		//binary waveform file (see rfnoc_ofdm/waveform.py): header + interleaved I/Q, one bulk read
+		char header[WAVEFORM_HEADER_SIZE];
+		std::memcpy(header, magic, WAVEFORM_MAGIC_SIZE);
+		infile.read(header + WAVEFORM_MAGIC_SIZE, WAVEFORM_HEADER_SIZE - WAVEFORM_MAGIC_SIZE);
+		if(infile.gcount() != WAVEFORM_HEADER_SIZE - WAVEFORM_MAGIC_SIZE)
+			throw std::runtime_error("truncated waveform header...");
+
+		uint16_t version, format;
+		uint64_t num_samps;
+		std::memcpy(&version, header + 8, sizeof(version));
+		std::memcpy(&format, header + 10, sizeof(format));
+		std::memcpy(&num_samps, header + 16, sizeof(num_samps));
+		if(version != 1 or format > 1)
+			throw std::runtime_error("unsupported waveform file...");
+		if(num_samps != sig_len){
+			std::cout << boost::format("Using the signal length of the waveform file: %u samples (--sig_len %u)") % num_samps % sig_len << std::endl;
+			sig_len = num_samps;
+			wave_samples.resize(sig_len);
+		}
+
+		if(format == 0){ //fc32: read directly into the complex samples
+			infile.read(reinterpret_cast<char *>(wave_samples.data()), sig_len * sizeof(std::complex<float>));
+		}
+		else{ //sc16: read the int16 pairs, scaled back to [-1, 1]
+			std::vector<std::complex<int16_t> > sc16_samples(sig_len);
+			infile.read(reinterpret_cast<char *>(sc16_samples.data()), sig_len * sizeof(std::complex<int16_t>));
+			for (size_t i = 0; i < sig_len; i++){
+				wave_samples[i] = std::complex<float>(sc16_samples[i].real(), sc16_samples[i].imag()) / 32767.0f;
+			}
+		}
+		if(static_cast<uint64_t>(infile.gcount()) != sig_len * (format == 0 ? sizeof(std::complex<float>) : sizeof(std::complex<int16_t>)))
+			throw std::runtime_error("truncated waveform file...");
+		infile.close();
+		for (size_t i = 0; i < sig_len; i++){
+			wave_samples[i] *= ampl;
+		}
+	}
+	else{
+		//text file: one I or Q value per line
+		infile.close();
+		infile.open(file, std::ifstream::in);
+		std::vector<double> real_wave_samples(sig_len); 	//real samples will be loaded here
+		std::vector<double> imag_wave_samples(sig_len);     //imaginary samples will be loaded here
 		std::string tempString;
 		int lenCounter = 0, imCounter = 0, reCounter = 0;
 		std::string::size_type size;
@@ -259,8 +311,6 @@ int UHD_SAFE_MAIN(int argc, char *argv[]){
 			wave_samples[i] = std::complex<float>(ampl*real_wave_samples[i], ampl*imag_wave_samples[i]);
 		}
 	}
-	else
-        	throw std::runtime_error("could not open the file...");
 
     //fill the buffer with the waveform
     for (size_t n = 0; n < buff.size(); n++){
@@ -1,11 +1,12 @@
-from tqdm import tqdm
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
 import sys
 sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
 from rfnoc_ofdm.ofdm_frame import ofdmFrame
+from rfnoc_ofdm.experiments import sweep_ber_snr
+from rfnoc_ofdm.pipeline import ReceiverPipeline
+from rfnoc_ofdm.impairments import ImpairmentPipeline, TimingOffset, CarrierFrequencyOffset, PhaseNoise, IQImbalance, Quantizer
 from rfnoc_ofdm.plotting import plot_frame_matrix, plot_frame_waveform, plot_constellation, plot_ber_vs_snr, plot_range_doppler_map
 
 
@@ -23,7 +24,7 @@ plt.savefig("frame_waveform.pdf", bbox_inches="tight")
 
 # Save the time domain symbols to a file
 ofdm_frame = ofdmFrame(K=1024, CP=128, M=1, N=3, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1, random_seed=0)
-ofdm_frame.save_tsymbols_txt(auto_filename=True)
+ofdm_frame.save_tsymbols_bin(auto_filename=True)
 
 
 # Save the time domain symbols to a file
@@ -46,6 +47,19 @@ ber = ofdm_frame.compute_ber()
 print(f"BER: {ber}")
 
 
+# Add front-end impairments (timing and frequency offsets, phase noise, IQ imbalance, sc16 quantization)
+ofdm_frame = ofdmFrame(K=1024, CP=128, M=1, N=3, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1, random_seed=0)
+ofdm_frame.add_noise(20)
+impairments = ImpairmentPipeline([TimingOffset(0.3), CarrierFrequencyOffset(0.01 / ofdm_frame.K), PhaseNoise(1e-5),
+                                  IQImbalance(0.2, 1), Quantizer(full_scale=4 * np.std(ofdm_frame.tsymbols))], seed=0)
+ofdm_frame.tsymbols_rx = impairments.apply(ofdm_frame.tsymbols_rx)
+ofdm_frame.demodulate_frame(remove_first_symbol=True)
+ofdm_frame.estimate_channel()
+ofdm_frame.equalize()
+plot_constellation(ofdm_frame, view_title=False)
+plt.savefig("constellation_impairments.pdf", bbox_inches="tight")
+
+
 # Plot the range-Doppler map
 ofdm_frame = ofdmFrame(K=1024, CP=128, M=5, N=256, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1, random_seed=42)
 ofdm_frame.add_paths([1, 0.8, 0.4, 0.2], [0, 2, 4, 6], 10) # gain, delay, snr
@@ -56,25 +70,38 @@ ofdm_frame.delay_doppler()
 plot_range_doppler_map(ofdm_frame, view_title=False, bandwidth=1)
 plt.savefig("range_doppler_map.pdf", bbox_inches="tight")
 
+
+# Plot the range-Doppler map of point targets (delay and Doppler shift in bins of the map). The pilots are on
+# every symbol (Nt=1): with Nt pilot symbols spacing, only the Doppler shifts within +-N / (2 * Nt) bins are resolved
+ofdm_frame = ofdmFrame(K=1024, CP=128, M=5, N=256, preamble_mod="BPSK", payload_mod="QPSK", Nt=1, Nf=1, random_seed=42)
+ofdm_frame.add_targets([10, 40.5, 80], [-20, 5, 60.3], [1, 0.5, 0.25], 10) # delay, Doppler, gain, snr
+ofdm_frame.demodulate_frame(remove_first_symbol=True)
+ofdm_frame.estimate_channel()
+ofdm_frame.delay_doppler()
+print(ofdm_frame.detect_targets()[:3])
+plot_range_doppler_map(ofdm_frame, view_title=False, bandwidth=1)
+plt.savefig("range_doppler_map_targets.pdf", bbox_inches="tight")
+
+# Process many received frames with a receiver pipeline (buffers allocated once, reused by every frame)
+reference = ofdmFrame(K=1024, CP=128, M=4, N=16, preamble_mod="BPSK", payload_mod="QPSK", Nt=4, Nf=1, random_seed=42)
+pipeline = ReceiverPipeline(reference, sync="schmidl", threshold=0.3, delay_doppler=True)
+received = []
+for snr in [5, 10, 15, 20]:
+    ofdm_frame = ofdmFrame(K=1024, CP=128, M=4, N=16, preamble_mod="BPSK", payload_mod="QPSK", Nt=4, Nf=1, random_seed=42)
+    ofdm_frame.add_paths([1, 0.5], [0, 3], snr) # gain, delay, snr
+    received.append(np.concatenate([np.zeros(2000), ofdm_frame.tsymbols_rx]))
+print(pipeline.process_all(received))
+
          
 # Plot the BER vs SNR curve for each payload modulation scheme
+# Each SNR point stops after 100 errors or 2e6 bits (8 BPSK or 4 QPSK frames of 256k or 512k bits, within the
+# n_exp frames budget), the frames are reused across the SNRs. The error bars are the 95% confidence intervals
 snrs = np.arange(-10, 20, 2)
 mods = ["BPSK", "QPSK"]
 n_exp = 20
-random_seeds = np.arange(n_exp)
-results_list = []
-
-for mod in mods:
-    for snr in tqdm(snrs, desc=f"Modulation: {mod}"):
-        for i in range(n_exp):
-            ofdm_frame = ofdmFrame(K=1024, CP=0, M=1, N=250, preamble_mod="BPSK", payload_mod=mod, Nt=250, Nf=1024, random_seed=random_seeds[i])
-            ofdm_frame.add_noise(snr)
-            ofdm_frame.demodulate_frame(remove_first_symbol=True, CP_rx=False)
-            ofdm_frame.estimate_channel()
-            ofdm_frame.equalize()
-            ber = ofdm_frame.compute_ber()
-            results_list.append({"SNR": snr, "Modulation": mod, "BER": ber})
-
-ber_results = pd.DataFrame(results_list)
+frame_params = {"K": 1024, "CP": 0, "M": 1, "N": 250, "preamble_mod": "BPSK", "Nt": 250, "Nf": 1024}
+ber_results = sweep_ber_snr(snrs, mods, n_frames=n_exp, frame_params=frame_params, max_errors=100, max_bits=2e6,
+                            demodulation={"remove_first_symbol": True, "CP_rx": False})
+print(ber_results)
 plot_ber_vs_snr(ber_results, view_title=False, params={"K": 1024, "CP": 0, "M": 1, "N": 250, "Nt": 250, "Nf": 1024})
 plt.savefig("ber_vs_snr.pdf", bbox_inches="tight")
@@ -0,0 +1,261 @@
+import numpy as np
+from scipy.stats import beta, norm
+
+from .pilots import PilotLayout
+from .utils import inverse_mapping
+
+
+# Target working set of one row block (received symbols, channel and decided bits)
+BLOCK_BYTES = 256 * 1024
+
+# Number of packed bytes XORed at once when counting errors on long bit streams
+PACKED_CHUNK_BYTES = 1024 * 1024
+
+# Number of ones in each byte value, used when `np.bitwise_count` is not available (numpy < 2.0)
+_POPCOUNT_LUT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+##################
+# Packed bit ops #
+##################
+
+def popcount(packed: np.ndarray) -> np.ndarray:
+    """
+    Number of bits set in each byte of a uint8 array.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(packed)
+    return _POPCOUNT_LUT[packed]
+
+
+def count_bit_errors_packed(packed_a: np.ndarray, packed_b: np.ndarray) -> int:
+    """
+    Count the differing bits between two packed bit streams (see `np.packbits`).
+    The streams are XORed by chunks so that long Monte Carlo streams do not create full-size temporaries.
+    """
+    packed_a = np.ravel(packed_a)
+    packed_b = np.ravel(packed_b)
+    if packed_a.shape != packed_b.shape:
+        raise ValueError(f"Packed streams have different lengths: {packed_a.shape[0]} and {packed_b.shape[0]}")
+    
+    n_errors = 0
+    for start in range(0, len(packed_a), PACKED_CHUNK_BYTES):
+        stop = start + PACKED_CHUNK_BYTES
+        diff = np.bitwise_xor(packed_a[start:stop], packed_b[start:stop])
+        n_errors += int(np.sum(popcount(diff), dtype=np.int64))
+    return n_errors
+
+
+def count_bit_errors(bits_a: np.ndarray, bits_b: np.ndarray) -> int:
+    """
+    Count the differing bits between two bit streams (arrays of zeros and ones).
+    Both streams are packed 8 bits per byte and compared with XOR + popcount.
+    """
+    bits_a = np.ravel(bits_a)
+    bits_b = np.ravel(bits_b)
+    if bits_a.shape != bits_b.shape:
+        raise ValueError(f"Bit streams have different lengths: {bits_a.shape[0]} and {bits_b.shape[0]}")
+    return count_bit_errors_packed(np.packbits(bits_a), np.packbits(bits_b))
+
+
+def pack_fsymbol_bits(bits: np.ndarray, K: int) -> np.ndarray:
+    """
+    Pack the bits of each resource element in a single byte (MSB first, as `np.packbits`).
+    
+    Parameters:
+    - bits: Bits of the payload, e.g. `ofdmFrame.bits_payload`    [N x K * bits_per_fsymbol]
+    - K: Number of subcarriers
+    
+    Returns:
+    - packed: One byte per resource element                         [N x K]
+    """
+    bits = np.asarray(bits)
+    bits = bits.reshape(bits.shape[:-1] + (K, -1))
+    if bits.shape[-1] > 8:
+        raise ValueError("At most 8 bits per frequency domain symbol can be packed")
+    return np.packbits(bits, axis=-1)[..., 0]
+
+
+###############
+# BER kernels #
+###############
+
+def get_block_rows(K: int, block_bytes: int = BLOCK_BYTES) -> int:
+    """
+    Number of OFDM symbols (rows of the grid) processed at once so that a block fits in cache.
+    """
+    return max(1, block_bytes // (K * np.dtype(np.complex128).itemsize))
+
+
+def count_errors(fsymbols_rx: np.ndarray, bits_ref_packed: np.ndarray, layout: PilotLayout, mod: str,
+                 bits_per_fsymbol: int, H: np.ndarray = None, block_rows: int = None, error_map: bool = False
+    ) -> tuple[int, int, np.ndarray]:
+    """
+    Fused equalization -> hard decision -> error counting on the data symbols of a payload grid.
+    The grid is processed by blocks of OFDM symbols so that no full (N x K) intermediate is built.
+
+    Parameters:
+    - fsymbols_rx: Received frequency domain symbols                       [N x K]
+    - bits_ref_packed: Reference (transmitted) bits, packed per resource element with
+                       `pack_fsymbol_bits` (e.g. `ofdmFrame.bits_payload_packed`)  [N x K]
+    - layout: Pilot layout of the frame (pilots are not counted)
+    - mod: Payload modulation scheme                                        [BPSK, QPSK, 16QAM, 16PSK]
+    - bits_per_fsymbol: Number of bits per frequency domain symbol for `mod`
+    - H: Channel estimation to equalize with, None if already equalized     [N x K]
+    - block_rows: Number of OFDM symbols per block (default: cache-sized, see `get_block_rows`)
+    - error_map: Also return the number of bit errors per resource element
+
+    Returns:
+    - n_errors: Number of bit errors on the data symbols
+    - n_bits: Number of data bits compared
+    - error_map: Bit errors per resource element (0 on pilots), None if not requested  [N x K]
+    """
+    N, K = layout.N, layout.K
+    if fsymbols_rx.shape != (N, K):
+        raise ValueError(f"Invalid received symbols shape: expected {(N, K)}, got {fsymbols_rx.shape}")
+    if bits_ref_packed.shape != (N, K):
+        raise ValueError(f"Invalid packed reference shape: expected {(N, K)}, got {bits_ref_packed.shape}")
+    if block_rows is None:
+        block_rows = get_block_rows(K)
+
+    n_errors = 0
+    errors = np.zeros((N, K), dtype=np.uint8) if error_map else None
+    for start in range(0, N, block_rows):
+        stop = min(start + block_rows, N)
+        block = fsymbols_rx[start:stop]
+        if H is not None:
+            block = block / H[start:stop]
+
+        # Hard decision, packed per resource element and compared with the reference bits (XOR + popcount)
+        bits_rx = inverse_mapping(block.ravel(), mod).astype(np.uint8)
+        packed_rx = np.packbits(bits_rx.reshape(stop - start, K, bits_per_fsymbol), axis=-1)[..., 0]
+        block_errors = popcount(np.bitwise_xor(packed_rx, bits_ref_packed[start:stop]))
+        block_errors[layout.pilot_mask[start:stop]] = 0
+
+        n_errors += int(np.sum(block_errors, dtype=np.int64))
+        if error_map:
+            errors[start:stop] = block_errors
+
+    n_bits = layout.n_data * bits_per_fsymbol
+    return n_errors, n_bits, errors
+
+
+###################
+# BER accumulator #
+###################
+
+class BerAccumulator:
+    """
+    Streaming BER estimate: error and bit counts are accumulated frame after frame, and the
+    accumulator reports the BER with a confidence interval and whether the stopping rule is met.
+    
+    Stopping rule: stop once `max_errors` errors or `max_bits` bits have been accumulated, or once
+    the relative width of the confidence interval is below `rel_width` (if given), but never before
+    `min_bits` bits have been accumulated.
+    """
+    
+    _methods = ("wilson", "clopper-pearson")
+    
+    def __init__(self, max_errors: int = 100, max_bits: float = 1e7, min_bits: float = 0,
+                 rel_width: float = None, confidence: float = 0.95, method: str = "wilson"
+        ) -> None:
+        """
+        Initialize a BerAccumulator.
+        
+        Parameters:
+        - max_errors: Stop after this number of errors                      [# of errors] >= 1
+        - max_bits: Stop after this number of bits                          [# of bits] >= 1
+        - min_bits: Never stop before this number of bits                   [# of bits] >= 0
+        - rel_width: Stop when (high - low) / BER is below this value       [float] or None
+        - confidence: Confidence level of the interval                      ]0, 1[
+        - method: Confidence interval                                       [wilson, clopper-pearson]
+        """
+        if max_errors < 1 or max_bits < 1 or min_bits < 0 or not 0 < confidence < 1:
+            raise ValueError("Invalid BER accumulator parameters")
+        if method not in self._methods:
+            raise ValueError(f"Invalid confidence interval method: {method}")
+        
+        self.max_errors = max_errors
+        self.max_bits = max_bits
+        self.min_bits = min_bits
+        self.rel_width = rel_width
+        self.confidence = confidence
+        self.method = method
+        
+        self.n_errors = 0
+        self.n_bits = 0
+        self.n_updates = 0
+        
+    def update(self, n_errors: int, n_bits: int) -> bool:
+        """
+        Accumulate the errors and bits of a new frame (or batch of frames).
+        
+        Returns:
+        - done: True if the stopping rule is met
+        """
+        if n_errors < 0 or n_bits < n_errors:
+            raise ValueError(f"Invalid counts: {n_errors} errors for {n_bits} bits")
+        self.n_errors += int(n_errors)
+        self.n_bits += int(n_bits)
+        self.n_updates += 1
+        return self.done
+    
+    @property
+    def ber(self) -> float:
+        """
+        Current BER estimate (NaN if no bit has been accumulated).
+        """
+        return self.n_errors / self.n_bits if self.n_bits > 0 else np.nan
+    
+    def interval(self, confidence: float = None, method: str = None) -> tuple[float, float]:
+        """
+        Confidence interval of the BER.
+        
+        Parameters:
+        - confidence: Confidence level (default: the one of the accumulator)
+        - method: wilson (score interval) or clopper-pearson (exact, conservative)
+        
+        Returns:
+        - low, high: Bounds of the interval (NaN if no bit has been accumulated)
+        """
+        confidence = self.confidence if confidence is None else confidence
+        method = self.method if method is None else method
+        k, n = self.n_errors, self.n_bits
+        if n == 0:
+            return np.nan, np.nan
+        alpha = 1 - confidence
+        
+        if method == "wilson":
+            z = norm.ppf(1 - alpha / 2)
+            p = k / n
+            denominator = 1 + z**2 / n
+            center = (p + z**2 / (2 * n)) / denominator
+            half_width = z / denominator * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2))
+            return float(max(0.0, center - half_width)), float(min(1.0, center + half_width))
+        elif method == "clopper-pearson":
+            low = beta.ppf(alpha / 2, k, n - k + 1) if k > 0 else 0.0
+            high = beta.ppf(1 - alpha / 2, k + 1, n - k) if k < n else 1.0
+            return float(low), float(high)
+        raise ValueError(f"Invalid confidence interval method: {method}")
+    
+    @property
+    def done(self) -> bool:
+        """
+        True if the stopping rule is met.
+        """
+        if self.n_bits < self.min_bits:
+            return False
+        if self.n_errors >= self.max_errors or self.n_bits >= self.max_bits:
+            return True
+        if self.rel_width is not None and self.n_errors > 0:
+            low, high = self.interval()
+            return (high - low) / self.ber <= self.rel_width
+        return False
+    
+    def result(self) -> dict:
+        """
+        Summary of the accumulated statistics, e.g. to build a results DataFrame.
+        """
+        low, high = self.interval()
+        return {"BER": self.ber, "BER low": low, "BER high": high,
+                "Errors": self.n_errors, "Bits": self.n_bits, "Frames": self.n_updates}
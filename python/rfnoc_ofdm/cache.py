@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+"""
+Note: Opt-in disk cache of the results of the receiver stages (synchronization index, received symbols,
+      channel estimate, range-Doppler map, ...), shared by the scripts processing the same captures.
+      Each result is a .npy file named after its stage and a key: the hash of the full capture content,
+      the frame parameters, the stage options and the key of the stage it was computed from, so a result
+      is recomputed whenever anything it depends on changes. The content hash of a capture is computed
+      once and stored in the cache directory (a .hash file keyed on its path, size and modification time).
+
+      The cached results are loaded as read-only memory maps (copy them before modifying them in place).
+      The cache is limited in size: the least recently used results are evicted first (the modification
+      time of a file is its last use, so several processes can share a cache directory).
+"""
+
+# Default size limit of a cache directory
+CACHE_MAX_BYTES = 4 << 30
+
+# Number of bytes read at once to hash a capture
+CAPTURE_HASH_BLOCK_BYTES = 1 << 24
+
+# Attributes of an ofdmFrame the results of the receiver stages depend on
+FRAME_PARAMETERS = ("K", "CP", "M", "N", "preamble_mod", "payload_mod", "Nt", "Nf", "random_seed")
+
+
+def get_frame_params(ofdm_frame) -> dict:
+    """
+    Parameters of a frame identifying its transmitted symbols (part of the cache keys).
+    """
+    return {name: getattr(ofdm_frame, name) for name in FRAME_PARAMETERS}
+
+
+class StageCache:
+    """
+    Disk cache of the results of the receiver stages (see the note of the module).
+
+    Example:
+        cache = StageCache("../data/.cache")
+        params = get_frame_params(ofdm_frame)
+        ofdm_frame.fsymbols_payload_rx, key = cache.run_stage(path, "fsymbols_payload_rx", demodulate, params, sync_idx=sync_idx)
+        ofdm_frame.H_interp, _ = cache.run_stage(path, "H_interp", estimate_channel, params, parent=key)
+    """
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_MAX_BYTES, mmap: bool = True) -> None:
+        """
+        Initialize a StageCache.
+
+        Parameters:
+        - directory: Cache directory (created if needed)
+        - max_bytes: Size limit of the cache                    [bytes]
+        - mmap: Load the cached results as read-only memory maps (in memory otherwise)
+        """
+        if max_bytes < 0:
+            raise ValueError(f"Invalid cache size limit: {max_bytes}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        self._capture_hashes = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npy")
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".npy") and entry.is_file()]
+
+    @property
+    def size(self) -> int:
+        """
+        Size of the cached results                              [bytes]
+        """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def capture_hash(self, capture) -> str:
+        """
+        Hash of the full content of a capture file or of an array of samples. The hash of a file is
+        computed once per (path, size, modification time) and stored in the cache directory.
+        """
+        if isinstance(capture, np.ndarray):
+            return hashlib.blake2b(np.ascontiguousarray(capture).view(np.uint8), digest_size=16).hexdigest()
+        with open(capture, "rb") as file:
+            stat = os.fstat(file.fileno())
+            memo = f"{os.path.abspath(capture)}:{stat.st_size}:{stat.st_mtime_ns}"
+            if memo in self._capture_hashes:
+                return self._capture_hashes[memo]
+            memo_path = os.path.join(self.directory, hashlib.blake2b(memo.encode(), digest_size=16).hexdigest() + ".hash")
+            try:
+                with open(memo_path) as memo_file:
+                    content_hash = memo_file.read()
+            except FileNotFoundError:
+                digest = hashlib.blake2b(stat.st_size.to_bytes(8, "little"), digest_size=16)
+                for block in iter(lambda: file.read(CAPTURE_HASH_BLOCK_BYTES), b""):
+                    digest.update(block)
+                content_hash = digest.hexdigest()
+                tmp_path = f"{memo_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as memo_file:
+                    memo_file.write(content_hash)
+                os.replace(tmp_path, memo_path)
+        self._capture_hashes[memo] = content_hash
+        return content_hash
+
+    def get_key(self, capture, stage: str, frame_params: dict = None, parent: str = None, **options) -> str:
+        """
+        Key of the result of a stage.
+
+        Parameters:
+        - capture: Capture file or array of received samples
+        - stage: Name of the stage, e.g. "sync_idx", "fsymbols_payload_rx", "H_interp", "range_doppler_map"
+        - frame_params: Parameters of the frame (see `get_frame_params`)
+        - parent: Key of the result the stage is computed from (e.g. the demodulation for the channel estimate)
+        - options: Options of the stage (JSON serializable, or converted to str)
+
+        Returns:
+        - key: "<stage>-<hash>"
+        """
+        description = {"capture": self.capture_hash(capture), "frame": frame_params or {}, "parent": parent,
+                       "options": options}
+        digest = hashlib.blake2b(json.dumps(description, sort_keys=True, default=str).encode(), digest_size=16)
+        return f"{stage}-{digest.hexdigest()}"
+
+    def load(self, key: str) -> np.ndarray:
+        """
+        Load a cached result and mark it as used, None if it is not in the cache.
+        """
+        path = self._path(key)
+        try:
+            result = np.load(path, mmap_mode="r" if self.mmap else None)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except ValueError:  # Truncated or corrupted file
+            os.remove(path)
+            return None
+        return result
+
+    def save(self, key: str, result) -> np.ndarray:
+        """
+        Write a result in the cache (atomically) and evict the least recently used results above the size limit.
+
+        Returns:
+        - result: The cached result (as loaded by `load`)
+        """
+        result = np.asarray(result)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            np.save(file, result)
+        os.replace(tmp_path, path)
+        self.evict(keep=key)
+        cached = self.load(key) if self.mmap else None
+        return result if cached is None else cached
+
+    def get_or_compute(self, key: str, compute) -> np.ndarray:
+        """
+        Load a result from the cache, or compute it with compute() -> array and cache it.
+        """
+        result = self.load(key)
+        if result is None:
+            result = self.save(key, compute())
+        return result
+
+    def run_stage(self, capture, stage: str, compute, frame_params: dict = None, parent: str = None,
+                  **options) -> tuple[np.ndarray, str]:
+        """
+        Load the result of a stage from the cache, or compute it with compute() -> array and cache it.
+        See `get_key` for the parameters.
+
+        Returns:
+        - result: The result of the stage
+        - key: Its key, the parent of the stages computed from it
+        """
+        key = self.get_key(capture, stage, frame_params, parent, **options)
+        return self.get_or_compute(key, compute), key
+
+    def evict(self, keep: str = None) -> None:
+        """
+        Remove the least recently used results until the cache is below its size limit.
+
+        Parameters:
+        - keep: Key of a result never evicted (e.g. the one just written)
+        """
+        entries = sorted(((entry.stat(), entry.path) for entry in self._entries()), key=lambda item: item[0].st_mtime_ns)
+        size = sum(stat.st_size for stat, _ in entries)
+        keep_path = None if keep is None else self._path(keep)
+        for stat, path in entries:
+            if size <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= stat.st_size
+
+    def clear(self) -> None:
+        """
+        Remove all the cached results.
+        """
+        for entry in self._entries():
+            os.remove(entry.path)
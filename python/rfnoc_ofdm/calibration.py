@@ -0,0 +1,352 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from .capture import get_block_offsets, iter_capture
+from .metric_calculator import StreamingMetric
+
+"""
+Note: Calibration of the threshold of the FPGA detector on the noise floor of the metric. Noise-only
+      samples (raw captures without any frame, or simulated noise) are streamed through the metric block
+      by block and the distribution of the noise-only metric N[d] is kept in a `MetricStatistics` sketch,
+      so the captures can be larger than the memory. The recommended threshold is the value exceeded by
+      a fraction `pfa` of the noise-only samples (the detector triggers when N[d] > threshold).
+
+      The metric is normalized: N[d] is the mean of M[d] over the CP * M samples the FPGA sums it on.
+      In the HDL, P and R are both truncated to the 16 MSB of their sums, and |P|^2 is shifted left by
+      12 bits before the integer division by R^2: ideally one unit of M[d] is 2^12 LSB of the metric
+      register, and the register never exceeds CP * M * 2^12 (M[d] <= 1). This scale does not hold on
+      the FPGA: the shifted |P|^2 overflows its 32 bits as soon as |P| >= 2^10 LSB, so the register is
+      not proportional to M[d] (e.g. the threshold 10485760 of the captures would be a mean of 5.0 for
+      CP * M = 512). Only a calibration on the metric captured from the FPGA itself
+      (`rx_to_file --sc_output_select 1`, .metricLSB.int32.dat files) gives a usable register value,
+      the register value of a calibration on raw captures or simulated noise is only indicative.
+
+      The values of N[d] are strongly correlated over the window: there are about n_samples / (CP * M)
+      independent values, the captures must be long enough for the target false alarm rate.
+"""
+
+# LSB of the FPGA metric register per unit of M[d] (|P|^2 is shifted left by 12 bits, without its overflow)
+METRIC_REGISTER_SCALE = 1 << 12
+
+# Largest value of the 32-bit threshold register
+METRIC_REGISTER_MAX = (1 << 32) - 1
+
+# Number of largest values kept exactly by the sketch (the tail used for the low false alarm rates)
+SKETCH_TAIL_VALUES = 1 << 14
+
+
+def metric_to_register(threshold: float, window: int, scale: int = METRIC_REGISTER_SCALE) -> int:
+    """
+    Integer value of the FPGA threshold register (`rx_to_file --sc_threshold`) for a normalized threshold.
+
+    Parameters:
+    - threshold: Threshold on the mean of M[d] over the window
+    - window: Number of samples the FPGA sums M[d] on (CP * M)           [# of samples]
+    - scale: LSB of the metric register per unit of M[d]
+
+    Returns:
+    - register: The register value, clipped to 32 bits
+    """
+    return int(np.clip(np.round(threshold * window * scale), 0, METRIC_REGISTER_MAX))
+
+
+def register_to_metric(register, window: int, scale: int = METRIC_REGISTER_SCALE) -> np.ndarray:
+    """
+    Normalized value (mean of M[d] over the window) of FPGA metric register values (see `metric_to_register`).
+    """
+    return np.asarray(register, dtype=float) / (window * scale)
+
+
+#################
+# Metric sketch #
+#################
+
+class MetricStatistics:
+    """
+    Streaming sketch of the distribution of a metric: a histogram on logarithmic bins (plus an underflow
+    and an overflow bin) for the body of the distribution, and the exact `tail` largest values. The
+    quantiles in the tail (false alarm rates down to 1 / n_samples, up to tail / n_samples) are exact,
+    the others are interpolated in the histogram.
+
+    Sketches with the same bins can be merged, e.g. the sketches of captures processed in parallel.
+    """
+
+    def __init__(self, low: float = 1e-8, high: float = 1e4, bins: int = 4096, tail: int = SKETCH_TAIL_VALUES) -> None:
+        """
+        Initialize a MetricStatistics.
+
+        Parameters:
+        - low, high: Range of the histogram                0 < low < high
+        - bins: Number of (log spaced) bins of the histogram
+        - tail: Number of largest values kept exactly
+        """
+        if not 0 < low < high or bins < 1 or tail < 1:
+            raise ValueError("Invalid sketch parameters")
+        self.edges = np.geomspace(low, high, bins + 1)
+        self.counts = np.zeros(bins + 2, dtype=np.int64)
+        self.tail_size = tail
+        self.tail = np.empty(0)
+        self.n_samples = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.from_register = False  # Values read from the FPGA metric register (see `metric_capture_noise_floor`)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.n_samples if self.n_samples else np.nan
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(max(self.sum_sq / self.n_samples - self.mean ** 2, 0)) if self.n_samples else np.nan
+
+    @property
+    def histogram(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Bin edges [bins + 1] and counts [bins] of the histogram (without the underflow and overflow bins).
+        """
+        return self.edges, self.counts[1:-1]
+
+    def _keep_tail(self, values: np.ndarray) -> None:
+        tail = np.concatenate((self.tail, values))
+        if len(tail) > self.tail_size:
+            tail = np.partition(tail, len(tail) - self.tail_size)[-self.tail_size:]
+        tail.sort()
+        self.tail = tail
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add values of the metric to the sketch.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return
+        self.counts += np.bincount(np.searchsorted(self.edges, values, side="right"), minlength=len(self.counts))
+        self.n_samples += values.size
+        self.sum += np.sum(values)
+        self.sum_sq += np.dot(values, values)
+        self.min = min(self.min, np.min(values))
+        self.max = max(self.max, np.max(values))
+        if len(self.tail) == self.tail_size:
+            values = values[values > self.tail[0]]
+        self._keep_tail(values)
+
+    def merge(self, other: "MetricStatistics") -> None:
+        """
+        Add the values of another sketch (with the same bins) to this one.
+        """
+        if not np.array_equal(self.edges, other.edges) or self.tail_size != other.tail_size:
+            raise ValueError("Only sketches with the same bins and tail size can be merged")
+        self.counts += other.counts
+        self.n_samples += other.n_samples
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.from_register = self.from_register and other.from_register
+        self._keep_tail(other.tail)
+
+    def _is_exact(self, n_above: int) -> bool:
+        """
+        True if the values exceeded by n_above values are in the tail.
+        """
+        return n_above < len(self.tail) or self.n_samples <= self.tail_size
+
+    def threshold(self, pfa: float) -> tuple[float, bool]:
+        """
+        Smallest threshold exceeded by at most a fraction `pfa` of the values.
+
+        Returns:
+        - threshold: The threshold
+        - exact: The threshold is one of the values (in the tail), not interpolated in the histogram
+        """
+        if not 0 < pfa < 1 or self.n_samples == 0:
+            raise ValueError(f"Invalid false alarm rate {pfa} (or empty sketch)")
+        n_above = int(np.floor(pfa * self.n_samples))
+        if self._is_exact(n_above):
+            return float(self.tail[len(self.tail) - 1 - n_above]), True
+
+        # Bin j (edges[j - 1] to edges[j]) holding the threshold: above[j] > n_above >= above[j + 1]
+        above = np.cumsum(self.counts[::-1])[::-1]
+        j = np.count_nonzero(above > n_above) - 1
+        if j == 0:
+            return float(self.edges[0]), False
+        if j == len(self.counts) - 1:
+            return float(self.edges[-1]), False
+        fraction = (n_above - above[j + 1]) / self.counts[j]
+        log_low, log_high = np.log(self.edges[j - 1]), np.log(self.edges[j])
+        return float(np.exp(log_high - fraction * (log_high - log_low))), False
+
+    def exceedance(self, thresholds) -> np.ndarray:
+        """
+        Fraction of the values above each threshold (interpolated in the histogram below the tail).
+        """
+        thresholds = np.asarray(thresholds, dtype=float)
+        above = np.cumsum(self.counts[::-1])[::-1]
+        above = np.append(above, 0)
+        n_above = np.empty(thresholds.shape)
+        for i, threshold in np.ndenumerate(thresholds):
+            if self.n_samples <= self.tail_size or (len(self.tail) and threshold >= self.tail[0]):
+                n_above[i] = len(self.tail) - np.searchsorted(self.tail, threshold, side="right")
+                continue
+            j = np.searchsorted(self.edges, threshold, side="right")
+            n_above[i] = above[j]
+            if 0 < j < len(self.counts) - 1:
+                log_low, log_high = np.log(self.edges[j - 1]), np.log(self.edges[j])
+                n_above[i] = above[j + 1] + self.counts[j] * (log_high - np.log(threshold)) / (log_high - log_low)
+        return n_above / max(self.n_samples, 1)
+
+
+###############
+# Calibration #
+###############
+
+@dataclass(frozen=True)
+class ThresholdCalibration:
+    """
+    Threshold of the FPGA detector for a target false alarm rate.
+
+    Attributes:
+    - pfa: Target false alarm rate (fraction of the noise-only samples above the threshold)
+    - threshold: Normalized threshold (mean of M[d] over the window)
+    - register: Value of the threshold register (`rx_to_file --sc_threshold`)
+    - window: Number of samples the FPGA sums M[d] on (CP * M)                   [# of samples]
+    - n_samples: Number of noise-only samples of the calibration
+    - exact: The threshold is a value of the noise-only metric (not interpolated in the histogram)
+    - from_register: Calibrated on the FPGA metric register itself, otherwise the register value is only
+                     the conversion of the threshold with the ideal scale (see the note of the module)
+    """
+    pfa: float
+    threshold: float
+    register: int
+    window: int
+    n_samples: int
+    exact: bool
+    from_register: bool = False
+
+    @property
+    def option(self) -> str:
+        """
+        Option of `rx_to_file` setting the threshold.
+        """
+        return f"--sc_threshold {self.register}"
+
+
+def calibrate_threshold(statistics: MetricStatistics, pfa: float = 1e-6, window: int = 128 * 4,
+                        scale: int = METRIC_REGISTER_SCALE) -> ThresholdCalibration:
+    """
+    Recommend a threshold of the FPGA detector for a target false alarm rate, from the sketch of the
+    noise-only metric (see `capture_noise_floor`, `simulate_noise_floor` and `metric_capture_noise_floor`).
+
+    Parameters:
+    - statistics: Sketch of the noise-only metric N[d] (normalized)
+    - pfa: Target fraction of the noise-only samples above the threshold
+    - window: Number of samples the FPGA sums M[d] on (CP * M)           [# of samples]
+    - scale: LSB of the metric register per unit of M[d]
+
+    Returns:
+    - calibration: The normalized threshold and the register value
+    """
+    if pfa * statistics.n_samples < 1:
+        raise ValueError(f"Not enough noise-only samples ({statistics.n_samples}) for a false alarm rate of {pfa}")
+    threshold, exact = statistics.threshold(pfa)
+    return ThresholdCalibration(pfa, threshold, metric_to_register(threshold, window, scale), window,
+                                statistics.n_samples, exact, statistics.from_register)
+
+
+def _update_statistics(statistics: MetricStatistics, metric: StreamingMetric, samples: np.ndarray) -> None:
+    """
+    Stream samples through the metric and add its values (without the transient of the streams) to the sketch.
+    """
+    values = metric.update(samples)
+    first = metric.n_samples - values.shape[-1]
+    statistics.update(values[..., max(metric.warmup - first, 0):])
+
+
+def capture_noise_floor(paths, fmt: str = "fc32", K: int = 1024, CP: int = 128, M: int = 4, method: str = "schmidl",
+                        block: int = 1 << 20, statistics: MetricStatistics = None) -> MetricStatistics:
+    """
+    Sketch of the noise-only metric of raw captures (e.g. `rx_to_file --datapath raw` without transmission),
+    read block by block: each capture is an independent stream.
+
+    Parameters:
+    - paths: Capture file, or list of capture files
+    - fmt: Sample format                                        [fc32, sc16]
+    - K, CP, M: Number of subcarriers, cyclic prefix length and oversampling factor of the frames
+    - method: Metric                                            [schmidl, minn, wilson]
+    - block: Number of samples read at once
+    - statistics: Sketch to add the values to (e.g. of other captures), a new one by default
+
+    Returns:
+    - statistics: The sketch of the normalized metric N[d]
+    """
+    statistics = MetricStatistics() if statistics is None else statistics
+    metric = StreamingMetric(K, M, CP * M, method)
+    for capture_block in iter_capture(paths, fmt, block):
+        if capture_block.offset == 0:
+            metric.reset()
+        _update_statistics(statistics, metric, capture_block.samples)
+    return statistics
+
+
+def simulate_noise_floor(n_samples: int, K: int = 1024, CP: int = 128, M: int = 4, method: str = "schmidl",
+                         batch: int = 16, block: int = 1 << 16, seed=None,
+                         statistics: MetricStatistics = None) -> MetricStatistics:
+    """
+    Sketch of the metric of simulated complex white Gaussian noise, as `batch` independent streams of
+    n_samples / batch samples generated block by block (the metric does not depend on the noise power).
+
+    Parameters:
+    - n_samples: Total number of noise samples
+    - K, CP, M: Number of subcarriers, cyclic prefix length and oversampling factor of the frames
+    - method: Metric                                            [schmidl, minn, wilson]
+    - batch: Number of streams
+    - block: Number of samples of each stream generated at once
+    - seed: Seed of the noise generator                         [int, SeedSequence, Generator]
+    - statistics: Sketch to add the values to, a new one by default
+
+    Returns:
+    - statistics: The sketch of the normalized metric N[d]
+    """
+    statistics = MetricStatistics() if statistics is None else statistics
+    generator = np.random.default_rng(seed)
+    metric = StreamingMetric(K, M, CP * M, method)
+    length = -(-n_samples // batch)
+    for start in range(0, length, block):
+        noise = generator.standard_normal((batch, 2, min(block, length - start)), dtype=np.float32)
+        _update_statistics(statistics, metric, noise[:, 0] + 1j * noise[:, 1])
+    return statistics
+
+
+def metric_capture_noise_floor(paths, window: int = 128 * 4, scale: int = METRIC_REGISTER_SCALE, block: int = 1 << 20,
+                               skip: int = 0, statistics: MetricStatistics = None) -> MetricStatistics:
+    """
+    Sketch of the noise-only metric captured from the FPGA (.metricLSB.int32.dat files: the 32 LSB of
+    the metric register, read as unsigned), memory mapped and read block by block.
+
+    Parameters:
+    - paths: Metric capture file, or list of metric capture files
+    - window: Number of samples the FPGA sums M[d] on (CP * M)  [# of samples]
+    - scale: LSB of the metric register per unit of M[d] (cancels out in the calibrated register value)
+    - block: Number of values read at once
+    - skip: Number of values skipped at the start of each capture
+    - statistics: Sketch to add the values to, a new one by default
+
+    Returns:
+    - statistics: The sketch of the normalized metric N[d]
+    """
+    if statistics is None:
+        statistics = MetricStatistics()
+        statistics.from_register = True
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    for path in paths:
+        n_values = os.path.getsize(path) // 4
+        if n_values <= skip:
+            continue
+        values = np.memmap(path, dtype=np.uint32, mode="r", shape=(n_values,))
+        for start, stop in get_block_offsets(n_values - skip, block):
+            statistics.update(register_to_metric(values[skip + start:skip + stop], window, scale))
+    return statistics
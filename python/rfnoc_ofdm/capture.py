@@ -0,0 +1,508 @@
+import functools
+import os
+import re
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .compressed import CompressedCapture, is_compressed_capture
+
+"""
+Note: The captures written by `rx_to_file` are raw interleaved I/Q samples: float32 pairs for fc32,
+      int16 pairs for sc16, without any header. The loaders also accept compressed captures
+      (see `compressed.compress_capture`), whose sample format is read from their header.
+"""
+
+# Scalar type of the interleaved I/Q components of each sample format
+SAMPLE_FORMATS = {"fc32": np.float32, "sc16": np.int16}
+
+# Number of sc16 samples converted to complex64 at once
+SC16_CHUNK_SAMPLES = 1 << 18
+
+
+def get_sample_dtype(fmt: str) -> np.dtype:
+    """
+    Scalar type of the I/Q components of a sample format.
+    """
+    if fmt not in SAMPLE_FORMATS:
+        raise ValueError(f"Invalid sample format: {fmt} (expected one of {list(SAMPLE_FORMATS)})")
+    return np.dtype(SAMPLE_FORMATS[fmt])
+
+
+def get_num_samples(path: str, fmt: str = "fc32") -> int:
+    """
+    Number of complex samples in a capture file.
+    """
+    return os.path.getsize(path) // (2 * get_sample_dtype(fmt).itemsize)
+
+
+def map_samples(path: str, fmt: str = "fc32", offset: int = 0, count: int = None) -> np.ndarray:
+    """
+    Memory map the interleaved I/Q components of a capture file (read-only, nothing is read yet).
+
+    Parameters:
+    - path: Capture file
+    - fmt: Sample format                                [fc32, sc16]
+    - offset: First sample to map                       [# of samples]
+    - count: Number of samples to map, None for all the samples after `offset`
+
+    Returns:
+    - raw: The I/Q components                           [count x 2]
+    """
+    dtype = get_sample_dtype(fmt)
+    n_samples = get_num_samples(path, fmt)
+    if offset < 0 or offset > n_samples:
+        raise ValueError(f"Invalid offset {offset} for a capture of {n_samples} samples")
+    count = n_samples - offset if count is None else count
+    if count < 0 or offset + count > n_samples:
+        raise ValueError(f"Cannot read {count} samples at offset {offset} in a capture of {n_samples} samples")
+    if count == 0:
+        return np.empty((0, 2), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset * 2 * dtype.itemsize, shape=(count, 2))
+
+
+def sc16_to_complex64(raw: np.ndarray, out: np.ndarray = None, chunk: int = SC16_CHUNK_SAMPLES) -> np.ndarray:
+    """
+    Convert interleaved sc16 I/Q components to complex64, by chunks of samples so that only
+    one chunk of the (possibly memory mapped) input is touched at a time.
+
+    Parameters:
+    - raw: The int16 I/Q components                     [n x 2]
+    - out: Output array, allocated if None              [n]
+    - chunk: Number of samples converted at once
+
+    Returns:
+    - samples: The complex samples                      [n]
+    """
+    if out is None:
+        out = np.empty(raw.shape[0], dtype=np.complex64)
+    components = out.view(np.float32).reshape(-1, 2)
+    for start in range(0, raw.shape[0], chunk):
+        components[start:start + chunk] = raw[start:start + chunk]
+    return out
+
+
+def read_samples(path: str, fmt: str = "fc32", offset: int = 0, count: int = None, copy: bool = False) -> np.ndarray:
+    """
+    Read complex samples from a capture file without loading the rest of the file.
+
+    fc32 captures are returned as a complex64 view of the memory map (no copy, read-only): the
+    samples are only read from the disk when they are accessed. sc16 captures are converted to
+    complex64 by chunks (see `sc16_to_complex64`).
+
+    Parameters:
+    - path: Capture file
+    - fmt: Sample format                                [fc32, sc16]
+    - offset: First sample to read                      [# of samples]
+    - count: Number of samples to read, None for all the samples after `offset`
+    - copy: Return an in-memory (writable) copy instead of a view of the file (fc32 only)
+
+    Returns:
+    - samples: The complex samples                      [count] (complex64)
+    """
+    if is_compressed_capture(path):
+        with CompressedCapture(path) as capture:
+            count = capture.n_samples - offset if count is None else count
+            if offset < 0 or count < 0 or offset + count > capture.n_samples:
+                raise ValueError(f"Cannot read {count} samples at offset {offset} in a capture of {capture.n_samples} samples")
+            return _to_complex64(capture[offset:offset + count], capture.fmt, copy=False)
+    raw = map_samples(path, fmt, offset, count)
+    return _to_complex64(raw, fmt, copy)
+
+
+def _to_complex64(raw: np.ndarray, fmt: str, copy: bool) -> np.ndarray:
+    """
+    Complex samples of (memory mapped) I/Q components: a view for fc32 (unless copied), a conversion for sc16.
+    """
+    if fmt == "sc16":
+        return sc16_to_complex64(raw)
+    samples = raw.view(np.complex64)[:, 0]
+    return np.array(samples) if copy else samples
+
+
+##################
+# Chunked reader #
+##################
+
+@dataclass(frozen=True)
+class CaptureBlock:
+    """
+    Block of samples read from a capture file.
+
+    Attributes:
+    - path: Capture file
+    - offset: Index of the first sample of the block in the file
+    - samples: The complex samples (complex64, in memory)
+    """
+    path: str
+    offset: int
+    samples: np.ndarray
+
+
+def get_block_offsets(n_samples: int, block: int, overlap: int = 0, partial: bool = True) -> list[tuple[int, int]]:
+    """
+    (start, stop) sample indices of the blocks of a capture of n_samples samples. Consecutive blocks
+    overlap by `overlap` samples; the last block is shorter if `partial` (and contains new samples).
+    """
+    if block < 1 or not 0 <= overlap < block:
+        raise ValueError(f"Invalid block size {block} and overlap {overlap}")
+    step = block - overlap
+    offsets = []
+    start = 0
+    while start + block <= n_samples:
+        offsets.append((start, start + block))
+        start += step
+    if partial and start < n_samples and (start + overlap < n_samples or not offsets):
+        offsets.append((start, n_samples))
+    return offsets
+
+
+def _read_block(path: str, raw: np.ndarray, fmt: str, start: int, stop: int) -> CaptureBlock:
+    """
+    Read a block of samples of a memory mapped (or compressed) capture in memory.
+    """
+    return CaptureBlock(path, start, _to_complex64(raw[start:stop], fmt, copy=True))
+
+
+def iter_capture(paths, fmt: str = "fc32", block: int = 1 << 20, overlap: int = 0, partial: bool = True,
+                 prefetch: int = 1):
+    """
+    Iterate over fixed-size blocks of samples of one or many capture files, e.g. the measurements of
+    a `rx_to_file --nbr_meas` campaign. The files are memory mapped (compressed captures are
+    decompressed block by block) and the blocks are read from the disk by a background thread,
+    `prefetch` blocks ahead of the one being processed.
+
+    Each file is an independent stream: the blocks never span two files. Consecutive blocks of a file
+    overlap by `overlap` samples, e.g. 2 * L to compute a sliding metric over the block boundaries,
+    or a whole frame to demodulate every frame starting in a block.
+
+    Parameters:
+    - paths: Capture file, or list of capture files
+    - fmt: Sample format                                [fc32, sc16]
+    - block: Number of samples per block                [# of samples] >= 1
+    - overlap: Number of samples shared by two consecutive blocks   [# of samples] < block
+    - partial: Also yield the last (shorter) block of each file
+    - prefetch: Number of blocks read in advance, 0 to read in the calling thread
+
+    Yields:
+    - block: CaptureBlock (path, offset in the file, samples), the samples are owned by the block
+    """
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    get_sample_dtype(fmt)
+    get_block_offsets(0, block, overlap)
+
+    def file_blocks(path, raw, raw_fmt):
+        for start, stop in get_block_offsets(raw.shape[0], block, overlap, partial):
+            yield functools.partial(_read_block, path, raw, raw_fmt, start, stop)
+
+    def read_blocks():
+        for path in paths:
+            if is_compressed_capture(path):
+                with CompressedCapture(path) as raw:
+                    yield from file_blocks(path, raw, raw.fmt)
+                    yield None  # The reads of the file must be done before it is closed
+            else:
+                yield from file_blocks(path, map_samples(path, fmt), fmt)
+
+    if prefetch < 1:
+        for read in read_blocks():
+            if read is not None:
+                yield read()
+        return
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    pending = deque()
+    try:
+        for read in read_blocks():
+            if read is None:
+                while pending:
+                    yield pending.popleft().result()
+                continue
+            pending.append(executor.submit(read))
+            if len(pending) > prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+#####################
+# Capture container #
+#####################
+
+"""
+Note: Self-describing capture file. A 256-byte little-endian header is followed by the raw interleaved
+      I/Q samples (as written by `rx_to_file`) and by an optional index: the detected frame offsets
+      then the hardware detection points, both int64 sample indices.
+
+      offset  size  field
+      0       8     magic "RFNOCCAP"
+      8       2     version (uint16)
+      10      2     sample format (uint16): 0 = fc32, 1 = sc16
+      12      4     header size (uint32)
+      16      8     number of samples (uint64)
+      24      8     byte offset of the index, 0 if there is no index (uint64)
+      32      4     number of frame offsets in the index (uint32)
+      36      4     number of detection points in the index (uint32)
+      40      24    sample rate [Hz], center frequency [Hz], gain [dB] (float64)
+      64      24    K, CP, M, N, Nt, Nf (uint32)
+      88      8     preamble modulation (ASCII, zero padded)
+      96      8     payload modulation (ASCII, zero padded)
+      104     8     random seed of the frame (uint64)
+      112     32    datapath (ASCII, zero padded), e.g. raw, schmidl_cox, schmidl_cox_fft
+      144     4     measurement number (uint32)
+      148     8     acquisition time, seconds since the epoch (float64)
+      156     100   reserved (zeros)
+"""
+
+CAPTURE_MAGIC = b"RFNOCCAP"
+CAPTURE_VERSION = 1
+CAPTURE_HEADER_SIZE = 256
+CAPTURE_FORMATS = ("fc32", "sc16")
+
+_CAPTURE_STRUCT = struct.Struct("<8sHHIQQIIddd6I8s8sQ32sId100x")
+
+# Legacy `rx_to_file` file names: <name>_<datapath>[_meas<n>].[<output info>.]<format>.dat
+_LEGACY_FILENAME = re.compile(
+    r"^(?P<name>.+?)_(?P<datapath>raw|schmidl_cox_fft|schmidl_cox)(?:_meas(?P<meas>\d+))?"
+    r"\.(?:(?P<output_info>signal_with_zeros|signal_detected_idx|signal|metricLSB)\.)?(?P<fmt>fc32|sc16|int32)\.dat$")
+
+
+@dataclass(frozen=True)
+class CaptureHeader:
+    """
+    Header of a capture container (see the layout above).
+    """
+    fmt: str
+    n_samples: int
+    index_offset: int = 0
+    n_frame_offsets: int = 0
+    n_detection_points: int = 0
+    rate: float = 0.0
+    freq: float = 0.0
+    gain: float = 0.0
+    K: int = 0
+    CP: int = 0
+    M: int = 0
+    N: int = 0
+    Nt: int = 0
+    Nf: int = 0
+    preamble_mod: str = ""
+    payload_mod: str = ""
+    random_seed: int = 0
+    datapath: str = ""
+    meas: int = 0
+    timestamp: float = 0.0
+    version: int = CAPTURE_VERSION
+
+    def pack(self) -> bytes:
+        """
+        Serialize the header (256 bytes).
+        """
+        return _CAPTURE_STRUCT.pack(
+            CAPTURE_MAGIC, self.version, CAPTURE_FORMATS.index(self.fmt), CAPTURE_HEADER_SIZE, self.n_samples,
+            self.index_offset, self.n_frame_offsets, self.n_detection_points, self.rate, self.freq, self.gain,
+            self.K, self.CP, self.M, self.N, self.Nt, self.Nf, self.preamble_mod.encode("ascii"),
+            self.payload_mod.encode("ascii"), self.random_seed, self.datapath.encode("ascii"), self.meas, self.timestamp)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "CaptureHeader":
+        """
+        Parse a header, raise a ValueError if the data is not a capture header.
+        """
+        if len(data) < CAPTURE_HEADER_SIZE or data[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            raise ValueError("Not a capture container")
+        (_, version, fmt, header_size, n_samples, index_offset, n_frame_offsets, n_detection_points, rate, freq, gain,
+         K, CP, M, N, Nt, Nf, preamble_mod, payload_mod, random_seed, datapath, meas, timestamp
+         ) = _CAPTURE_STRUCT.unpack(data[:CAPTURE_HEADER_SIZE])
+        if version != CAPTURE_VERSION or header_size != CAPTURE_HEADER_SIZE or fmt >= len(CAPTURE_FORMATS):
+            raise ValueError(f"Unsupported capture container (version {version}, format {fmt})")
+        decode = lambda text: text.rstrip(b"\0").decode("ascii")
+        return cls(CAPTURE_FORMATS[fmt], n_samples, index_offset, n_frame_offsets, n_detection_points, rate, freq, gain,
+                   K, CP, M, N, Nt, Nf, decode(preamble_mod), decode(payload_mod), random_seed, decode(datapath),
+                   meas, timestamp, version)
+
+    @property
+    def sample_size(self) -> int:
+        """
+        Size of one complex sample in the file [bytes].
+        """
+        return 2 * get_sample_dtype(self.fmt).itemsize
+
+
+def is_capture_container(path: str) -> bool:
+    """
+    True if the file starts with the capture container magic.
+    """
+    with open(path, "rb") as file:
+        return file.read(len(CAPTURE_MAGIC)) == CAPTURE_MAGIC
+
+
+def parse_capture_filename(filename: str) -> dict:
+    """
+    Parse the name of a legacy `rx_to_file` capture, e.g. `rx_samples_schmidl_cox_meas6.signal_detected_idx.sc16.dat`.
+
+    Returns:
+    - info: name, datapath, meas (None for a single measurement), output_info (None for raw captures)
+            and fmt, or None if the name does not follow the convention
+    """
+    match = _LEGACY_FILENAME.match(os.path.basename(filename))
+    if match is None:
+        return None
+    info = match.groupdict()
+    info["meas"] = int(info["meas"]) if info["meas"] is not None else None
+    return info
+
+
+def read_detection_trailer(path: str) -> int:
+    """
+    Hardware detection point stored in the last sample of a legacy sc16 `signal_detected_idx` capture:
+    the I and Q words are the high and low 16 bits of the index. Only the last 4 bytes are read.
+    """
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < 4:
+            raise ValueError(f"Capture too short to hold a detection trailer: {path}")
+        high, low = np.frombuffer(os.pread(file.fileno(), 4, size - 4), dtype="<u2")
+    return int(high) << 16 | int(low)
+
+
+def write_capture(path: str, samples: np.ndarray, fmt: str = "sc16", frame_offsets: np.ndarray = None,
+                  detection_points: np.ndarray = None, chunk: int = SC16_CHUNK_SAMPLES, **metadata) -> CaptureHeader:
+    """
+    Write a capture container.
+
+    Parameters:
+    - path: Output file
+    - samples: Complex samples [n], or interleaved I/Q components of `fmt` [n x 2] (e.g. from `map_samples`)
+    - fmt: Sample format of the file (complex samples are rounded for sc16)   [fc32, sc16]
+    - frame_offsets: Detected frame offsets to store in the index              [# of samples]
+    - detection_points: Hardware detection points to store in the index        [# of samples]
+    - chunk: Number of samples written at once
+    - metadata: Other header fields (rate, freq, gain, K, CP, M, N, Nt, Nf, preamble_mod, payload_mod,
+                random_seed, datapath, meas, timestamp)
+
+    Returns:
+    - header: The header written in the file
+    """
+    dtype = get_sample_dtype(fmt)
+    frame_offsets = np.asarray([] if frame_offsets is None else frame_offsets, dtype="<i8")
+    detection_points = np.asarray([] if detection_points is None else detection_points, dtype="<i8")
+    n_samples = samples.shape[0]
+    has_index = len(frame_offsets) > 0 or len(detection_points) > 0
+    header = CaptureHeader(
+        fmt=fmt, n_samples=n_samples,
+        index_offset=CAPTURE_HEADER_SIZE + n_samples * 2 * dtype.itemsize if has_index else 0,
+        n_frame_offsets=len(frame_offsets), n_detection_points=len(detection_points), **metadata)
+
+    with open(path, "wb") as file:
+        file.write(header.pack())
+        for start in range(0, n_samples, chunk):
+            block = samples[start:start + chunk]
+            if np.iscomplexobj(block):
+                iq = np.empty((len(block), 2), dtype=dtype)
+                iq[:, 0] = np.rint(block.real) if fmt == "sc16" else block.real
+                iq[:, 1] = np.rint(block.imag) if fmt == "sc16" else block.imag
+            else:
+                iq = np.ascontiguousarray(block, dtype=dtype)
+            file.write(iq.data)
+        if has_index:
+            file.write(frame_offsets.tobytes())
+            file.write(detection_points.tobytes())
+    return header
+
+
+class CaptureFile:
+    """
+    Capture container opened for reading: the header and the index are read at once (a few bytes at
+    the head and at the tail of the file), the samples are memory mapped and only read when accessed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open a capture container.
+
+        Parameters:
+        - path: Capture container
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            fd = file.fileno()
+            self.header = CaptureHeader.unpack(os.pread(fd, CAPTURE_HEADER_SIZE, 0))
+            n_index = self.header.n_frame_offsets + self.header.n_detection_points
+            index = np.zeros(0, dtype="<i8")
+            if self.header.index_offset and n_index:
+                index = np.frombuffer(os.pread(fd, 8 * n_index, self.header.index_offset), dtype="<i8")
+                if len(index) != n_index:
+                    raise ValueError(f"Truncated capture index: {path}")
+        self.frame_offsets = index[:self.header.n_frame_offsets]
+        self.detection_points = index[self.header.n_frame_offsets:]
+
+    @property
+    def n_samples(self) -> int:
+        """
+        Number of samples in the capture.
+        """
+        return self.header.n_samples
+
+    def map(self, offset: int = 0, count: int = None) -> np.ndarray:
+        """
+        Memory map the interleaved I/Q components of the samples [offset, offset + count[ (see `map_samples`).
+        """
+        count = self.header.n_samples - offset if count is None else count
+        if offset < 0 or count < 0 or offset + count > self.header.n_samples:
+            raise ValueError(f"Cannot read {count} samples at offset {offset} in a capture of {self.header.n_samples} samples")
+        dtype = get_sample_dtype(self.header.fmt)
+        if count == 0:
+            return np.empty((0, 2), dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", shape=(count, 2),
+                         offset=CAPTURE_HEADER_SIZE + offset * self.header.sample_size)
+
+    def read(self, offset: int = 0, count: int = None, copy: bool = False) -> np.ndarray:
+        """
+        Complex samples [offset, offset + count[ (see `read_samples`): a view of the file for fc32, converted for sc16.
+        """
+        return _to_complex64(self.map(offset, count), self.header.fmt, copy)
+
+    def read_frame(self, i: int, length: int) -> np.ndarray:
+        """
+        Complex samples of the i-th indexed frame, `length` samples from its offset (truncated at the end of the capture).
+        """
+        offset = int(self.frame_offsets[i])
+        return self.read(offset, min(length, self.header.n_samples - offset))
+
+
+def convert_legacy_capture(src: str, dst: str, fmt: str = None, frame_offsets: np.ndarray = None, **metadata) -> CaptureHeader:
+    """
+    Convert a raw `rx_to_file` capture to a capture container. The datapath, measurement number and
+    sample format are parsed from the file name when not given. For `signal_detected_idx` captures,
+    the last sample (the detection point, see `read_detection_trailer`) moves to the index.
+
+    Parameters:
+    - src: Legacy capture
+    - dst: Output capture container
+    - fmt: Sample format of the legacy capture (default: from the file name)  [fc32, sc16]
+    - frame_offsets: Detected frame offsets to store in the index             [# of samples]
+    - metadata: Other header fields (see `write_capture`)
+
+    Returns:
+    - header: The header written in the file
+    """
+    info = parse_capture_filename(src) or {}
+    fmt = fmt or info.get("fmt")
+    if fmt not in CAPTURE_FORMATS:
+        raise ValueError(f"Unknown or unsupported sample format for {src}: {fmt}")
+    metadata.setdefault("datapath", info.get("datapath") or "")
+    metadata.setdefault("meas", info.get("meas") or 0)
+    metadata.setdefault("timestamp", os.path.getmtime(src))
+
+    raw = map_samples(src, fmt)
+    detection_points = None
+    if info.get("output_info") == "signal_detected_idx" and fmt == "sc16":
+        detection_points = [read_detection_trailer(src)]
+        raw = raw[:-1]
+    return write_capture(dst, raw, fmt, frame_offsets, detection_points, **metadata)
@@ -0,0 +1,137 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .capture import (CAPTURE_HEADER_SIZE, CaptureHeader, get_sample_dtype, parse_capture_filename,
+                      read_detection_trailer)
+
+"""
+Note: A catalog is a table with one row per capture of a data directory, built from the file names and
+      a few bytes at the head and at the tail of each capture only (and a sampled hash of the content).
+      It is saved as a CSV index in the directory and updated incrementally: only the new or modified
+      captures (size or mtime) are scanned.
+"""
+
+CATALOG_FILENAME = "catalog.csv"
+CATALOG_COLUMNS = ["Filename", "Size", "Mtime", "Format", "Datapath", "Meas", "Output", "Samples",
+                   "Detected point", "Container", "Sampled hash"]
+
+# Sampled hash: blocks of HASH_BLOCK_BYTES read at HASH_BLOCKS evenly spaced positions (head and tail included)
+HASH_BLOCK_BYTES = 64 * 1024
+HASH_BLOCKS = 8
+
+
+def hash_capture(fd: int, size: int, block_bytes: int = HASH_BLOCK_BYTES, n_blocks: int = HASH_BLOCKS) -> str:
+    """
+    Sampled hash of a file: BLAKE2b of its size and of `n_blocks` blocks spread over the file
+    (the whole file if it is smaller than the blocks). Enough to tell captures apart and to detect a
+    modified capture without reading it entirely (a change outside the sampled blocks is not detected).
+    """
+    digest = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+    if size <= block_bytes * n_blocks:
+        positions = range(0, size, block_bytes)
+    else:
+        positions = np.linspace(0, size - block_bytes, n_blocks).astype(np.int64)
+    for position in positions:
+        digest.update(os.pread(fd, block_bytes, int(position)))
+    return digest.hexdigest()
+
+
+def scan_capture(path: str, root: str = "") -> dict:
+    """
+    Catalog row of a capture (legacy `rx_to_file` capture or capture container). Only the header,
+    the trailer and the hashed blocks are read.
+
+    Parameters:
+    - path: Capture file
+    - root: Directory the file name is relative to
+    """
+    with open(path, "rb") as file:
+        fd = file.fileno()
+        stat = os.fstat(fd)
+        head = os.pread(fd, CAPTURE_HEADER_SIZE, 0)
+        row = dict.fromkeys(CATALOG_COLUMNS)
+        row.update({"Filename": os.path.relpath(path, root) if root else path, "Size": stat.st_size,
+                    "Mtime": stat.st_mtime_ns, "Container": False,
+                    "Sampled hash": hash_capture(fd, stat.st_size)})
+
+        try:
+            header = CaptureHeader.unpack(head)
+        except ValueError:
+            header = None
+        if header is not None:
+            row.update({"Format": header.fmt, "Datapath": header.datapath or None, "Meas": header.meas,
+                        "Samples": header.n_samples, "Container": True})
+            if header.n_detection_points:
+                offset = header.index_offset + 8 * header.n_frame_offsets
+                row["Detected point"] = int(np.frombuffer(os.pread(fd, 8, offset), dtype="<i8")[0])
+            return row
+
+    info = parse_capture_filename(path)
+    if info is not None:
+        row.update({"Format": info["fmt"], "Datapath": info["datapath"], "Meas": info["meas"],
+                    "Output": info["output_info"]})
+        if info["fmt"] in ("fc32", "sc16"):
+            row["Samples"] = stat.st_size // (2 * get_sample_dtype(info["fmt"]).itemsize)
+        if info["output_info"] == "signal_detected_idx" and info["fmt"] == "sc16":
+            row["Detected point"] = read_detection_trailer(path)
+    return row
+
+
+def build_catalog(folder: str, index: str = None, workers: int = 8, extensions: tuple = (".dat", ".cap"),
+                  recursive: bool = True, save: bool = True) -> pd.DataFrame:
+    """
+    Build (or update) the catalog of the captures of a data directory.
+
+    The directory is walked and the captures are scanned in a thread pool (the scan is I/O bound).
+    If an index exists, the rows of the captures whose size and mtime did not change are reused,
+    the others are scanned again, and the rows of the deleted captures are dropped.
+
+    Parameters:
+    - folder: Data directory
+    - index: Index file (default: `catalog.csv` in the directory)
+    - workers: Number of scanning threads
+    - extensions: Extensions of the capture files
+    - recursive: Also walk the subdirectories
+    - save: Write the catalog to the index when it changed (new, modified or deleted captures)
+
+    Returns:
+    - catalog: One row per capture, sorted by datapath, measurement number and file name
+               (see CATALOG_COLUMNS, "Meas" and "Detected point" are nullable integers)
+    """
+    index = os.path.join(folder, CATALOG_FILENAME) if index is None else index
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        paths.extend(os.path.join(root, name) for name in files if name.endswith(extensions))
+        if not recursive:
+            break
+
+    # Rows of the previous index that are still valid
+    previous = {}
+    if os.path.exists(index):
+        previous_catalog = pd.read_csv(index)
+        if set(CATALOG_COLUMNS) <= set(previous_catalog.columns):  # Indexes with other columns are rebuilt
+            for row in previous_catalog.to_dict("records"):
+                previous[row["Filename"]] = row
+    rows, to_scan = [], []
+    for path in paths:
+        filename = os.path.relpath(path, folder)
+        stat = os.stat(path)
+        row = previous.get(filename)
+        if row is not None and row["Size"] == stat.st_size and row["Mtime"] == stat.st_mtime_ns:
+            rows.append(row)
+        else:
+            to_scan.append(path)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        rows.extend(executor.map(lambda path: scan_capture(path, folder), to_scan))
+
+    catalog = pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+    catalog = catalog.astype({"Meas": "Int64", "Samples": "Int64", "Detected point": "Int64", "Container": bool})
+    catalog = catalog.sort_values(["Datapath", "Meas", "Filename"], na_position="last", ignore_index=True)
+    if save and (to_scan or len(rows) != len(previous) or not os.path.exists(index)):
+        catalog.to_csv(index, index=False)
+    return catalog
@@ -0,0 +1,203 @@
+import numpy as np
+from scipy.signal import oaconvolve
+
+"""
+Note: The channel functions work on batches of waveforms (B x T), one frame per row, and follow the
+      numpy `out=` convention: the result is written in `out` when given (which may be the input
+      itself), in a new array otherwise.
+"""
+
+# Above this number of non-zero taps, the multipath channel is applied with an overlap-add FFT convolution
+FFT_CONVOLUTION_TAPS = 32
+
+
+def get_impulse_response(gains, delays, phases=None, normalize: bool = True) -> np.ndarray:
+    """
+    Build the impulse response of a multipath channel (taps at the same delay are summed).
+
+    Parameters:
+    - gains: Gain of each path                                   [P] or [B x P] (one channel per frame)
+    - delays: Delay of each path                                 [# of samples] [P]
+    - phases: Phase of each path, None for real gains            [rad] [P] or [B x P]
+    - normalize: Normalize the impulse response to a unit energy
+
+    Returns:
+    - h: The impulse response                                    [max(delays) + 1] or [B x max(delays) + 1]
+    """
+    gains = np.asarray(gains, dtype=complex)
+    delays = np.asarray(delays, dtype=np.intp)
+    if gains.shape[-1] != len(delays) or np.any(delays < 0):
+        raise ValueError("The number of gains and delays must be equal, and the delays positive")
+    if phases is not None:
+        gains = gains * np.exp(1j * np.asarray(phases))
+
+    h = np.zeros(gains.shape[:-1] + (np.max(delays) + 1,), dtype=complex)
+    if h.ndim == 1:
+        np.add.at(h, delays, gains)
+    else:
+        np.add.at(h.T, delays, gains.T)
+    if normalize:
+        h /= np.sqrt(np.sum(np.abs(h) ** 2, axis=-1, keepdims=True))
+    return h
+
+
+def get_noise_std(snr_db, signal_power) -> np.ndarray:
+    """
+    Standard deviation of the real and imaginary parts of the noise for a given SNR (per frame).
+    """
+    return np.sqrt(np.asarray(signal_power) / 10 ** (np.asarray(snr_db, dtype=float) / 10) / 2)
+
+
+def add_awgn(x: np.ndarray, noise_std, generator: np.random.Generator, out: np.ndarray = None,
+             buffer: np.ndarray = None) -> np.ndarray:
+    """
+    Add complex white Gaussian noise to a batch of waveforms.
+
+    The noise of all the frames is drawn in one call, as a (B x 2 x T) block of real samples (the real
+    parts of a frame, then its imaginary parts), in the precision of x.
+
+    Parameters:
+    - x: Waveforms                                              [T] or [B x T]
+    - noise_std: Standard deviation of the real and imaginary parts (scalar or per frame [B])
+    - generator: Random generator, or one per frame (the noise of a frame drawn from its own generator) [B]
+    - out: Output array (may be x)                              [T] or [B x T]
+    - buffer: Preallocated noise buffer, real type of x         [B x 2 x T]
+
+    Returns:
+    - y: The noisy waveforms
+    """
+    x2 = x.reshape(-1, x.shape[-1])
+    B, T = x2.shape
+    real_dtype = np.finfo(x.dtype).dtype if np.iscomplexobj(x) else np.dtype(np.float64)
+    if buffer is None or buffer.shape != (B, 2, T) or buffer.dtype != real_dtype:
+        buffer = np.empty((B, 2, T), dtype=real_dtype)
+    if isinstance(generator, np.random.Generator):
+        generator.standard_normal(dtype=real_dtype, out=buffer)
+    else:
+        for generator_b, buffer_b in zip(generator, buffer, strict=True):
+            generator_b.standard_normal(dtype=real_dtype, out=buffer_b)
+    buffer *= np.broadcast_to(np.asarray(noise_std, dtype=real_dtype).reshape(-1, 1, 1), (B, 1, 1))
+
+    if out is None:
+        out = np.empty(x.shape, dtype=np.result_type(x.dtype, np.complex64))
+    if out is not x:
+        out[...] = x
+    out2 = out.reshape(B, T)
+    out2.real += buffer[:, 0]
+    out2.imag += buffer[:, 1]
+    return out
+
+
+def apply_multipath(x: np.ndarray, h: np.ndarray, out: np.ndarray = None, fft_taps: int = FFT_CONVOLUTION_TAPS) -> np.ndarray:
+    """
+    Filter a batch of waveforms by a multipath channel, truncated to the length of the waveforms.
+
+    Sparse channels (a few paths, possibly long delays) are applied as a sum of scaled and shifted
+    copies of the waveforms, dense channels with an overlap-add FFT convolution.
+
+    Parameters:
+    - x: Waveforms                                              [T] or [B x T]
+    - h: Impulse response, shared or one per frame              [L] or [B x L]
+    - out: Output array (must not be x)                         [T] or [B x T]
+    - fft_taps: Number of non-zero taps above which the FFT convolution is used
+
+    Returns:
+    - y: The filtered waveforms
+    """
+    if out is None:
+        out = np.empty(x.shape, dtype=np.result_type(x.dtype, np.complex64))
+    if np.shares_memory(out, x):
+        raise ValueError("The multipath channel cannot be applied in place")
+    x2 = x.reshape(-1, x.shape[-1])
+    out2 = out.reshape(x2.shape)
+    T = x2.shape[1]
+    h2 = np.asarray(h, dtype=out.dtype).reshape(-1, h.shape[-1])
+
+    taps = np.flatnonzero(np.any(h2 != 0, axis=0))
+    if len(taps) > fft_taps:
+        out2[...] = oaconvolve(x2, h2, mode="full", axes=-1)[:, :T]
+        return out
+
+    out2[...] = 0
+    for delay in taps[taps < T]:
+        out2[:, delay:] += h2[:, delay:delay + 1] * x2[:, :T - delay]
+    return out
+
+
+class ChannelSimulator:
+    """
+    Batched channel simulator: multipath channel followed by AWGN with a per-frame SNR, applied on a
+    (B x T) batch of waveforms at once.
+
+    The output buffer (and the noise buffer) are allocated at the first call and reused by the next
+    calls with the same batch shape. The simulator draws from its own generator, so a run is
+    reproducible from its seed (int, `np.random.SeedSequence` or generator), or from one generator per
+    frame, so the noise of a frame does not depend on the other frames of the batch.
+    """
+
+    def __init__(self, gains=(1,), delays=(0,), phases=None, normalize: bool = True, dtype: type = np.complex128,
+                 seed=None, fft_taps: int = FFT_CONVOLUTION_TAPS) -> None:
+        """
+        Initialize a ChannelSimulator.
+
+        Parameters:
+        - gains: Gain of each path (see `get_impulse_response`)       [P] or [B x P]
+        - delays: Delay of each path                                  [# of samples] [P]
+        - phases: Phase of each path, None for real gains             [rad] [P] or [B x P]
+        - normalize: Normalize the impulse response(s) to a unit energy
+        - dtype: Complex type of the output                           [complex64, complex128]
+        - seed: Seed of the noise generator                           [int, SeedSequence, Generator]
+                or one generator per frame of the batches               [B]
+        - fft_taps: Number of non-zero taps above which the FFT convolution is used
+        """
+        self.h = get_impulse_response(gains, delays, phases, normalize)
+        self.dtype = np.dtype(dtype)
+        if isinstance(seed, (list, tuple)) and seed and all(isinstance(g, np.random.Generator) for g in seed):
+            self.generator = list(seed)
+        else:
+            self.generator = np.random.default_rng(seed)
+        self.fft_taps = fft_taps
+        self._out = None
+        self._noise = None
+
+    @property
+    def is_flat(self) -> bool:
+        """
+        True if the channel is a single path without delay.
+        """
+        return self.h.shape[-1] == 1
+
+    def apply(self, x: np.ndarray, snr_db=np.inf, signal_power=None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Simulate the channel on a batch of waveforms.
+
+        Parameters:
+        - x: Transmitted waveforms                                    [T] or [B x T]
+        - snr_db: SNR (scalar or per frame [B]), inf for no noise     [dB]
+        - signal_power: Power of the signal used as SNR reference (scalar or per frame [B]),
+                        by default the mean power of each waveform
+        - out: Output array [B x T], by default the internal buffer of the simulator is returned:
+               it is overwritten at the next call (copy it to keep it)
+
+        Returns:
+        - y: The received waveforms                                   [T] or [B x T]
+        """
+        if out is None:
+            if self._out is None or self._out.shape != x.shape:
+                self._out = np.empty(x.shape, dtype=self.dtype)
+            out = self._out
+
+        if self.is_flat:
+            np.multiply(x, self.h, out=out)
+        else:
+            apply_multipath(x, self.h, out=out, fft_taps=self.fft_taps)
+
+        snr_db = np.asarray(snr_db, dtype=float)
+        if np.all(np.isinf(snr_db)):
+            return out
+        if signal_power is None:
+            signal_power = np.mean(np.abs(x.reshape(-1, x.shape[-1])) ** 2, axis=-1)
+        x2 = out.reshape(-1, out.shape[-1])
+        if self._noise is None or self._noise.shape != (x2.shape[0], 2, x2.shape[1]):
+            self._noise = np.empty((x2.shape[0], 2, x2.shape[1]), dtype=np.finfo(self.dtype).dtype)
+        return add_awgn(out, get_noise_std(snr_db, signal_power), self.generator, out=out, buffer=self._noise)
@@ -0,0 +1,204 @@
+import lzma
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+"""
+Note: Lossless compressed capture. The interleaved I/Q components are cut in blocks of a fixed number
+      of samples, each block is byte-shuffled (all the low bytes, then all the high bytes, ...: the
+      high bytes of idle noise are mostly 0x00/0xFF and compress well) and compressed independently.
+      An index of the block offsets at the end of the file gives random access to any sample range.
+
+      offset  size  field
+      0       8     magic "RFNOCCZC"
+      8       2     version (uint16)
+      10      2     sample format (uint16): 0 = fc32, 1 = sc16
+      12      2     codec (uint16): 0 = zlib, 1 = lzma
+      14      2     reserved
+      16      8     number of samples (uint64)
+      24      4     number of samples per block (uint32)
+      28      4     number of blocks (uint32)
+      32      8     byte offset of the index (uint64)
+      40      24    reserved (zeros)
+      64            compressed blocks
+      index         n_blocks + 1 block offsets (uint64), the last one is the offset of the index
+"""
+
+COMPRESSED_MAGIC = b"RFNOCCZC"
+COMPRESSED_VERSION = 1
+COMPRESSED_HEADER_SIZE = 64
+COMPRESSED_FORMATS = {"fc32": np.float32, "sc16": np.int16}
+COMPRESSED_CODECS = ("zlib", "lzma")
+
+# Default number of samples per block (256 KiB of sc16 samples)
+COMPRESSED_BLOCK_SAMPLES = 1 << 16
+
+_HEADER_STRUCT = struct.Struct("<8sHHHxxQIIQ24x")
+
+
+def _shuffle(iq: np.ndarray) -> bytes:
+    """
+    Byte-shuffle I/Q components: byte 0 of every component, then byte 1, ...
+    """
+    data = np.ascontiguousarray(iq).view(np.uint8).reshape(-1, iq.dtype.itemsize)
+    return np.ascontiguousarray(data.T).tobytes()
+
+
+def _unshuffle(data: bytes, dtype: np.dtype) -> np.ndarray:
+    """
+    Inverse of `_shuffle`: the I/Q components [n x 2].
+    """
+    shuffled = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(shuffled.T).view(dtype).reshape(-1, 2)
+
+
+def _compress_block(iq: np.ndarray, codec: str, level: int) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(_shuffle(iq), level)
+    return lzma.compress(_shuffle(iq), preset=level)
+
+
+def _decompress_block(data: bytes, codec: str, dtype: np.dtype) -> np.ndarray:
+    raw = zlib.decompress(data) if codec == "zlib" else lzma.decompress(data)
+    return _unshuffle(raw, dtype)
+
+
+def is_compressed_capture(path: str) -> bool:
+    """
+    True if the file starts with the compressed capture magic.
+    """
+    with open(path, "rb") as file:
+        return file.read(len(COMPRESSED_MAGIC)) == COMPRESSED_MAGIC
+
+
+def compress_capture(src, dst: str, fmt: str = "sc16", block_samples: int = COMPRESSED_BLOCK_SAMPLES,
+                     codec: str = "zlib", level: int = 6, workers: int = None) -> int:
+    """
+    Compress a raw capture (e.g. a `rx_to_file` .dat file). The blocks are compressed in a thread
+    pool (zlib and lzma release the GIL) and written in order.
+
+    Parameters:
+    - src: Raw capture file, or interleaved I/Q components [n x 2]
+    - dst: Compressed capture
+    - fmt: Sample format                                    [fc32, sc16]
+    - block_samples: Number of samples per block            [# of samples] >= 1
+    - codec: Compression codec                              [zlib, lzma]
+    - level: Compression level (zlib: 0-9, lzma preset: 0-9)
+    - workers: Number of compression threads (default: number of CPUs)
+
+    Returns:
+    - size: Size of the compressed capture [bytes]
+    """
+    if fmt not in COMPRESSED_FORMATS or codec not in COMPRESSED_CODECS or block_samples < 1:
+        raise ValueError(f"Invalid compressed capture parameters: {fmt}, {codec}, {block_samples}")
+    dtype = np.dtype(COMPRESSED_FORMATS[fmt])
+    if isinstance(src, (str, os.PathLike)):
+        n_samples = os.path.getsize(src) // (2 * dtype.itemsize)
+        iq = np.memmap(src, dtype=dtype, mode="r", shape=(n_samples, 2)) if n_samples else np.empty((0, 2), dtype)
+    else:
+        iq = np.asarray(src, dtype=dtype).reshape(-1, 2)
+    n_samples = iq.shape[0]
+    starts = range(0, n_samples, block_samples)
+
+    offsets = [COMPRESSED_HEADER_SIZE]
+    with open(dst, "wb") as file, ThreadPoolExecutor(max_workers=workers) as executor:
+        file.write(b"\0" * COMPRESSED_HEADER_SIZE)
+        blocks = executor.map(lambda start: _compress_block(iq[start:start + block_samples], codec, level), starts)
+        for block in blocks:
+            file.write(block)
+            offsets.append(offsets[-1] + len(block))
+        file.write(np.asarray(offsets, dtype="<u8").tobytes())
+        file.seek(0)
+        file.write(_HEADER_STRUCT.pack(COMPRESSED_MAGIC, COMPRESSED_VERSION, list(COMPRESSED_FORMATS).index(fmt),
+                                       COMPRESSED_CODECS.index(codec), n_samples, block_samples, len(starts),
+                                       offsets[-1]))
+        return offsets[-1] + 8 * len(offsets)
+
+
+class CompressedCapture:
+    """
+    Compressed capture opened for reading. Slicing it (`capture[start:stop]`) returns the interleaved
+    I/Q components of the samples [start, stop[ [n x 2], like a memory map of the raw capture (see
+    `capture.map_samples`): only the blocks overlapping the range are read and decompressed, in a
+    thread pool when there are several of them.
+    """
+
+    def __init__(self, path: str, workers: int = None) -> None:
+        """
+        Open a compressed capture.
+
+        Parameters:
+        - path: Compressed capture
+        - workers: Number of decompression threads (default: number of CPUs)
+        """
+        self.path = path
+        self.workers = workers
+        self._file = open(path, "rb")
+        header = os.pread(self._file.fileno(), COMPRESSED_HEADER_SIZE, 0)
+        if header[:len(COMPRESSED_MAGIC)] != COMPRESSED_MAGIC:
+            self._file.close()
+            raise ValueError(f"Not a compressed capture: {path}")
+        _, version, fmt, codec, n_samples, block_samples, n_blocks, index_offset = _HEADER_STRUCT.unpack(header)
+        if version != COMPRESSED_VERSION:
+            self._file.close()
+            raise ValueError(f"Unsupported compressed capture version: {version}")
+
+        self.fmt = list(COMPRESSED_FORMATS)[fmt]
+        self.codec = COMPRESSED_CODECS[codec]
+        self.dtype = np.dtype(COMPRESSED_FORMATS[self.fmt])
+        self.n_samples = n_samples
+        self.block_samples = block_samples
+        self.offsets = np.frombuffer(os.pread(self._file.fileno(), 8 * (n_blocks + 1), index_offset), dtype="<u8")
+        self._executor = None
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.n_samples, 2
+
+    def __len__(self) -> int:
+        return self.n_samples
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._file.close()
+
+    def __enter__(self) -> "CompressedCapture":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def read_block(self, i: int) -> np.ndarray:
+        """
+        Decompress the i-th block: its I/Q components [block_samples x 2] (fewer for the last block).
+        """
+        start, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+        return _decompress_block(os.pread(self._file.fileno(), stop - start, start), self.codec, self.dtype)
+
+    def __getitem__(self, key: slice) -> np.ndarray:
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("Compressed captures only support contiguous slices of samples")
+        start, stop, _ = key.indices(self.n_samples)
+        stop = max(start, stop)
+        out = np.empty((stop - start, 2), dtype=self.dtype)
+        if stop == start:
+            return out
+
+        first, last = start // self.block_samples, (stop - 1) // self.block_samples
+        blocks = range(first, last + 1)
+        if len(blocks) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            decompressed = self._executor.map(self.read_block, blocks)
+        else:
+            decompressed = map(self.read_block, blocks)
+        for i, block in zip(blocks, decompressed):
+            block_start = i * self.block_samples
+            lo, hi = max(start, block_start), min(stop, block_start + len(block))
+            out[lo - start:hi - start] = block[lo - block_start:hi - block_start]
+        return out
@@ -0,0 +1,113 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .catalog import build_catalog
+from .ofdm_frame import ofdmFrame
+
+# Reference frame of the worker processes, set once per worker by `_init_worker`
+_worker_reference = None
+_worker_fmt = None
+
+
+def _init_worker(reference: ofdmFrame, fmt: str) -> None:
+    """
+    Process pool initializer: keep the reference frame in the worker, so that it is sent once per
+    worker instead of once per capture.
+    """
+    global _worker_reference, _worker_fmt
+    _worker_reference = reference
+    _worker_fmt = fmt
+
+
+def _run_pipeline(pipeline, path: str, capture: dict) -> dict:
+    """
+    Load a capture in a copy of the worker reference frame and run the pipeline on it.
+    """
+    ofdm_frame = copy.copy(_worker_reference)
+    ofdm_frame.load_tysmbol_bin(path, type=_worker_fmt)
+    result = pipeline(ofdm_frame, capture)
+    return result if isinstance(result, dict) else {"Result": result}
+
+
+class CaptureDataset:
+    """
+    The captures of a measurement folder (e.g. a `rx_to_file --nbr_meas` campaign) received with the
+    same reference frame, in measurement order.
+
+    `map` runs a processing pipeline (synchronization, demodulation, BER, ...) on every capture in a
+    process pool and gathers the results in a single table. Each capture is loaded in a shallow copy
+    of the reference frame: the transmitted symbols and bits are shared, only the received signal and
+    the attributes computed from it belong to the copy (pipelines must not modify the reference
+    arrays in place).
+    """
+
+    def __init__(self, folder: str, reference: ofdmFrame, fmt: str = "fc32", catalog: pd.DataFrame = None) -> None:
+        """
+        Initialize a CaptureDataset.
+
+        Parameters:
+        - folder: Measurement folder
+        - reference: Reference (transmitted) frame of the campaign
+        - fmt: Sample format of the captures                        [fc32, sc16]
+        - catalog: Captures to process (default: every capture of the folder, from its persisted index, see `catalog.build_catalog`)
+        """
+        self.folder = folder
+        self.reference = reference
+        self.fmt = fmt
+        if catalog is None:
+            catalog = build_catalog(folder, recursive=False)
+            catalog = catalog[catalog["Format"].isna() | (catalog["Format"] == fmt)]
+        self.catalog = catalog.sort_values(["Meas", "Filename"], na_position="last", ignore_index=True)
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    @property
+    def paths(self) -> list[str]:
+        """
+        Paths of the captures, in measurement order.
+        """
+        return [os.path.join(self.folder, filename) for filename in self.catalog["Filename"]]
+
+    def load(self, i: int) -> ofdmFrame:
+        """
+        Load the i-th capture in a copy of the reference frame.
+        """
+        ofdm_frame = copy.copy(self.reference)
+        ofdm_frame.load_tysmbol_bin(self.paths[i], type=self.fmt)
+        return ofdm_frame
+
+    def map(self, pipeline, workers: int = None, chunksize: int = 1, output: str = None) -> pd.DataFrame:
+        """
+        Run a pipeline on every capture of the dataset.
+
+        Parameters:
+        - pipeline: Function (ofdm_frame, capture) -> dict of results (or a single value), where ofdm_frame
+                    holds the received signal and capture is the catalog row of the capture (dict). It
+                    must be defined at the top level of a module to be sent to the worker processes.
+        - workers: Number of worker processes (default: number of CPUs), 1 to run in the calling process
+        - chunksize: Number of captures sent to a worker at once
+        - output: CSV file to write the results to
+
+        Returns:
+        - results: One row per capture, in measurement order: Filename, Meas and the pipeline results
+        """
+        captures = self.catalog.to_dict("records")
+        paths = self.paths
+        if workers == 1 or len(captures) <= 1:
+            _init_worker(self.reference, self.fmt)
+            results = [_run_pipeline(pipeline, path, capture) for path, capture in zip(paths, captures)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.reference, self.fmt)) as executor:
+                results = list(executor.map(_run_pipeline, [pipeline] * len(paths), paths, captures, chunksize=chunksize))
+
+        df = pd.DataFrame(results)
+        df.insert(0, "Filename", self.catalog["Filename"].to_numpy())
+        df.insert(1, "Meas", self.catalog["Meas"].to_numpy())
+        if output is not None:
+            df.to_csv(output, index=False)
+        return df
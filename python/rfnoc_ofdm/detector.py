@@ -1,4 +1,18 @@
+from dataclasses import dataclass, field
+
 import numpy as np
+import pandas as pd
+
+"""
+Note: `find_max_idx` is the reference detector (same state machine as the FPGA): a detection run starts
+      at the first sample above the threshold and ends at the first sample below it, the detection is
+      the first maximum of the run. `sweep_thresholds` gives the detections of the same state machine for
+      a whole vector of thresholds in one pass over each metric.
+"""
+
+# Number of samples searched at once (doubled at each step) for the end of a detection run
+RUN_END_CHUNK = 4096
+
 
 def find_max_idx(metric: np.ndarray, threshold: float) -> int:
     """
@@ -21,3 +35,162 @@ def find_max_idx(metric: np.ndarray, threshold: float) -> int:
                 max_value = metric[i]
                 max_idx = i
     return max_idx
+
+
+def find_run_end(metric: np.ndarray, start: int, threshold: float) -> int:
+    """
+    Index of the first sample after start below the threshold (len(metric) if none), searched by
+    chunks of growing size so that only the detection run is read.
+    """
+    stop, size = start + 1, RUN_END_CHUNK
+    while stop < len(metric):
+        below = np.flatnonzero(metric[stop:stop + size] < threshold)
+        if below.size:
+            return stop + int(below[0])
+        stop += size
+        size *= 2
+    return len(metric)
+
+
+def find_max_idx_thresholds(metric: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """
+    `find_max_idx` for a vector of thresholds, in one pass over the metric.
+
+    The run of a threshold starts at the first sample where the running maximum of the metric exceeds
+    it: one `searchsorted` on the running maximum gives the start of every threshold, and the thresholds
+    sharing a start (between two records of the running maximum) share their run. For each start, the
+    run is read once up to its end for the lowest of these thresholds: the end of every other threshold
+    is found with a `searchsorted` on the running minimum of the run, and its detection with a
+    `searchsorted` on the positions of the records of the running maximum of the run.
+
+    Parameters:
+    - metric: Detection metric (any real type, e.g. a memory mapped metricLSB.int32 capture)  [L]
+    - thresholds: Thresholds                                                                  [T]
+
+    Returns:
+    - detection_idx: Detection index for each threshold, -1 if no detection                  [T]
+    """
+    metric = np.asarray(metric)
+    thresholds = np.asarray(thresholds)
+    detection_idx = np.full(len(thresholds), -1, dtype=np.int64)
+    if len(metric) == 0 or len(thresholds) == 0:
+        return detection_idx
+
+    order = np.argsort(thresholds, kind="stable")
+    sorted_thresholds = thresholds[order]
+    starts = np.searchsorted(np.maximum.accumulate(metric), sorted_thresholds, side="right")
+
+    group_bounds = np.flatnonzero(np.diff(starts)) + 1
+    for first, last in zip(np.r_[0, group_bounds], np.r_[group_bounds, len(starts)]):
+        start = int(starts[first])
+        if start == len(metric):
+            break  # Thresholds above the maximum of the metric (and all the higher ones)
+        group = sorted_thresholds[first:last]
+        run = metric[start:find_run_end(metric, start, group[0])]
+
+        # End of the run of each threshold: first sample of the run (after the start) below it
+        running_min = np.minimum.accumulate(run[1:])
+        ends = 1 + len(running_min) - np.searchsorted(running_min[::-1], group, side="left")
+
+        # Detection: first maximum of the run before its end
+        running_max = np.maximum.accumulate(run)
+        records = np.flatnonzero(np.r_[True, run[1:] > running_max[:-1]])
+        detections = records[np.searchsorted(records, ends - 1, side="right") - 1]
+        detection_idx[order[first:last]] = start + detections
+    return detection_idx
+
+
+@dataclass(frozen=True, eq=False)
+class ThresholdSweep:
+    """
+    Detection performance of a threshold detector over a set of trials, for a vector of thresholds.
+
+    A trial is a correct detection when the detection is within `tolerance` samples of the true index,
+    a false alarm when the detector triggers anywhere else (e.g. on noise before the preamble), and a
+    miss when it does not trigger.
+
+    Attributes:
+    - thresholds: Thresholds, in increasing order                                     [T]
+    - detection_idx: Detection index of each trial and threshold, -1 if none          [B x T]
+    - true_idx: True index of each trial                                              [B]
+    - tolerance: Maximum timing error of a correct detection                          [# of samples]
+    - p_detection, p_false_alarm, p_miss: Probabilities for each threshold            [T]
+    """
+    thresholds: np.ndarray = field(repr=False)
+    detection_idx: np.ndarray = field(repr=False)
+    true_idx: np.ndarray = field(repr=False)
+    tolerance: int
+    p_detection: np.ndarray = field(repr=False)
+    p_false_alarm: np.ndarray = field(repr=False)
+    p_miss: np.ndarray = field(repr=False)
+
+    @property
+    def errors(self) -> np.ndarray:
+        """
+        Timing error of each trial and threshold (detection - true index), NaN if no detection  [B x T]
+        """
+        errors = (self.detection_idx - self.true_idx[:, np.newaxis]).astype(float)
+        errors[self.detection_idx < 0] = np.nan
+        return errors
+
+    def error_quantiles(self, q=(0.05, 0.5, 0.95)) -> np.ndarray:
+        """
+        Quantiles of the timing error of the detected trials, for each threshold  [len(q) x T]
+        """
+        errors = self.errors
+        quantiles = np.full((len(q), len(self.thresholds)), np.nan)
+        detected = np.any(~np.isnan(errors), axis=0)
+        quantiles[:, detected] = np.nanquantile(errors[:, detected], q, axis=0)
+        return quantiles
+
+    def recommend(self, max_false_alarm: float = None) -> float:
+        """
+        Recommended threshold: the best detection probability (with at most `max_false_alarm` false
+        alarms), or the best p_detection - p_false_alarm if not given. Among the thresholds reaching
+        the best score, the middle of the widest range is returned, for a margin on both sides.
+        Returns NaN if no threshold meets the false alarm constraint.
+        """
+        if max_false_alarm is None:
+            score = self.p_detection - self.p_false_alarm
+        else:
+            score = np.where(self.p_false_alarm <= max_false_alarm, self.p_detection, -np.inf)
+        if not np.any(np.isfinite(score)):
+            return np.nan
+        best = np.r_[False, np.isclose(score, np.max(score)), False]
+        bounds = np.flatnonzero(np.diff(best.astype(np.int8)))
+        first, last = max(zip(bounds[::2], bounds[1::2] - 1), key=lambda b: b[1] - b[0])
+        return float((self.thresholds[first] + self.thresholds[last]) / 2)
+
+    def roc(self) -> pd.DataFrame:
+        """
+        ROC table: one row per threshold with the detection, false alarm and miss probabilities, and
+        the median and 5% - 95% quantiles of the timing error.
+        """
+        low, median, high = self.error_quantiles()
+        return pd.DataFrame({"Threshold": self.thresholds, "Pd": self.p_detection, "Pfa": self.p_false_alarm,
+                             "Pmiss": self.p_miss, "Error median": median, "Error q05": low, "Error q95": high})
+
+
+def sweep_thresholds(metrics, thresholds: np.ndarray, true_idx, tolerance: int = 0) -> ThresholdSweep:
+    """
+    Sweep the threshold of the detector (`find_max_idx`) over a set of trials, in one pass over each
+    metric (see `find_max_idx_thresholds`).
+
+    Parameters:
+    - metrics: Metric of each trial, from simulations or captures          [B x L] or list of [L]
+    - thresholds: Thresholds                                                [T]
+    - true_idx: True detection index (scalar or per trial [B])
+    - tolerance: Maximum timing error of a correct detection                [# of samples]
+
+    Returns:
+    - sweep: Detection performance for each threshold (thresholds sorted in increasing order)
+    """
+    thresholds = np.sort(np.asarray(thresholds, dtype=float))
+    detection_idx = np.stack([find_max_idx_thresholds(metric, thresholds) for metric in metrics])
+    true_idx = np.broadcast_to(np.asarray(true_idx, dtype=np.int64), (detection_idx.shape[0],))
+
+    detected = detection_idx >= 0
+    correct = detected & (np.abs(detection_idx - true_idx[:, np.newaxis]) <= tolerance)
+    return ThresholdSweep(thresholds=thresholds, detection_idx=detection_idx, true_idx=true_idx, tolerance=tolerance,
+                          p_detection=np.mean(correct, axis=0), p_false_alarm=np.mean(detected & ~correct, axis=0),
+                          p_miss=np.mean(~detected, axis=0))
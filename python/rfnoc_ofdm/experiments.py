@@ -0,0 +1,226 @@
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from .ber import BerAccumulator
+from .ofdm_frame import ofdmFrame
+
+"""
+Note: Monte Carlo experiments. A sweep runs `n_trials` trials on each point of a parameter grid. Trial i
+      of the sweep (points in grid order, trials in order within a point) draws from its own generator,
+      seeded with the i-th child of the sweep SeedSequence (`SeedSequence(seed).spawn(...)[i]`): a
+      trial gives the same result whatever the number of workers, the chunking or the trials already
+      done, so an interrupted sweep can be resumed from its output file.
+
+      The output is a CSV file, or a Parquet file (requires pyarrow) when its name ends with
+      ".parquet". The results are checkpointed after each chunk of trials (in the CSV file itself, or
+      in "<output>.partial.csv" until the Parquet file is written). The grid, n_trials and seed of the
+      sweep are written in "<output>.experiment.json": a sweep only resumes from an output of the same
+      sweep, and the parameters of the resumed trials are restored from the grid (e.g. tuples, which
+      do not round-trip through a CSV file).
+"""
+
+# Number of trials sent to a worker at once
+EXPERIMENT_CHUNK_TRIALS = 16
+
+
+def get_parameter_grid(grid: dict) -> list[dict]:
+    """
+    Points of a parameter grid: the cartesian product of the values of each parameter, the last
+    parameter varying the fastest (e.g. {"Modulation": ["BPSK", "QPSK"], "SNR": [0, 10]}).
+    A scalar value is a parameter with a single value.
+    """
+    names = list(grid)
+    values = [value if isinstance(value, (list, tuple, np.ndarray, range)) else [value] for value in grid.values()]
+    return [dict(zip(names, point)) for point in itertools.product(*values)]
+
+
+def get_trial_generator(seed: int, index: int) -> np.random.Generator:
+    """
+    Generator of the index-th trial of a sweep (same stream as the index-th child of `SeedSequence(seed).spawn`).
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+
+def _run_chunk(trial, seed: int, params: dict, first: int, indices: list[int], vectorized: bool) -> list[dict]:
+    """
+    Run the trials of a chunk (all on the same grid point) and build their result rows.
+    """
+    generators = [get_trial_generator(seed, index) for index in indices]
+    if vectorized:
+        results = trial(params, generators)
+    else:
+        results = [trial(params, generator) for generator in generators]
+
+    rows = []
+    for index, result in zip(indices, results):
+        row = {"Index": index, **params, "Trial": index - first}
+        row.update(result if isinstance(result, dict) else {"Result": result})
+        rows.append(row)
+    return rows
+
+
+def get_sweep_fingerprint(points: list[dict], n_trials: int, seed: int) -> str:
+    """
+    Description of a sweep (JSON), written next to its output to check that a resumed sweep is the same.
+    """
+    return json.dumps({"grid": points, "n_trials": n_trials, "seed": seed}, sort_keys=True, default=str)
+
+
+def _read_results(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def run_experiment(trial, grid: dict, n_trials: int = 1, seed: int = 0, workers: int = None,
+                   chunksize: int = EXPERIMENT_CHUNK_TRIALS, output: str = None, resume: bool = True,
+                   vectorized: bool = False, desc: str = None) -> pd.DataFrame:
+    """
+    Run a Monte Carlo sweep: n_trials trials on each point of a parameter grid, in a process pool.
+
+    Parameters:
+    - trial: Function (params, generator) -> dict of results (or a single value), where params is the
+             grid point (dict) and generator the random generator of the trial (seed the frames with
+             `int(generator.integers(2**32))`). It must be defined at the top level of a module to be
+             sent to the worker processes.
+    - grid: Parameter grid (see `get_parameter_grid`)
+    - n_trials: Number of trials per grid point
+    - seed: Seed of the sweep
+    - workers: Number of worker processes (default: number of CPUs), 1 to run in the calling process
+    - chunksize: Number of trials sent to a worker at once (chunks never span two grid points)
+    - output: CSV or Parquet file to write the results to (and to resume the sweep from)
+    - resume: Skip the trials already in the output file, which must come from the same sweep (same grid,
+              n_trials and seed, see "<output>.experiment.json"), False to run the whole sweep again
+    - vectorized: The trial function runs a whole chunk at once: (params, generators) -> list of results
+    - desc: Description of the progress bar
+
+    Returns:
+    - results: One row per trial, in sweep order: Index (of the trial in the sweep), the parameters,
+               Trial (index within the grid point) and the trial results
+    """
+    if n_trials < 1 or chunksize < 1:
+        raise ValueError("Invalid experiment parameters")
+    points = get_parameter_grid(grid)
+    checkpoint = None
+    if output is not None:
+        checkpoint = output + ".partial.csv" if output.endswith(".parquet") else output
+
+    # Trials already done, only resumed from an output of the same sweep
+    done = []
+    if output is not None:
+        fingerprint = get_sweep_fingerprint(points, n_trials, seed)
+        fingerprint_path = output + ".experiment.json"
+        previous = [path for path in dict.fromkeys([output, checkpoint]) if os.path.exists(path)]
+        if resume and previous:
+            previous_fingerprint = None
+            if os.path.exists(fingerprint_path):
+                with open(fingerprint_path) as file:
+                    previous_fingerprint = file.read()
+            if previous_fingerprint != fingerprint:
+                raise ValueError(f"{output} holds the results of another sweep (grid, n_trials or seed), "
+                                 f"run with resume=False to overwrite it")
+            done = [_read_results(path) for path in previous]
+        elif checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        with open(fingerprint_path, "w") as file:
+            file.write(fingerprint)
+    done = pd.concat(done, ignore_index=True).drop_duplicates("Index") if done else pd.DataFrame(columns=["Index"])
+    done_indices = set(done["Index"].astype(int))
+    for name in (points[0] if points and not done.empty else {}):
+        done[name] = [points[int(index) // n_trials][name] for index in done["Index"]]
+
+    # Chunks of trials still to run
+    chunks = []
+    for i, params in enumerate(points):
+        first = i * n_trials
+        indices = [index for index in range(first, first + n_trials) if index not in done_indices]
+        for start in range(0, len(indices), chunksize):
+            chunks.append((params, first, indices[start:start + chunksize]))
+
+    rows = []
+    n_todo = sum(len(indices) for _, _, indices in chunks)
+    header = checkpoint is not None and not os.path.exists(checkpoint)
+    with tqdm(total=n_todo, desc=desc, disable=n_todo == 0) as progress:
+        def collect(chunk_rows: list[dict]) -> None:
+            nonlocal header
+            rows.extend(chunk_rows)
+            progress.update(len(chunk_rows))
+            if checkpoint is not None:
+                pd.DataFrame(chunk_rows).to_csv(checkpoint, mode="a", header=header, index=False)
+                header = False
+
+        if workers == 1 or len(chunks) <= 1:
+            for params, first, indices in chunks:
+                collect(_run_chunk(trial, seed, params, first, indices, vectorized))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_run_chunk, trial, seed, params, first, indices, vectorized)
+                           for params, first, indices in chunks]
+                for future in as_completed(futures):
+                    collect(future.result())
+
+    results = pd.concat([frame for frame in (done, pd.DataFrame(rows)) if not frame.empty], ignore_index=True)
+    results = results.sort_values("Index", ignore_index=True)
+    if output is not None and output.endswith(".parquet"):
+        results.to_parquet(output, index=False)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    elif output is not None:
+        results.to_csv(output, index=False)
+    return results
+
+
+def sweep_ber_snr(SNRs, modulations=("BPSK", "QPSK"), n_frames: int = 1, frame_params: dict = None,
+                  demodulation: dict = None, first_seed: int = 0, max_errors: int = 100, max_bits: float = 1e7,
+                  output: str = None) -> pd.DataFrame:
+    """
+    BER vs SNR sweep. Each reference frame is generated once and all the SNRs still running are
+    simulated on it as one batch (see `ofdmFrame.count_bit_errors_snrs`). Each SNR point stops
+    independently after `max_errors` errors or `max_bits` bits (see `ber.BerAccumulator`), or after
+    n_frames frames (n_frames must be large enough for max_bits: each frame carries the data bits of the
+    payload, e.g. 256k bits for 250 BPSK symbols of 1024 subcarriers).
+
+    Parameters:
+    - SNRs: SNR values                                                         [dB]
+    - modulations: Payload modulation schemes                                  [BPSK, QPSK, 16QAM, 16PSK]
+    - n_frames: Maximum number of frames per SNR point
+    - frame_params: Parameters of the frames (see `ofdmFrame`, except payload_mod and random_seed)
+    - demodulation: Parameters of the demodulation (see `ofdmFrame.demodulate_frame`),
+                    by default the preamble is removed: {"remove_first_symbol": True}
+    - first_seed: Random seed of the first frame, frame i uses first_seed + i
+    - max_errors: Stop an SNR point after this number of errors
+    - max_bits: Stop an SNR point after this number of bits
+    - output: CSV file to write the results to
+
+    Returns:
+    - results: One row per (modulation, SNR): Modulation, SNR, BER, BER low, BER high (bounds of the
+               confidence interval of `ber.BerAccumulator`), Errors, Bits, Frames
+               (the input of `plotting.plot_ber_vs_snr`)
+    """
+    SNRs = np.asarray(SNRs, dtype=float)
+    frame_params = {} if frame_params is None else frame_params
+    demodulation = {"remove_first_symbol": True, **({} if demodulation is None else demodulation)}
+
+    rows = []
+    for mod in modulations:
+        accumulators = [BerAccumulator(max_errors=max_errors, max_bits=max_bits) for _ in SNRs]
+        for i in tqdm(range(n_frames), desc=f"Modulation: {mod}"):
+            running = [j for j, accumulator in enumerate(accumulators) if not accumulator.done]
+            if not running:
+                break
+            ofdm_frame = ofdmFrame(**frame_params, payload_mod=mod, random_seed=first_seed + i)
+            n_errors, n_bits = ofdm_frame.count_bit_errors_snrs(SNRs[running], **demodulation)
+            for j, errors in zip(running, n_errors):
+                accumulators[j].update(errors, n_bits)
+        rows.extend({"Modulation": mod, "SNR": snr, **accumulator.result()} for snr, accumulator in zip(SNRs, accumulators))
+
+    results = pd.DataFrame(rows, columns=["Modulation", "SNR", "BER", "BER low", "BER high", "Errors", "Bits", "Frames"])
+    if output is not None:
+        results.to_csv(output, index=False)
+    return results
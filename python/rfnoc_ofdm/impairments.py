@@ -0,0 +1,329 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from scipy import fft as sp_fft
+
+from .waveform import SC16_FULL_SCALE
+
+"""
+Note: Radio front-end impairments for the synchronization studies. Every stage works on a batch of
+      waveforms (B x T), one frame per row, with scalar or per-frame [B] parameters, and follows the
+      numpy `out=` convention of the channel functions (see `channel`): the result is written in `out`
+      when given, which may be the input itself, in a new array otherwise. An `ImpairmentPipeline`
+      writes the first stage in its output and runs the next ones in place, without intermediate copy.
+
+      The random stages draw from their own generator, seeded from an int, a `np.random.SeedSequence`
+      or a generator: a pipeline spawns one independent child sequence per stage from its seed.
+"""
+
+# Number of samples of the phasor blocks of the CFO recurrence (the phasors of a block are computed
+# with exp once per frame, the blocks are chained by a complex multiplication)
+CFO_BLOCK_SAMPLES = 1024
+
+
+def _prepare_output(x: np.ndarray, out: np.ndarray = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Allocate (or check) the output of a stage and copy the input in it.
+
+    Returns:
+    - out: The output array, shape of x
+    - x2: x as a batch                                             [B x T]
+    - out2: out as a batch                                         [B x T]
+    """
+    if out is None:
+        out = np.empty(x.shape, dtype=np.result_type(x.dtype, np.complex64))
+    elif out.shape != x.shape:
+        raise ValueError(f"The output shape {out.shape} does not match the input shape {x.shape}")
+    if out is not x:
+        out[...] = x
+    return out, x.reshape(-1, x.shape[-1]), out.reshape(-1, x.shape[-1])
+
+
+def _per_frame(value, B: int, dtype=float) -> np.ndarray:
+    """
+    Scalar or per-frame parameter as a column [B x 1].
+    """
+    value = np.asarray(value, dtype=dtype).reshape(-1, 1)
+    if value.shape[0] not in (1, B):
+        raise ValueError(f"Expected a scalar or {B} per-frame values, got {value.shape[0]}")
+    return np.broadcast_to(value, (B, 1))
+
+
+class Impairment(ABC):
+    """
+    Base class of the impairment stages: `apply(x, out=None)` impairs a batch of waveforms.
+    """
+
+    def __init__(self, seed=None) -> None:
+        self.reseed(seed)
+
+    def reseed(self, seed=None) -> None:
+        """
+        Reset the generator of the stage.
+
+        Parameters:
+        - seed: Seed of the generator                                 [int, SeedSequence, Generator]
+        """
+        self.generator = np.random.default_rng(seed)
+
+    @abstractmethod
+    def apply(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Impair a batch of waveforms [T] or [B x T] (written in out when given, which may be x).
+        """
+
+    def __call__(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        return self.apply(x, out)
+
+
+class CarrierFrequencyOffset(Impairment):
+    """
+    Carrier frequency offset: y[n] = x[n] exp(j (2 pi cfo n + phase)).
+
+    The phasors are not computed with one exp per sample: the phasors of a block of `block` samples
+    and the phasor of one block step are computed once per frame, and the waveform is rotated block
+    by block with the recurrence  rotation[k + 1] = rotation[k] * step.
+    """
+
+    def __init__(self, cfo, phase=0.0, random_phase: bool = False, block: int = CFO_BLOCK_SAMPLES, seed=None) -> None:
+        """
+        Initialize a CarrierFrequencyOffset.
+
+        Parameters:
+        - cfo: Frequency offset (scalar or per frame [B])             [cycles / sample] (CFO / sample rate)
+        - phase: Initial phase (scalar or per frame [B])              [rad]
+        - random_phase: Draw a uniform initial phase for each frame and each call (replaces phase)
+        - block: Number of samples of the phasor blocks
+        - seed: Seed of the generator of the random phases
+        """
+        super().__init__(seed)
+        self.cfo = cfo
+        self.phase = phase
+        self.random_phase = random_phase
+        self.block = block
+
+    def apply(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        out, x2, out2 = _prepare_output(x, out)
+        B, T = out2.shape
+        L = min(self.block, T)
+        cfo = _per_frame(self.cfo, B)
+        phase = self.generator.uniform(0, 2 * np.pi, (B, 1)) if self.random_phase else _per_frame(self.phase, B)
+
+        # Phasors of one block and rotation of each block (recurrence on the block step)
+        phasors = np.exp(2j * np.pi * cfo * np.arange(L)).astype(out.dtype)
+        n_blocks = -(-T // L)
+        rotations = np.empty((B, n_blocks), dtype=complex)
+        rotations[:, 0] = np.exp(1j * phase[:, 0])
+        rotations[:, 1:] = np.exp(2j * np.pi * cfo * L)
+        np.cumprod(rotations, axis=1, out=rotations)
+        rotations = rotations.astype(out.dtype)
+
+        n_full = T // L
+        if n_full:
+            blocks = out2[:, :n_full * L].reshape(B, n_full, L)
+            blocks *= phasors[:, None, :]
+            blocks *= rotations[:, :n_full, None]
+        if n_full * L < T:
+            tail = out2[:, n_full * L:]
+            tail *= phasors[:, :T - n_full * L]
+            tail *= rotations[:, -1:]
+        return out
+
+
+class TimingOffset(Impairment):
+    """
+    Fractional sample timing offset: y(t) = x(t - delay), applied as a linear phase in the frequency
+    domain. The waveforms are zero padded before the FFT, so that the delayed samples do not wrap
+    around, and the output is truncated to the length of the input.
+    """
+
+    def __init__(self, delay, workers: int = None, seed=None) -> None:
+        """
+        Initialize a TimingOffset.
+
+        Parameters:
+        - delay: Delay (scalar or per frame [B]), may be negative       [# of samples]
+        - workers: Number of FFT threads (default: 1)
+        - seed: Unused (deterministic stage)
+        """
+        super().__init__(seed)
+        self.delay = delay
+        self.workers = workers
+
+    def apply(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        if out is None:
+            out = np.empty(x.shape, dtype=np.result_type(x.dtype, np.complex64))
+        x2 = x.reshape(-1, x.shape[-1])
+        B, T = x2.shape
+        delay = _per_frame(self.delay, B)
+        n_fft = sp_fft.next_fast_len(T + int(np.ceil(np.max(np.abs(delay)))) + 1)
+
+        spectrum = sp_fft.fft(x2, n=n_fft, axis=-1, workers=self.workers)
+        spectrum *= np.exp(-2j * np.pi * sp_fft.fftfreq(n_fft) * delay)
+        delayed = sp_fft.ifft(spectrum, axis=-1, overwrite_x=True, workers=self.workers)
+        out.reshape(B, T)[...] = delayed[:, :T]
+        return out
+
+
+class PhaseNoise(Impairment):
+    """
+    Oscillator phase noise modeled as a Wiener process: the phase increments are independent Gaussian
+    samples of variance 2 pi linewidth / sample_rate.
+    """
+
+    def __init__(self, linewidth, sample_rate: float = 1.0, seed=None) -> None:
+        """
+        Initialize a PhaseNoise.
+
+        Parameters:
+        - linewidth: 3 dB linewidth of the oscillator (scalar or per frame [B])      [Hz]
+        - sample_rate: Sample rate (1 for a linewidth normalized to the sample rate)  [Hz]
+        - seed: Seed of the generator of the phase increments
+        """
+        super().__init__(seed)
+        self.linewidth = linewidth
+        self.sample_rate = sample_rate
+        self._phase = None
+
+    def apply(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        out, x2, out2 = _prepare_output(x, out)
+        B, T = out2.shape
+        real_dtype = np.finfo(out.dtype).dtype
+        if self._phase is None or self._phase.shape != (B, T) or self._phase.dtype != real_dtype:
+            self._phase = np.empty((B, T), dtype=real_dtype)
+
+        std = np.sqrt(2 * np.pi * _per_frame(self.linewidth, B) / self.sample_rate)
+        self.generator.standard_normal(dtype=real_dtype, out=self._phase)
+        self._phase *= std.astype(real_dtype)
+        np.cumsum(self._phase, axis=1, out=self._phase)
+        out2 *= np.exp(1j * self._phase)
+        return out
+
+
+class IQImbalance(Impairment):
+    """
+    Receiver IQ imbalance: the in-phase branch is ideal, the quadrature branch has a gain error and a
+    phase error,  y_I = x_I  and  y_Q = g (x_Q cos(phi) - x_I sin(phi)).
+    """
+
+    def __init__(self, amplitude_db=0.0, phase_deg=0.0, seed=None) -> None:
+        """
+        Initialize an IQImbalance.
+
+        Parameters:
+        - amplitude_db: Gain of the quadrature branch (scalar or per frame [B])      [dB]
+        - phase_deg: Phase error of the quadrature branch (scalar or per frame [B])  [deg]
+        - seed: Unused (deterministic stage)
+        """
+        super().__init__(seed)
+        self.amplitude_db = amplitude_db
+        self.phase_deg = phase_deg
+        self._buffer = None
+
+    def apply(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        out, x2, out2 = _prepare_output(x, out)
+        B, T = out2.shape
+        real_dtype = np.finfo(out.dtype).dtype
+        if self._buffer is None or self._buffer.shape != (B, T) or self._buffer.dtype != real_dtype:
+            self._buffer = np.empty((B, T), dtype=real_dtype)
+
+        gain = 10 ** (_per_frame(self.amplitude_db, B) / 20)
+        phi = np.deg2rad(_per_frame(self.phase_deg, B))
+        np.multiply(out2.real, (gain * np.sin(phi)).astype(real_dtype), out=self._buffer)
+        out2.imag *= (gain * np.cos(phi)).astype(real_dtype)
+        out2.imag -= self._buffer
+        return out
+
+
+class Quantizer(Impairment):
+    """
+    ADC quantization and clipping: the I/Q components are scaled to the sc16 (or `bits`) full scale,
+    rounded, saturated and scaled back, as the samples of a `rx_to_file` capture.
+    """
+
+    def __init__(self, full_scale=1.0, bits: int = 16, seed=None) -> None:
+        """
+        Initialize a Quantizer.
+
+        Parameters:
+        - full_scale: Amplitude of the full scale of the I/Q components (scalar or per frame [B])
+        - bits: Number of bits of the I/Q components                                 [2, 16]
+        - seed: Unused (deterministic stage)
+        """
+        if not 2 <= bits <= 16:
+            raise ValueError(f"Invalid number of bits: {bits}")
+        super().__init__(seed)
+        self.full_scale = full_scale
+        self.bits = bits
+        self.clipped = None
+
+    def apply(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Quantize a batch of waveforms. `clipped` holds the fraction of clipped I/Q components of each
+        frame [B] after the call.
+        """
+        out, x2, out2 = _prepare_output(x, out)
+        B, T = out2.shape
+        real_dtype = np.finfo(out.dtype).dtype
+        levels = SC16_FULL_SCALE if self.bits == 16 else 2 ** (self.bits - 1) - 1
+        scale = (levels / _per_frame(self.full_scale, B)).astype(real_dtype)[:, :, None]
+
+        iq = out2.view(real_dtype).reshape(B, T, 2)
+        iq *= scale
+        np.rint(iq, out=iq)
+        self.clipped = np.count_nonzero((iq > levels) | (iq < -levels - 1), axis=(1, 2)) / (2 * T)
+        np.clip(iq, -levels - 1, levels, out=iq)
+        iq /= scale
+        return out
+
+
+class ImpairmentPipeline:
+    """
+    Chain of impairment stages, applied in order on a batch of waveforms. The first stage writes in
+    the output, the next ones run in place. Any object with an `apply(x, out=None)` method accepting
+    out=x can be used as a stage (the multipath channel cannot run in place: simulate it before, see
+    `channel.ChannelSimulator`).
+    """
+
+    def __init__(self, stages: list, seed=None) -> None:
+        """
+        Initialize an ImpairmentPipeline.
+
+        Parameters:
+        - stages: Impairment stages, in order
+        - seed: Seed of the pipeline: each stage is reseeded with its own child SeedSequence
+                (None keeps the seeds of the stages)
+        """
+        self.stages = list(stages)
+        if seed is not None:
+            self.reseed(seed)
+
+    def reseed(self, seed) -> None:
+        """
+        Reseed every stage with an independent child of the SeedSequence of the seed.
+        """
+        sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        for stage, child in zip(self.stages, sequence.spawn(len(self.stages))):
+            if hasattr(stage, "reseed"):
+                stage.reseed(child)
+
+    def apply(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Impair a batch of waveforms.
+
+        Parameters:
+        - x: Waveforms                                                [T] or [B x T]
+        - out: Output array (may be x)                                [T] or [B x T]
+
+        Returns:
+        - y: The impaired waveforms
+        """
+        if not self.stages:
+            return _prepare_output(x, out)[0]
+        out = self.stages[0].apply(x, out=out)
+        for stage in self.stages[1:]:
+            stage.apply(out, out=out)
+        return out
+
+    def __call__(self, x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        return self.apply(x, out)
@@ -106,3 +106,109 @@ def metric_wilson(ofdm_frame: ofdmFrame) -> tuple[np.ndarray, np.ndarray, np.nda
         RL[i + 1] = RL[i] + np.abs(y_dL) ** 2 - np.abs(y_d2L) ** 2
         M[i + 1] = np.abs(P[i + 1]) ** 2 / (R[i + 1] * RL[i + 1]) if R[i + 1] != 0 and RL[i + 1] != 0 else 0
     return P, R, M
+
+
+####################
+# Streaming metric #
+####################
+
+def _window_sums(x: np.ndarray, width: int) -> np.ndarray:
+    """
+    Sums of the `width` consecutive values ending at each of the last len(x) - width + 1 values of x
+    (along the last axis).
+    """
+    s = np.cumsum(x, axis=-1)
+    sums = s[..., width - 1:].copy()
+    sums[..., 1:] -= s[..., :-width]
+    return sums
+
+
+class StreamingMetric:
+    """
+    Vectorized synchronization metric of an unbounded stream of samples, computed chunk by chunk: the
+    last samples of each chunk are kept to continue the sliding sums over the next one, so the metric
+    of a stream (e.g. a capture larger than the memory) does not depend on its chunking.
+
+    The metric M[d] is the one of `metric_<method>` advanced by one sample (M[d] includes the sample d),
+    averaged over a window of `window` samples like the FPGA metric calculator, which sums it over CP * M
+    samples. The stream starts after zeros, like the `metric_<method>` functions: the first `warmup`
+    values are a transient.
+
+    The input may be a batch of independent streams [B x n], one per row.
+    """
+
+    def __init__(self, K: int = 1024, M: int = 4, window: int = 1, method: str = "schmidl") -> None:
+        """
+        Initialize a StreamingMetric.
+
+        Parameters:
+        - K: Number of subcarriers
+        - M: Oversampling factor
+        - window: Number of samples the metric is averaged on, CP * M for the FPGA metric   [# of samples]
+        - method: Metric                                                                    [schmidl, minn, wilson]
+        """
+        if method not in ("schmidl", "minn", "wilson"):
+            raise ValueError(f"Invalid metric: {method} (expected schmidl, minn or wilson)")
+        if K < 2 or M < 1 or window < 1:
+            raise ValueError("Invalid metric parameters")
+        self.L = (K // 2) * M
+        self.window = window
+        self.method = method
+        self.reset()
+
+    @property
+    def warmup(self) -> int:
+        """
+        Number of metric values of a stream computed on the zeros before its first sample.
+        """
+        return 2 * self.L + self.window - 1
+
+    def reset(self) -> None:
+        """
+        Start new streams.
+        """
+        self._samples = None
+        self._metric = None
+        self.n_samples = 0
+
+    def update(self, y: np.ndarray) -> np.ndarray:
+        """
+        Compute the metric of the next chunk of the stream(s).
+
+        Parameters:
+        - y: Next samples of the stream(s)                   [n] or [B x n]
+
+        Returns:
+        - metric: Metric of each sample, averaged on the window       [n] or [B x n]
+        """
+        y = np.asarray(y)
+        L, n = self.L, y.shape[-1]
+        if self._samples is None or self._samples.shape[:-1] != y.shape[:-1]:
+            if self.n_samples:
+                raise ValueError("The number of streams cannot change, call reset() first")
+            self._samples = np.zeros(y.shape[:-1] + (2 * L,), dtype=np.complex128)
+            self._metric = np.zeros(y.shape[:-1] + (self.window - 1,))
+        z = np.concatenate((self._samples, y), axis=-1)
+
+        # P: correlation of the samples L apart, over L samples
+        P = _window_sums(np.conj(z[..., 1:n + L]) * z[..., L + 1:], L)
+        energy = z.real ** 2 + z.imag ** 2
+        if self.method == "schmidl":
+            R = _window_sums(energy[..., L + 1:], L)
+            denominator = R ** 2
+        elif self.method == "minn":
+            R = _window_sums(energy[..., 1:], 2 * L)
+            denominator = (R / 2) ** 2
+        else:
+            R = _window_sums(energy[..., 1:], 2 * L)
+            denominator = R * _window_sums(energy[..., 1:n + L], L)
+        metric = np.divide(P.real ** 2 + P.imag ** 2, denominator, out=np.zeros(denominator.shape),
+                           where=denominator > 0)
+
+        if self.window > 1:
+            metric = np.concatenate((self._metric, metric), axis=-1)
+            self._metric = metric[..., -(self.window - 1):].copy()
+            metric = _window_sums(metric, self.window) / self.window
+        self._samples = z[..., -2 * L:].copy()
+        self.n_samples += n
+        return metric
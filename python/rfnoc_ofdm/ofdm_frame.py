@@ -1,8 +1,13 @@
 import numpy as np
-from scipy.interpolate import RegularGridInterpolator
 from scipy.signal import correlate as scipy_correlate
 
-from .utils import symbol_mapping, inverse_mapping, InputError
+from .ber import count_errors, pack_fsymbol_bits
+from .capture import CaptureFile, is_capture_container, read_samples
+from .channel import add_awgn, apply_multipath, get_impulse_response, get_noise_std
+from .pilots import PilotLayout, get_pilot_layout
+from .radar import RangeDopplerProcessor, RangeDopplerZoom, Target, cfar_detect, get_target_channel
+from .utils import symbol_mapping, soft_demapping, InputError
+from .waveform import is_waveform_file, read_waveform, write_waveform
 
 
 class ofdmFrame:
@@ -73,6 +78,7 @@ class ofdmFrame:
         if random_seed is None:
             random_seed = np.random.default_rng().integers(0, 2**32)
             if verbose: print(f"Frame random seed: {random_seed}")
+        self.random_seed = int(random_seed)
         self.generator = np.random.default_rng(random_seed)
         
         # Parameters
@@ -90,10 +96,12 @@ class ofdmFrame:
         self.preamble_tlen = (CP + K) * M
         self.payload_tlen = N * (CP + K) * M
         self.frame_tlen = self.preamble_tlen + self.payload_tlen
+        self.pilot_layout: PilotLayout = get_pilot_layout(N, K, Nt, Nf) # Shared by all frames with the same (N, K, Nt, Nf)
         
         # Generate the preamble and payload symbols
         self.fsymbols_preamble = self.generate_preamble()
         self.fsymbols_payload, self.bits_payload = self.generate_payload()
+        self.bits_payload_packed = pack_fsymbol_bits(self.bits_payload, K) # One byte per resource element, for BER computation
         
         # Generate the time domain symbols
         self.tsymbols = self.modulate_frame()
@@ -105,6 +113,7 @@ class ofdmFrame:
         self.fsymbols_payload_rx = None # Placeholder for the received frequency domain symbols
         self.H_interp = None # Placeholder for the channel estimation
         self.range_doppler_map = None # Placeholder for the range Doppler map
+        self.range_doppler_axes = None # (Doppler bins, delay bins) of a zoomed range Doppler map
     
 
     ############################
@@ -116,20 +125,17 @@ class ofdmFrame:
         Get the pilot grid: a matrix to represent where pilots symbols are located.
         Note: the first and the last subcarrier is always included in the pilots, same
         for first and last OFDM symbol. This ensure that we not perform any extrapolation.
+        Prefer `self.pilot_layout`, which holds the precomputed pilot/data indices.
         """
-        pilots_idx_f = np.concatenate((np.arange(0, self.K - 1, self.Nf), [self.K - 1]))
-        pilots_idx_t = np.concatenate((np.arange(0, self.N - 1, self.Nt), [self.N - 1]))
-        pilots_idx_t_mesh, pilots_idx_f_mesh = np.meshgrid(pilots_idx_t, pilots_idx_f)
+        layout = self.pilot_layout
+        pilots_idx_t_mesh, pilots_idx_f_mesh = np.meshgrid(layout.pilots_idx_t, layout.pilots_idx_f)
         return pilots_idx_t_mesh, pilots_idx_f_mesh
     
     def get_total_possible_bits_transmitted(self) -> int:
         """
         Get the total number of bits that can be transmitted in the frame.
         """
-        matrix = np.ones((self.N, self.K))
-        pilots_idx_t_mesh, pilots_idx_f_mesh = self.get_pilots_grid()
-        matrix[pilots_idx_t_mesh.T, pilots_idx_f_mesh.T] = 0
-        return int(np.sum(matrix) * self._bits_per_fsymbol[self.payload_mod])
+        return self.pilot_layout.n_data * self._bits_per_fsymbol[self.payload_mod]
         
     def generate_symbol(self, mod: str, bits: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
         """
@@ -190,19 +196,19 @@ class ofdmFrame:
         Modulate the given frequency domain symbols to the time domain.
         
         Parameters:
-        - fsymbols: The frequency domain symbol matrix
+        - fsymbols: The frequency domain symbol matrix, or a stack of matrices [N x K] or [B x N x K]
         
         Returns:
-        - out_blk: The time domain 1D array containing the modulated symbol
+        - out_blk: The time domain 1D array containing the modulated symbol (one row per matrix of a stack)
         """
-        assert len(fsymbols.shape) == 2, "The frequency domain symbols must be a 2D matrix"
+        assert len(fsymbols.shape) >= 2, "The frequency domain symbols must be a 2D matrix"
         
         ifft_I = np.sqrt(self.K * self.M) * np.fft.ifft(fsymbols, self.K * self.M)
         if self.CP == 0:
-            return np.reshape(ifft_I, (ifft_I.size,)) # Shape: N * K * M
+            return np.reshape(ifft_I, fsymbols.shape[:-2] + (-1,)) # Shape: N * K * M
         else:
-            out_blk = np.concatenate([ifft_I[:, -self.CP * self.M:], ifft_I], axis=1)
-            return np.reshape(out_blk, (out_blk.size,)) # Shape: N * ((CP + K) * M)
+            out_blk = np.concatenate([ifft_I[..., -self.CP * self.M:], ifft_I], axis=-1)
+            return np.reshape(out_blk, fsymbols.shape[:-2] + (-1,)) # Shape: N * ((CP + K) * M)
 
     def modulate_frame(self) -> np.ndarray:
         """
@@ -295,84 +301,168 @@ class ofdmFrame:
         Estimate the channel using the pilot symbols by interpolating the channel
         estimation over the entire grid.
         """        
-        # Recompute the pilot grid
-        pilots_idx_f = np.concatenate((np.arange(0, self.K - 1, self.Nf), [self.K - 1]))
-        pilots_idx_t = np.concatenate((np.arange(0, self.N - 1, self.Nt), [self.N - 1]))
-        pilots_t_mesh, pilots_f_mesh = np.meshgrid(pilots_idx_t, pilots_idx_f)
-        
         # Pilot channel estimation
-        pilots_tx = self.fsymbols_payload[pilots_t_mesh.T, pilots_f_mesh.T]
-        pilots_rx = self.fsymbols_payload_rx[pilots_t_mesh.T, pilots_f_mesh.T]
+        layout = self.pilot_layout
+        pilots_tx = layout.get_pilots(self.fsymbols_payload)
+        pilots_rx = layout.get_pilots(self.fsymbols_payload_rx)
         H_pilots = pilots_rx / pilots_tx
-    
-        # Prepare for interpolation over the entire grid
-        t_indices = np.arange(self.N)
-        f_indices = np.arange(self.K)
-        
-        # Create interpolator for real anf imaginary parts
-        real_interp = RegularGridInterpolator(
-            (pilots_idx_t, pilots_idx_f), np.real(H_pilots), method="linear", bounds_error=False, fill_value=0
-        )
-        imag_interp = RegularGridInterpolator(
-            (pilots_idx_t, pilots_idx_f), np.imag(H_pilots), method="linear", bounds_error=False, fill_value=0
-        )
-        
-        # Create a grid for interpolation
-        grid_t, grid_f = np.meshgrid(t_indices, f_indices, indexing="ij")
-        grid_points = np.array([grid_t.flatten(), grid_f.flatten()]).T
-        
-        # Interpolate the channel over the entire grid
-        H_interp_real = real_interp(grid_points).reshape(self.N, self.K)
-        H_interp_imag = imag_interp(grid_points).reshape(self.N, self.K)
-        self.H_interp = H_interp_real + 1j * H_interp_imag
+        
+        # Interpolate the channel over the entire grid (bilinear)
+        self.H_interp = layout.interpolate(H_pilots)
             
-    def equalize(self) -> None:
+    def equalize(self, in_place: bool = False) -> None:
         """
         Equalize the received symbols.
         This function estimates the channel and equalizes the received symbols.
+        
+        Parameters:
+        - in_place: Overwrite the received symbols instead of allocating a new (N x K) matrix
         """        
         # Equalize the received symbols
-        self.fsymbols_payload_rx = self.fsymbols_payload_rx / self.H_interp
+        if in_place:
+            np.divide(self.fsymbols_payload_rx, self.H_interp, out=self.fsymbols_payload_rx)
+        else:
+            self.fsymbols_payload_rx = self.fsymbols_payload_rx / self.H_interp
+    
+    def count_bit_errors(self, equalize: bool = False, error_map: bool = False) -> tuple[int, int, np.ndarray]:
+        """
+        Count the bit errors on the data symbols, comparing the hard decisions with the
+        transmitted bits (`bits_payload`). See `ber.count_errors`.
+        
+        Parameters:
+        - equalize: Divide by `H_interp` on the fly (fused equalization, when `equalize()` was not called)
+        - error_map: Also return the number of bit errors per resource element
+        
+        Returns:
+        - n_errors: Number of bit errors
+        - n_bits: Number of data bits
+        - error_map: Bit errors per resource element, None if not requested [N x K]
+        """
+        H = self.H_interp if equalize else None
+        return count_errors(self.fsymbols_payload_rx, self.bits_payload_packed, self.pilot_layout, self.payload_mod,
+                            self._bits_per_fsymbol[self.payload_mod], H=H, error_map=error_map)
     
     def compute_ber(self) -> float:
         """
-        Compute the bit error rate.
+        Compute the bit error rate (NaN if the frame carries no data bits).
         """
-        # Create a mask for data symbols (True where data is present)
-        pilots_idx_t_mesh, pilots_idx_f_mesh = self.get_pilots_grid()
-        data_mask = np.ones((self.N, self.K), dtype=bool)
-        data_mask[pilots_idx_t_mesh.T, pilots_idx_f_mesh.T] = False
-
-        # Extract received bits on data symbols
-        rx_data_symbols = self.fsymbols_payload_rx[data_mask]
-        rx_bits = inverse_mapping(rx_data_symbols, self.payload_mod)
-
-        # Extract the transmitted bits on data symbols
-        tx_data_symbols = self.fsymbols_payload[data_mask]
-        tx_bits = inverse_mapping(tx_data_symbols, self.payload_mod)
-        
-        # Compute the bit error rate
-        n_errors = np.sum(tx_bits != rx_bits)
-        n_total_bits = np.sum(data_mask) * self._bits_per_fsymbol[self.payload_mod]
-        ber = n_errors / n_total_bits
+        n_errors, n_total_bits, _ = self.count_bit_errors()
+        ber = n_errors / n_total_bits if n_total_bits > 0 else np.nan
         return ber
 
-    def delay_doppler(self, zeropad_P: int = 1, zeropad_N: int = 1) -> np.ndarray:
+    def count_bit_errors_snrs(self, SNRs: np.ndarray, CP_rx: bool = True, remove_cp_at: str = "beginning",
+                              remove_first_symbol: bool = False) -> tuple[np.ndarray, int]:
+        """
+        Count the bit errors of the frame at several SNRs at once (AWGN, pilot channel estimation and
+        equalization, as `add_noise` -> `demodulate_frame` -> `estimate_channel` -> `count_bit_errors`).
+        One noise realization is drawn and scaled to each SNR. As the demodulation is linear, the frame
+        and the noise are demodulated once, and the received grids of all the SNRs are built as one batch
+        along a leading SNR axis. The received signal attributes are restored.
+        
+        Parameters:
+        - SNRs: SNR values                                                   [dB] [S]
+        - CP_rx, remove_cp_at, remove_first_symbol: See `demodulate_frame`
+        
+        Returns:
+        - n_errors: Number of bit errors at each SNR                         [S]
+        - n_bits: Number of data bits compared (same for every SNR)
+        """
+        SNRs = np.atleast_1d(np.asarray(SNRs, dtype=float))
+        state = (self.tsymbols_rx, self.CP_rx, self.fsymbols_payload_rx, self.H_interp)
+        
+        # Demodulate the frame and one unit noise realization (same draw as `add_noise`)
+        noise = add_awgn(np.zeros_like(self.tsymbols), 1.0, self.generator)
+        fsymbols = []
+        for tsymbols in (self.tsymbols, noise):
+            self.tsymbols_rx = tsymbols
+            self.demodulate_frame(CP_rx, remove_cp_at, remove_first_symbol)
+            fsymbols.append(self.fsymbols_payload_rx)
+        self.tsymbols_rx, self.CP_rx, self.fsymbols_payload_rx, self.H_interp = state
+        
+        # Received grids and pilot channel estimations of all the SNRs [S x N x K] (the estimation is
+        # linear too: the frame and the noise estimates are interpolated once and scaled)
+        noise_std = get_noise_std(SNRs, self.get_payload_power())[:, np.newaxis, np.newaxis]
+        layout = self.pilot_layout
+        pilots_tx = layout.get_pilots(self.fsymbols_payload)
+        H_frame, H_noise = (layout.interpolate(layout.get_pilots(grid) / pilots_tx) for grid in fsymbols)
+        fsymbols_rx = fsymbols[0] + noise_std * fsymbols[1]
+        H_interp = H_frame + noise_std * H_noise
+        
+        # Fused equalization and error counting
+        bits_per_fsymbol = self._bits_per_fsymbol[self.payload_mod]
+        n_errors = np.empty(len(SNRs), dtype=np.int64)
+        n_bits = layout.n_data * bits_per_fsymbol
+        for i in range(len(SNRs)):
+            n_errors[i], _, _ = count_errors(fsymbols_rx[i], self.bits_payload_packed, layout, self.payload_mod,
+                                             bits_per_fsymbol, H=H_interp[i])
+        return n_errors, n_bits
+    
+    def compute_llrs(self, noise_var: float) -> np.ndarray:
+        """
+        Compute the max-log LLRs of the data bits (see `utils.soft_demapping`).
+        This function must be called after `equalize()`: the noise variance of each resource element
+        after equalization is noise_var / |H_interp|^2.
+        
+        Parameters:
+        - noise_var: Complex noise variance per resource element before equalization
+        
+        Returns:
+        - llrs: float32 LLRs of the data bits, in the same order as the hard decisions of `compute_ber`
+        """
+        layout = self.pilot_layout
+        data_symbols = layout.get_data(self.fsymbols_payload_rx)
+        data_noise_var = noise_var / np.abs(layout.get_data(self.H_interp)) ** 2
+        return soft_demapping(data_symbols, self.payload_mod, data_noise_var)
+
+    def delay_doppler(self, zeropad_P: int = 1, zeropad_N: int = 1, window=None) -> np.ndarray:
         """
         Compute the range and Doppler shift based on the channel estimation.
+        To process many frames, use a `radar.RangeDopplerProcessor` on the stacked channel estimates,
+        and for a continuous stream of frames, push each `H_interp` to a `radar.SlidingRangeDoppler`.
+        
+        Parameters:
+        - zeropad_P: Zero padding for the Doppler shift
+        - zeropad_N: Zero padding the range shift
+        - window: Window applied on both axes (None, "hann", "chebyshev", ...)
+        """
+        processor = RangeDopplerProcessor(self.N, self.K, zeropad_P, zeropad_N, window=window)
+        self.range_doppler_map = processor.process(self.H_interp)
+        self.range_doppler_axes = None
+    
+    def delay_doppler_zoom(self, doppler_bins: tuple[float, float], delay_bins: tuple[float, float],
+                           n_doppler: int, n_delay: int, window=None) -> None:
+        """
+        Compute a high resolution range-Doppler map over a window only (chirp-Z transform, see
+        `radar.RangeDopplerZoom`). The axes (in bins of the map without zero padding) are saved in
+        `range_doppler_axes`.
         
         Parameters:
-        - zeropad_P: Zero padding the range shift
-        - zeropad_N: Zero padding for the Doppler shift
+        - doppler_bins: First and last Doppler bins of the window (0 is the zero Doppler)
+        - delay_bins: First and last delay bins of the window
+        - n_doppler: Number of points of the Doppler axis
+        - n_delay: Number of points of the delay axis
+        - window: Window applied on both axes (None, "hann", "chebyshev", ...)
+        """
+        zoom = RangeDopplerZoom(self.N, self.K, doppler_bins, delay_bins, n_doppler, n_delay, window=window)
+        self.range_doppler_map = zoom.process(self.H_interp)
+        self.range_doppler_axes = (zoom.doppler_axis, zoom.delay_axis)
+    
+    def detect_targets(self, guard: tuple[int, int] = (2, 2), train: tuple[int, int] = (4, 4),
+                       pfa: float = 1e-6, method: str = "ca") -> list[Target]:
         """
-        channel_estimated = self.H_interp
-        n_fft = self.N * zeropad_P
-        n_ifft = self.K * zeropad_N #* self.M
-        size = self.K * zeropad_N #* self.M
+        Detect the targets on the range-Doppler map with a 2-D CFAR (see `radar.cfar_detect`).
         
-        range_doppler_map = np.fft.ifftshift(np.fft.ifft(np.fft.fft(channel_estimated, axis=0, n=n_fft), axis=1, n=n_ifft)[:,:size], axes=0)
-        # range_doppler_map = np.fft.ifft(np.fft.fft(channel_estimated, axis=0, n=n_fft), axis=1, n=n_ifft) #[:,:size]
-        self.range_doppler_map = range_doppler_map
+        Parameters:
+        - guard: Number of guard cells on each side (Doppler, delay)
+        - train: Number of training cells on each side (Doppler, delay)
+        - pfa: Probability of false alarm per cell
+        - method: ca (cell averaging) or os (ordered statistic)
+        """
+        if self.range_doppler_axes is None:
+            return cfar_detect(self.range_doppler_map, guard, train, pfa, method)
+        doppler_axis, delay_axis = self.range_doppler_axes
+        return cfar_detect(self.range_doppler_map, guard, train, pfa, method, circular_doppler=False,
+                           doppler_axis=doppler_axis, delay_axis=delay_axis)
     
     
     #################################
@@ -402,45 +492,71 @@ class ofdmFrame:
         print(f"2x SIG LENGTH: {split_signal.shape[0]}")
         return filename
         
+    def save_tsymbols_bin(self, filename: str = "", auto_filename: bool = False, format: str = "fc32") -> str:
+        """
+        Save the time domain symbols to a binary waveform file (see `waveform.write_waveform`), with
+        the frame parameters, the normalization scale and a digest of the samples in its header.
+        The signal is normalized as in `save_tsymbols_txt`.
+        
+        Parameters:
+        - filename: The name of the file to save the symbols
+        - auto_filename: Build the filename from the frame parameters
+        - format: Sample format                                 [fc32, sc16]
+        """
+        assert self.tsymbols.shape[0] == self.frame_tlen, "Invalid frame length"
+        if auto_filename:
+            filename = f"OFDM_frame_{self.K}_{self.CP}_{self.M}_{self.N}_{self.preamble_mod}_{self.payload_mod}.{format}.bin"
+        
+        write_waveform(filename, self.tsymbols, format, K=self.K, CP=self.CP, M=self.M, N=self.N, Nt=self.Nt, Nf=self.Nf,
+                       preamble_mod=self.preamble_mod, payload_mod=self.payload_mod, random_seed=self.random_seed)
+        print(f"SIG LENGTH: {self.frame_tlen}")
+        return filename
+        
     def load_tsymbols_txt(self, filename: str, ignore_zero: bool = False) -> None:
         """
-        Load the time domain symbols from a file.
+        Load the time domain symbols from a file. Binary waveform files (see `save_tsymbols_bin`)
+        are detected from their header and read directly.
         
         Parameters:
         - filename: The name of the file to load the symbols
         - ignore_zero: Ignore zero samples
-        - crop: Crop the signal to the expected length
         """
-        data = np.loadtxt(filename)       
+        if is_waveform_file(filename):
+            _, rx_sig = read_waveform(filename)
+        else:
+            data = np.loadtxt(filename)       
+            rx_sig = data[0::2] + 1j * data[1::2]
+            rx_sig.reshape(-1, 1)
+            rx_sig = np.squeeze(rx_sig)
         if ignore_zero:
             rx_sig = rx_sig[rx_sig != 0]
         
-        rx_sig = data[0::2] + 1j * data[1::2]
-        rx_sig.reshape(-1, 1)
-        rx_sig = np.squeeze(rx_sig)
-        
         # Check the signal length
         if len(rx_sig) != self.frame_tlen:
-            print(f"CAUTION: Invalid signal length: expected {self.len}, got {len(rx_sig)}\n")
+            print(f"CAUTION: Invalid signal length: expected {self.frame_tlen}, got {len(rx_sig)}\n")
         self.tsymbols_rx = rx_sig
         
-    def load_tysmbol_bin(self, filename: str, ignore_zero: bool=False, type: str="fc32") -> None:
+    def load_tysmbol_bin(self, filename: str, ignore_zero: bool=False, type: str="fc32",
+                         offset: int = 0, count: int = None) -> None:
         """
         Load a file containing a I/Q signal. The file has the same format as
-        the save function.        
-        """
-        with open(filename, "rb") as file:
-            if type == "fc32":
-                data = np.fromfile(file, dtype=np.float32)
-            elif type == "sc16":
-                data = np.fromfile(file, dtype=np.int16)
-            data = data.astype(np.complex64)
-            if ignore_zero:
-                data = data[data != 0]
-                
-            rx_sig = data[0::2] + 1j * data[1::2]
-            rx_sig.reshape(-1, 1)
-            rx_sig = np.squeeze(rx_sig)
+        the save function. The file is memory mapped (see `capture.read_samples`),
+        so only the requested samples are read. Capture containers (see `capture.CaptureFile`)
+        are detected from their header, their sample format is used instead of `type`.
+        
+        Parameters:
+        - filename: The name of the file to load the symbols
+        - ignore_zero: Ignore zero samples
+        - type: Sample format                                   [fc32, sc16]
+        - offset: First sample to load                          [# of samples]
+        - count: Number of samples to load, None for the rest of the file
+        """
+        if is_capture_container(filename):
+            rx_sig = CaptureFile(filename).read(offset, count)
+        else:
+            rx_sig = read_samples(filename, type, offset, count)
+        if ignore_zero:
+            rx_sig = rx_sig[rx_sig != 0]
         
         # Check the signal length
         if len(rx_sig) != self.frame_tlen:
@@ -458,34 +574,28 @@ class ofdmFrame:
     
     def add_noise(self, SNR: float) -> None:
         """
-        Add AWG noise to the given frame.
+        Add AWG noise to the given frame. To simulate many frames at once, use a `channel.ChannelSimulator`.
         """        
         if SNR == np.inf:
             self.tsymbols_rx = self.tsymbols
             return        
         
-        # Compute the average symbol‐power over payload (no CP)
+        # Add the noise, both parts drawn in one call (see `channel.add_awgn`)
+        noise_std = get_noise_std(SNR, self.get_payload_power())
+        self.tsymbols_rx = add_awgn(self.tsymbols, noise_std, self.generator)
+
+    def get_payload_power(self) -> float:
+        """
+        Average symbol power over the payload (without the cyclic prefix), reference of the SNR.
+        """
         payload_td = self.tsymbols[self.preamble_tlen:]
         payload_td = payload_td.reshape(self.N, (self.CP + self.K) * self.M)
         payload_no_cp = payload_td[:, self.CP * self.M:]
-        signal_power = np.mean(np.abs(payload_no_cp) ** 2)
-
-        # Convert Eb/N0 to Es/N0 by multiplying by bits_per_symbol
-        ebn0_lin = 10 ** (SNR / 10)
-
-        # Now get noise‐power per sample
-        noise_power = signal_power / ebn0_lin
-        noise_std_dev = np.sqrt(noise_power / 2)
-
-        noise_real = self.generator.normal(0, noise_std_dev, size=len(self.tsymbols))
-        noise_imag = self.generator.normal(0, noise_std_dev, size=len(self.tsymbols))
-        noise_frame = noise_real + 1j * noise_imag
-
-        self.tsymbols_rx = self.tsymbols + noise_frame
+        return np.mean(np.abs(payload_no_cp) ** 2)
 
     def add_paths(self, gains: list[float], delays: list[int], SNR: float = np.inf) -> None:
         """
-        Add multipath to the frame.
+        Add multipath to the frame. To simulate many frames at once, use a `channel.ChannelSimulator`.
         
         Parameters:
         - gains: List of gains for each path
@@ -499,16 +609,53 @@ class ofdmFrame:
         # Add noise to the frame
         self.add_noise(SNR)
         
-        # Create the multipath channel
-        h = np.zeros(max(delays) + 1, dtype=complex)
-        for gain, delay in zip(gains, delays):
-            h[delay] += gain
-        h = h / np.sqrt(np.sum(np.abs(h) ** 2))
+        # Create the multipath channel and the received signal
+        h = get_impulse_response(gains, delays)
+        self.tsymbols_rx = apply_multipath(self.tsymbols_rx, h)
+
+    def simulate_targets(self, delays, dopplers, gains=None, preamble: bool = True,
+                         dtype: type = np.complex128) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Simulate the echoes of point targets on the frame, for one or a batch of scenes (see
+        `radar.get_target_channel`). The channel is applied on the frequency domain grid, and the
+        received grid is modulated back to the time domain: demodulating the time domain signal gives
+        the received grid again. No noise is added (see `channel.ChannelSimulator` for a batch).
+        The channel estimated on the pilots only resolves the Doppler shifts within +-N / (2 * Nt) bins
+        and the delays below K / Nf bins, the targets outside are aliased in the range-Doppler map.
         
-        # Create the received signal
-        rx_sig = np.convolve(self.tsymbols_rx, h)
-        rx_sig = rx_sig[:self.frame_tlen]
-        self.tsymbols_rx = rx_sig
+        Parameters:
+        - delays: Delay of each target                                   [bins] [P] or [B x P]
+        - dopplers: Doppler shift of each target, within +-N / (2 * Nt)  [bins] [P] or [B x P]
+        - gains: Complex amplitude of each target (default: 1)           [P] or [B x P]
+        - preamble: Include the preamble (seen as the symbol -1) in the time domain signal
+        - dtype: Complex type of the outputs                             [complex64, complex128]
+        
+        Returns:
+        - fsymbols_payload_rx: Received payload grid of each scene      [B x N x K]
+        - tsymbols_rx: Received time domain signal of each scene        [B x frame_tlen] (or [B x payload_tlen])
+        """
+        symbols = np.arange(-1 if preamble else 0, self.N)
+        H = get_target_channel(self.N, self.K, delays, dopplers, gains, symbols=symbols, dtype=dtype)
+        fsymbols = np.concatenate([self.fsymbols_preamble, self.fsymbols_payload]) if preamble else self.fsymbols_payload
+        H *= fsymbols
+        tsymbols_rx = self.modulate_symbols(H).astype(dtype, copy=False)
+        return H[:, 1:] if preamble else H, tsymbols_rx
+
+    def add_targets(self, delays, dopplers, gains=None, SNR: float = np.inf) -> None:
+        """
+        Add the echoes of point targets to the frame (see `simulate_targets`).
+        
+        Parameters:
+        - delays: Delay of each target                                   [bins] [P]
+        - dopplers: Doppler shift of each target, within +-N / (2 * Nt)  [bins] [P]
+        - gains: Complex amplitude of each target (default: 1)           [P]
+        - SNR: Signal to noise ratio                                     [dB]
+        """
+        _, tsymbols_rx = self.simulate_targets(delays, dopplers, gains)
+        self.tsymbols_rx = tsymbols_rx[0]
+        if SNR != np.inf:
+            noise_std = get_noise_std(SNR, self.get_payload_power())
+            add_awgn(self.tsymbols_rx, noise_std, self.generator, out=self.tsymbols_rx)
 
 
     ################################################################################################################
@@ -0,0 +1,150 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """
+    Mark an array as read-only so it can be safely shared between frames.
+    """
+    array.setflags(write=False)
+    return array
+
+
+def _linear_weights(n: int, pilots_idx: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the linear interpolation weights of the positions 0..n-1 from the pilot positions.
+
+    Returns:
+    - lo: Index (in the pilot vector) of the pilot before each position
+    - hi: Index (in the pilot vector) of the pilot after each position
+    - w: Weight of the `hi` pilot (the `lo` pilot has weight 1 - w)
+    """
+    positions = np.arange(n)
+    if len(pilots_idx) == 1:
+        zeros = np.zeros(n, dtype=np.intp)
+        return zeros, zeros, np.zeros(n)
+    hi = np.clip(np.searchsorted(pilots_idx, positions, side="right"), 1, len(pilots_idx) - 1)
+    lo = hi - 1
+    w = (positions - pilots_idx[lo]) / (pilots_idx[hi] - pilots_idx[lo])
+    return lo, hi, w
+
+
+@dataclass(frozen=True, eq=False)
+class PilotLayout:
+    """
+    Immutable description of the pilot/data positions in a (N x K) payload grid.
+
+    The layout only depends on (N, K, Nt, Nf), so it is computed once per frame configuration
+    (see `get_pilot_layout`) and shared by every frame using that configuration. All arrays are
+    read-only.
+
+    Attributes:
+    - N, K, Nt, Nf: Frame parameters the layout was computed for
+    - pilots_idx_t: OFDM symbols (rows) carrying pilots                     [n_pilots_t]
+    - pilots_idx_f: Subcarriers (columns) carrying pilots                   [n_pilots_f]
+    - pilot_mask: True where a pilot is located                             [N x K]
+    - pilot_flat_idx: Flat (row-major) indices of the pilots in the grid    [n_pilots]
+    - data_flat_idx: Flat (row-major) indices of the data in the grid       [n_data]
+    - n_pilots, n_data: Number of pilot and data resource elements
+    """
+    N: int
+    K: int
+    Nt: int
+    Nf: int
+    pilots_idx_t: np.ndarray = field(repr=False)
+    pilots_idx_f: np.ndarray = field(repr=False)
+    pilot_mask: np.ndarray = field(repr=False)
+    pilot_flat_idx: np.ndarray = field(repr=False)
+    data_flat_idx: np.ndarray = field(repr=False)
+    n_pilots: int
+    n_data: int
+    _interp_t: tuple = field(repr=False)
+    _interp_f: tuple = field(repr=False)
+
+    @classmethod
+    def compute(cls, N: int, K: int, Nt: int, Nf: int) -> "PilotLayout":
+        """
+        Build the layout. Prefer `get_pilot_layout` which caches the result.
+        Note: the first and the last subcarrier is always included in the pilots, same
+        for first and last OFDM symbol. This ensure that we not perform any extrapolation.
+        """
+        pilots_idx_f = np.concatenate((np.arange(0, K - 1, Nf), [K - 1]))
+        pilots_idx_t = np.concatenate((np.arange(0, N - 1, Nt), [N - 1]))
+
+        pilot_mask = np.zeros((N, K), dtype=bool)
+        pilot_mask[np.ix_(pilots_idx_t, pilots_idx_f)] = True
+        pilot_flat_idx = np.flatnonzero(pilot_mask)
+        data_flat_idx = np.flatnonzero(~pilot_mask)
+
+        interp_t = tuple(_read_only(a) for a in _linear_weights(N, pilots_idx_t))
+        interp_f = tuple(_read_only(a) for a in _linear_weights(K, pilots_idx_f))
+
+        return cls(
+            N=N, K=K, Nt=Nt, Nf=Nf,
+            pilots_idx_t=_read_only(pilots_idx_t),
+            pilots_idx_f=_read_only(pilots_idx_f),
+            pilot_mask=_read_only(pilot_mask),
+            pilot_flat_idx=_read_only(pilot_flat_idx),
+            data_flat_idx=_read_only(data_flat_idx),
+            n_pilots=len(pilot_flat_idx),
+            n_data=len(data_flat_idx),
+            _interp_t=interp_t,
+            _interp_f=interp_f,
+        )
+
+    @property
+    def pilots_shape(self) -> tuple[int, int]:
+        """
+        Shape of the pilot sub-grid (n_pilots_t, n_pilots_f).
+        """
+        return len(self.pilots_idx_t), len(self.pilots_idx_f)
+
+    def get_pilots(self, grid: np.ndarray) -> np.ndarray:
+        """
+        Extract the pilot sub-grid from a (..., N, K) grid.
+
+        Returns:
+        - pilots: The pilots values, shape (..., n_pilots_t, n_pilots_f)
+        """
+        flat = grid.reshape(grid.shape[:-2] + (self.N * self.K,))
+        return flat[..., self.pilot_flat_idx].reshape(grid.shape[:-2] + self.pilots_shape)
+
+    def get_data(self, grid: np.ndarray) -> np.ndarray:
+        """
+        Extract the data resource elements from a (..., N, K) grid (row-major order).
+
+        Returns:
+        - data: The data values, shape (..., n_data)
+        """
+        flat = grid.reshape(grid.shape[:-2] + (self.N * self.K,))
+        return flat[..., self.data_flat_idx]
+
+    def interpolate(self, H_pilots: np.ndarray) -> np.ndarray:
+        """
+        Bilinear interpolation of the pilot channel estimates over the entire (N x K) grid.
+        This is equivalent to a linear `RegularGridInterpolator` on the pilot grid, but uses
+        the precomputed weights of the layout and supports leading batch dimensions.
+
+        Parameters:
+        - H_pilots: Channel estimates on the pilots, shape (..., n_pilots_t, n_pilots_f)
+
+        Returns:
+        - H_interp: The interpolated channel, shape (..., N, K)
+        """
+        lo_t, hi_t, w_t = self._interp_t
+        lo_f, hi_f, w_f = self._interp_f
+
+        # Interpolate along the subcarriers, then along the OFDM symbols
+        H_f = H_pilots[..., lo_f] * (1 - w_f) + H_pilots[..., hi_f] * w_f
+        w_t = w_t[:, np.newaxis]
+        return H_f[..., lo_t, :] * (1 - w_t) + H_f[..., hi_t, :] * w_t
+
+
+@lru_cache(maxsize=None)
+def get_pilot_layout(N: int, K: int, Nt: int, Nf: int) -> PilotLayout:
+    """
+    Get the (cached) pilot layout of a frame configuration.
+    """
+    return PilotLayout.compute(int(N), int(K), int(Nt), int(Nf))
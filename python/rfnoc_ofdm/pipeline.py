@@ -0,0 +1,380 @@
+import os
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.fft import next_fast_len
+
+from .ber import count_errors
+from .capture import CaptureFile, is_capture_container, map_samples, read_samples, sc16_to_complex64
+from .compressed import is_compressed_capture
+from .detector import find_run_end
+from .ofdm_frame import ofdmFrame
+from .radar import RangeDopplerProcessor, fft_into
+
+"""
+Note: The receiver pipeline runs the chain of the `ofdmFrame` methods (load_tysmbol_bin -> synchronization
+      -> demodulate_frame -> estimate_channel -> equalize -> compute_ber -> delay_doppler) on a stream of
+      captures received with the same reference frame, with the same results, but every intermediate
+      array is written in a buffer of the pipeline: the buffers are allocated at the first capture (or
+      when the capture length changes) and reused by the next ones.
+
+      The synchronization gives the index of the first sample of the payload in the capture:
+      - schmidl: Schmidl & Cox metric averaged over the cyclic prefix (`metric_calculator.StreamingMetric`),
+                 detected with the FPGA state machine (`detector.find_max_idx`), minus half a cyclic prefix
+      - correlation: Correlation with the preamble (`ofdmFrame.get_frame_synchronization_idx`)
+"""
+
+SYNC_METHODS = ("schmidl", "correlation")
+DEMODULATIONS = ("fft", "hardware_fft")
+
+
+@dataclass(frozen=True)
+class ReceiverResult:
+    """
+    Result of the receiver pipeline on a capture.
+
+    Attributes:
+    - sync_idx: Index of the first payload sample in the capture (0 without synchronization), -1 if no frame was detected
+    - n_errors: Number of bit errors on the data symbols (0 if the BER stage is disabled)
+    - n_bits: Number of data bits compared (0 if the BER stage is disabled)
+    - ber: Bit error rate, NaN if the BER stage is disabled or no frame was detected
+    - peak_doppler, peak_delay: Bins of the maximum of the range-Doppler map, -1 if the stage is disabled
+    - peak_power: Squared magnitude of the maximum of the range-Doppler map, NaN if the stage is disabled
+    """
+    sync_idx: int
+    n_errors: int = 0
+    n_bits: int = 0
+    ber: float = np.nan
+    peak_doppler: int = -1
+    peak_delay: int = -1
+    peak_power: float = np.nan
+
+    @property
+    def detected(self) -> bool:
+        return self.sync_idx >= 0
+
+
+class ReceiverPipeline:
+    """
+    End-to-end receiver for the captures of a reference frame (see the note of the module).
+
+    The arrays of the last processed capture are attributes of the pipeline (`metric`, `fsymbols_payload_rx`,
+    `H_interp`, `range_doppler_map`): they are overwritten by the next capture (copy them to keep them).
+    """
+
+    def __init__(self, reference: ofdmFrame, sync: str = None, threshold: float = 0.5, demodulation: str = "fft",
+                 CP_rx: bool = True, remove_cp_at: str = "beginning", remove_first_symbol: bool = False,
+                 subcarrier_idx_to_skip: int = 2, estimate: bool = True, equalize: bool = True, ber: bool = True,
+                 delay_doppler: bool = False, zeropad_P: int = 1, zeropad_N: int = 1, window=None,
+                 fmt: str = "fc32") -> None:
+        """
+        Initialize a ReceiverPipeline.
+
+        Parameters:
+        - reference: Reference (transmitted) frame of the captures
+        - sync: Synchronization, None if the captures start with the payload     [None, schmidl, correlation]
+        - threshold: Threshold of the schmidl synchronization, on the metric averaged over the cyclic prefix
+                     (see `calibration.calibrate_threshold`)
+        - demodulation: FFT of the received symbols, or reshape of the output of the hardware FFT
+                        (see `ofdmFrame.reshape_after_hardware_fft`)                [fft, hardware_fft]
+        - CP_rx, remove_cp_at, remove_first_symbol: Options of the demodulation (see `ofdmFrame.demodulate_frame`)
+        - subcarrier_idx_to_skip: Position of the subcarriers in the hardware FFT output (hardware_fft only)
+        - estimate: Estimate the channel on the pilots
+        - equalize: Equalize the received symbols (requires estimate)
+        - ber: Count the bit errors
+        - delay_doppler: Compute the range-Doppler map (requires estimate)
+        - zeropad_P, zeropad_N, window: Options of the range-Doppler map (see `ofdmFrame.delay_doppler`)
+        - fmt: Sample format of the capture files                                  [fc32, sc16]
+        """
+        if sync is not None and sync not in SYNC_METHODS:
+            raise ValueError(f"Invalid synchronization: {sync} (expected None or one of {SYNC_METHODS})")
+        if demodulation not in DEMODULATIONS:
+            raise ValueError(f"Invalid demodulation: {demodulation} (expected one of {DEMODULATIONS})")
+        if remove_cp_at not in ("beginning", "end"):
+            raise ValueError("Invalid remove_cp_at value")
+        if (equalize or delay_doppler) and not estimate:
+            raise ValueError("Equalization and range-Doppler processing require the channel estimation")
+
+        self.reference = reference
+        self.sync = sync
+        self.threshold = threshold
+        self.demodulation = demodulation
+        self.CP_rx = CP_rx
+        self.remove_cp_at = remove_cp_at
+        self.remove_first_symbol = remove_first_symbol
+        self.subcarrier_idx_to_skip = subcarrier_idx_to_skip
+        self.estimate = estimate
+        self.equalize = equalize
+        self.ber = ber
+        self.delay_doppler = delay_doppler
+        self.fmt = fmt
+
+        N, K, CP, M = reference.N, reference.K, reference.CP, reference.M
+        self.layout = reference.pilot_layout
+        self.bits_per_fsymbol = reference._bits_per_fsymbol[reference.payload_mod]
+        self.symbol_len = (CP + K) * M if CP_rx and demodulation == "fft" else K * M
+        self.scale = 1 / np.sqrt(K * M)
+
+        # Buffers of the stages that do not depend on the capture length
+        self._buffers = {}
+        self.fsymbols_payload_rx = np.empty((N, K), dtype=np.complex128)
+        self._symbols = np.empty((N, self.symbol_len), dtype=np.complex128)
+        self._spectrum = np.empty((N, K * M), dtype=np.complex128)
+        if estimate:
+            lo_t, hi_t, w_t = self.layout._interp_t
+            lo_f, hi_f, w_f = self.layout._interp_f
+            self._interp_t = (lo_t, hi_t, (1 - w_t)[:, np.newaxis], w_t[:, np.newaxis])
+            self._interp_f = (lo_f, hi_f, 1 - w_f, w_f)
+            self._pilots_tx = self.layout.get_pilots(reference.fsymbols_payload)
+            self._H_pilots = np.empty(self.layout.pilots_shape, dtype=np.complex128)
+            self._H_f = np.empty((2, self.layout.pilots_shape[0], K), dtype=np.complex128)
+            self._H_tmp = np.empty((N, K), dtype=np.complex128)
+            self.H_interp = np.empty((N, K), dtype=np.complex128)
+        else:
+            self.H_interp = None
+        if delay_doppler:
+            self._processor = RangeDopplerProcessor(N, K, zeropad_P, zeropad_N, window=window)
+            self._map_power = np.empty((N * zeropad_P, K * zeropad_N))
+        if sync == "correlation":
+            self._preamble = reference.tsymbols_preamble
+        self.metric = None
+        self.range_doppler_map = None
+
+    def _buffer(self, name: str, shape: tuple, dtype: type) -> np.ndarray:
+        """
+        Buffer of the pipeline, reallocated only when its shape changes (e.g. a longer capture).
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._buffers[name] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def load(self, path: str) -> np.ndarray:
+        """
+        Read the samples of a capture file (or capture container) in the sample buffer of the pipeline.
+        """
+        if is_compressed_capture(path):
+            return read_samples(path)
+        if is_capture_container(path):
+            capture = CaptureFile(path)
+            raw, fmt = capture.map(), capture.header.fmt
+        else:
+            raw, fmt = map_samples(path, self.fmt), self.fmt
+        samples = self._buffer("samples", (len(raw),), np.complex64)
+        if fmt == "sc16":
+            sc16_to_complex64(raw, out=samples)
+        else:
+            samples.view(np.float32).reshape(-1, 2)[...] = raw
+        return samples
+
+
+    ###################
+    # Synchronization #
+    ###################
+
+    def _schmidl_metric(self, y: np.ndarray) -> np.ndarray:
+        """
+        Schmidl & Cox metric of the capture averaged over the cyclic prefix (same as `StreamingMetric`),
+        from cumulative sums written in the buffers of the pipeline.
+        """
+        L = (self.reference.K // 2) * self.reference.M
+        W = self.reference.CP * self.reference.M
+        T = len(y)
+        products = self._buffer("products", (T,), np.complex128)
+        P = self._buffer("P", (T,), np.complex128)
+        power = self._buffer("power", (T,), np.float64)
+        metric = self._buffer("metric", (T,), np.float64)
+
+        # P: correlation of the samples L apart over L samples
+        products[:L] = 0
+        np.conjugate(y[:T - L], out=products[L:])
+        products[L:] *= y[L:]
+        np.cumsum(products, out=products)
+        P[:L] = products[:L]
+        np.subtract(products[L:], products[:T - L], out=P[L:])
+
+        # R: energy over L samples
+        np.multiply(y.real, y.real, out=power)
+        np.multiply(y.imag, y.imag, out=metric)
+        power += metric
+        np.cumsum(power, out=power)
+        metric[:L] = power[:L]
+        np.subtract(power[L:], power[:T - L], out=metric[L:])
+
+        # M = |P|^2 / R^2 (0 where R = 0, where P = 0 too), averaged over W samples
+        np.square(metric, out=metric)
+        np.maximum(metric, np.finfo(np.float64).tiny, out=metric)
+        np.multiply(P.real, P.real, out=power)
+        np.multiply(P.imag, P.imag, out=products.real)
+        power += products.real
+        np.divide(power, metric, out=power)
+        np.cumsum(power, out=power)
+        metric[:W] = power[:W]
+        np.subtract(power[W:], power[:T - W], out=metric[W:])
+        metric /= W
+        return metric
+
+    def _correlation_metric(self, y: np.ndarray) -> np.ndarray:
+        """
+        Magnitude of the correlation of the capture with the preamble (FFT correlation in the buffers of the pipeline).
+        """
+        T = len(y)
+        n_fft = next_fast_len(T + len(self._preamble) - 1)
+        if self._buffers.get("preamble_fft") is None or len(self._buffers["preamble_fft"]) != n_fft:
+            self._buffers["preamble_fft"] = np.conj(np.fft.fft(self._preamble, n=n_fft))
+        correlation = self._buffer("correlation", (n_fft,), np.complex128)
+        metric = self._buffer("metric", (T,), np.float64)
+        correlation[:T] = y
+        correlation[T:] = 0
+        fft_into(correlation, correlation, n=n_fft, axis=0)
+        correlation *= self._buffers["preamble_fft"]
+        fft_into(correlation, correlation, n=n_fft, axis=0, inverse=True)
+        np.abs(correlation[:T], out=metric)
+        return metric
+
+    def synchronize(self, y: np.ndarray) -> int:
+        """
+        Index of the first payload sample in the capture, -1 if no frame is detected.
+        """
+        ref = self.reference
+        half_cp = ref.CP // 2 * ref.M
+        if self.sync == "schmidl":
+            self.metric = self._schmidl_metric(y)
+            above = self._buffer("above", (len(y),), bool)
+            np.greater(self.metric, self.threshold, out=above)
+            start = int(np.argmax(above))
+            if not above[start]:
+                return -1
+            # First maximum of the run above the threshold (`find_max_idx`), on the metric of `metric_schmidl`
+            # (delayed by one sample) summed by `moving_sum`
+            idx = start + int(np.argmax(self.metric[start:find_run_end(self.metric, start, self.threshold)]))
+            return max(idx + 1 - half_cp, 0)
+
+        self.metric = self._correlation_metric(y)
+        max_idx = int(np.argmax(self.metric))
+        if len(y) - max_idx < ref.frame_tlen:
+            # Not enough samples after the maximum: second maximum (see `get_frame_synchronization_idx`)
+            first_max_idx, peak = max_idx, self.metric[max_idx]
+            self.metric[first_max_idx] = 0
+            max_idx = int(np.argmax(self.metric))
+            self.metric[first_max_idx] = peak
+        return max_idx + ref.preamble_tlen - half_cp
+
+
+    ###############################
+    # Demodulation and estimation #
+    ###############################
+
+    def demodulate(self, y: np.ndarray, start: int = 0) -> np.ndarray:
+        """
+        Demodulate the payload starting at `start` in the capture (truncated, or zero padded if the
+        capture is too short) into `fsymbols_payload_rx`.
+        """
+        ref = self.reference
+        if self.remove_first_symbol:
+            start += (ref.CP + ref.K) * ref.M
+        payload = self._symbols.reshape(-1)
+        n = max(min(len(payload), len(y) - start), 0)
+        payload[:n] = y[start:start + n]
+        payload[n:] = 0
+
+        if self.demodulation == "hardware_fft":
+            first = self.subcarrier_idx_to_skip * ref.K
+            np.multiply(self._symbols[:, first:first + ref.K], self.scale, out=self.fsymbols_payload_rx)
+            return self.fsymbols_payload_rx
+
+        symbols = self._symbols
+        if self.CP_rx and self.remove_cp_at == "beginning":
+            symbols = symbols[:, ref.CP * ref.M:]
+        elif self.CP_rx:
+            symbols = symbols[:, :-ref.CP * ref.M]
+        fft_into(symbols, self._spectrum, n=ref.K * ref.M, axis=1)
+        np.multiply(self._spectrum[:, :ref.K], self.scale, out=self.fsymbols_payload_rx)
+        return self.fsymbols_payload_rx
+
+    def estimate_channel(self) -> np.ndarray:
+        """
+        Estimate the channel on the pilots and interpolate it (bilinear, see `PilotLayout.interpolate`) into `H_interp`.
+        """
+        np.take(self.fsymbols_payload_rx.reshape(-1), self.layout.pilot_flat_idx, out=self._H_pilots.reshape(-1))
+        np.divide(self._H_pilots, self._pilots_tx, out=self._H_pilots)
+
+        # Interpolate along the subcarriers, then along the OFDM symbols
+        lo_f, hi_f, w_lo_f, w_hi_f = self._interp_f
+        H_f, H_f_hi = self._H_f
+        np.take(self._H_pilots, lo_f, axis=1, out=H_f)
+        H_f *= w_lo_f
+        np.take(self._H_pilots, hi_f, axis=1, out=H_f_hi)
+        H_f_hi *= w_hi_f
+        H_f += H_f_hi
+
+        lo_t, hi_t, w_lo_t, w_hi_t = self._interp_t
+        np.take(H_f, lo_t, axis=0, out=self.H_interp)
+        self.H_interp *= w_lo_t
+        np.take(H_f, hi_t, axis=0, out=self._H_tmp)
+        self._H_tmp *= w_hi_t
+        self.H_interp += self._H_tmp
+        return self.H_interp
+
+
+    ############
+    # Pipeline #
+    ############
+
+    def process(self, capture) -> ReceiverResult:
+        """
+        Run the pipeline on a capture.
+
+        Parameters:
+        - capture: Capture file (raw capture, capture container or compressed capture) or received samples
+
+        Returns:
+        - result: The synchronization index, BER and range-Doppler peak of the capture
+        """
+        y = self.load(capture) if isinstance(capture, (str, os.PathLike)) else np.asarray(capture)
+        sync_idx = 0 if self.sync is None else self.synchronize(y)
+        if sync_idx < 0:
+            return ReceiverResult(sync_idx)
+
+        self.demodulate(y, sync_idx)
+        if self.estimate:
+            self.estimate_channel()
+        if self.equalize:
+            np.divide(self.fsymbols_payload_rx, self.H_interp, out=self.fsymbols_payload_rx)
+
+        result = {}
+        if self.ber:
+            H = self.H_interp if self.estimate and not self.equalize else None
+            n_errors, n_bits, _ = count_errors(self.fsymbols_payload_rx, self.reference.bits_payload_packed, self.layout,
+                                               self.reference.payload_mod, self.bits_per_fsymbol, H=H)
+            result.update(n_errors=int(n_errors), n_bits=int(n_bits), ber=n_errors / n_bits if n_bits > 0 else np.nan)
+        if self.delay_doppler:
+            self.range_doppler_map = self._processor.process(self.H_interp)
+            np.abs(self.range_doppler_map, out=self._map_power)
+            np.square(self._map_power, out=self._map_power)
+            peak = int(np.argmax(self._map_power))
+            peak_doppler, peak_delay = np.unravel_index(peak, self._map_power.shape)
+            result.update(peak_doppler=int(peak_doppler), peak_delay=int(peak_delay),
+                          peak_power=float(self._map_power.flat[peak]))
+        return ReceiverResult(sync_idx, **result)
+
+    def process_all(self, captures, output: str = None) -> pd.DataFrame:
+        """
+        Run the pipeline on a sequence of captures (e.g. `dataset.CaptureDataset.paths`).
+
+        Parameters:
+        - captures: Capture files or arrays of received samples
+        - output: CSV file to write the results to
+
+        Returns:
+        - results: One row per capture: Capture (file name or index) and the fields of `ReceiverResult`
+        """
+        rows = []
+        for i, capture in enumerate(captures):
+            name = os.path.basename(capture) if isinstance(capture, (str, os.PathLike)) else i
+            rows.append({"Capture": name, **asdict(self.process(capture))})
+        results = pd.DataFrame(rows, columns=["Capture"] + list(ReceiverResult.__dataclass_fields__))
+        if output is not None:
+            results.to_csv(output, index=False)
+        return results
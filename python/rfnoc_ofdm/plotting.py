@@ -6,6 +6,7 @@ import seaborn as sns
 from scipy.special import erfc
 
 from .ofdm_frame import ofdmFrame
+from .radar import get_doppler_axis
 
 # Use latex for rendering
 def use_latex():
@@ -85,12 +86,10 @@ def plot_frame_matrix(ofdm_frame: ofdmFrame, view_bits: bool = False, view_title
     """
     Plot the pilot matrix: the signal in a (time x subcarrier) matrix.
     """
-    pilots_idx_t_mesh, pilots_idx_f_mesh = ofdm_frame.get_pilots_grid()
-    
     # Create the matrix of symbol types
     matrix = np.zeros((1 + ofdm_frame.N, ofdm_frame.K))  # (1 + N) x K matrix
     matrix[0, :] = 2  # Timing synchronization preamble
-    matrix[pilots_idx_t_mesh.T + 1, pilots_idx_f_mesh.T] = 1  # Pilots
+    matrix[1:][ofdm_frame.pilot_layout.pilot_mask] = 1  # Pilots
     
     # Create the matrix of bits sent
     bits_per_symbol = ofdm_frame._bits_per_fsymbol[ofdm_frame.payload_mod]
@@ -257,6 +256,8 @@ def plot_ber_vs_snr(ber_results: pd.DataFrame, view_title: bool = True, params:
     - SNR: The SNR value in dB
     - Modulation: The modulation scheme used (BPSK, QPSK)
     - BER: The bit error rate for the corresponding SNR and modulation scheme
+    - BER low, BER high (optional): Confidence interval of the BER (see `experiments.sweep_ber_snr`),
+      plotted as error bars. Without them, the mean and the std of the BER of each point are plotted.
     """    
     # Standard theoretical BER functions (these are correct for AWGN channels)
     bpsk_th = lambda x: 0.5 * erfc(np.sqrt(10 ** (x / 10)))
@@ -277,7 +278,14 @@ def plot_ber_vs_snr(ber_results: pd.DataFrame, view_title: bool = True, params:
         "QPSK": qpsk_th
     }
     
-    agg_results = ber_results.groupby(["Modulation", "SNR"])["BER"].agg(['mean', 'std']).reset_index()
+    if {"BER low", "BER high"} <= set(ber_results.columns):
+        agg_results = ber_results.groupby(["Modulation", "SNR"], as_index=False)[["BER", "BER low", "BER high"]].first()
+        agg_results["mean"] = agg_results["BER"]
+        agg_results["yerr_low"] = agg_results["BER"] - agg_results["BER low"]
+        agg_results["yerr_high"] = agg_results["BER high"] - agg_results["BER"]
+    else:
+        agg_results = ber_results.groupby(["Modulation", "SNR"])["BER"].agg(['mean', 'std']).reset_index()
+        agg_results["yerr_low"] = agg_results["yerr_high"] = agg_results["std"].fillna(0)
     modulations = agg_results["Modulation"].unique()
     palette = [colors["line1"], colors["line2"], colors["line3"], colors["line4"], colors["line5"], colors["line6"]]
     markers = ['o', 's', 'x', 'd', '^', 'v']
@@ -295,12 +303,11 @@ def plot_ber_vs_snr(ber_results: pd.DataFrame, view_title: bool = True, params:
         color = color_map[mod]
         marker = marker_map[mod]
         
-        # Plot Simulated Data with error bars
-        std_dev = mod_data["std"].fillna(0)
+        # Plot Simulated Data with error bars (confidence interval, or std)
         plt.errorbar(
             mod_data["SNR"],
             mod_data["mean"],
-            yerr=std_dev,
+            yerr=[mod_data["yerr_low"], mod_data["yerr_high"]],
             label=f"{mod} (Simulated)",
             color=color,
             marker=marker,
@@ -332,7 +339,8 @@ def plot_ber_vs_snr(ber_results: pd.DataFrame, view_title: bool = True, params:
     
 def plot_range_doppler_map(ofdm_frame: ofdmFrame, zeropad_P: int = 1, zeropad_N: int = 1, bandwidth: float = 40e6, view_title: bool = True) -> None:
     """
-    Plot the range-doppler map.    
+    Plot the range-doppler map.
+    If the map was computed with `delay_doppler_zoom`, the zoomed axes are used (zeropad_P and zeropad_N are ignored).
     """
     df = bandwidth / ofdm_frame.K   # subcarrier spacing
     t = 1 / df                      # symbol duration
@@ -345,9 +353,15 @@ def plot_range_doppler_map(ofdm_frame: ofdmFrame, zeropad_P: int = 1, zeropad_N:
     df_D = 1 / (ofdm_frame.N * t_frame) / zeropad_P  # Doppler frequency
     
     # Map axis
-    cp_samples = ofdm_frame.CP * ofdm_frame.M
-    delay_axis = np.arange(ofdm_frame.K * zeropad_N) * dtau  #! CAUTION: This was np.arange(cp_samples* zeropad_N) * dtau in previous implementation
-    doppler_axis = (np.arange(ofdm_frame.N * zeropad_P) - np.floor(ofdm_frame.N * zeropad_P / 2)) * df_D
+    if ofdm_frame.range_doppler_axes is not None:
+        # Zoomed map (see `ofdmFrame.delay_doppler_zoom`): axes are given in bins without zero padding
+        doppler_bins, delay_bins = ofdm_frame.range_doppler_axes
+        delay_axis = delay_bins * dtau * zeropad_N
+        doppler_axis = doppler_bins * df_D * zeropad_P
+    else:
+        cp_samples = ofdm_frame.CP * ofdm_frame.M
+        delay_axis = np.arange(ofdm_frame.K * zeropad_N) * dtau  #! CAUTION: This was np.arange(cp_samples* zeropad_N) * dtau in previous implementation
+        doppler_axis = get_doppler_axis(ofdm_frame.N * zeropad_P, zeropad_P) * df_D * zeropad_P
     
     title = "Range-Doppler Map"
     subtitle_params_values = {
@@ -368,3 +382,68 @@ def plot_range_doppler_map(ofdm_frame: ofdmFrame, zeropad_P: int = 1, zeropad_N:
     plt.ylabel('Doppler Frequency (Hz)')
     plt.xlabel('Range (m)')
     plt.tight_layout()
+
+
+def plot_roc(sweeps: dict, view_title: bool = True, max_false_alarm: float = None) -> None:
+    """
+    Plot the ROC curves (false alarm vs detection probability) and the detection and false alarm
+    probabilities vs the threshold, with the recommended threshold of each sweep.
+    The sweeps dictionary maps a label (e.g. a metric name) to a `detector.ThresholdSweep`.
+    """
+    title = "Detector ROC"
+    fig, (ax_roc, ax_th) = plt.subplots(1, 2, figsize=classical, num=title)
+    use_latex()
+    if view_title:
+        plt.suptitle(title, fontsize=14, fontweight="bold")
+    
+    palette = [colors["line1"], colors["line2"], colors["line3"], colors["line4"], colors["line5"], colors["line6"]]
+    for (label, sweep), color in zip(sweeps.items(), palette):
+        ax_roc.plot(sweep.p_false_alarm, sweep.p_detection, color=color, marker='.', label=label)
+        ax_th.plot(sweep.thresholds, sweep.p_detection, color=color, linestyle='-', label=f"{label} $P_d$")
+        ax_th.plot(sweep.thresholds, sweep.p_false_alarm, color=color, linestyle='--', label=f"{label} $P_{{fa}}$")
+        threshold = sweep.recommend(max_false_alarm)
+        if not np.isnan(threshold):
+            ax_th.axvline(threshold, color=color, linestyle=':')
+    
+    ax_roc.set_xlabel("False alarm probability")
+    ax_roc.set_ylabel("Detection probability")
+    ax_roc.grid(True, which='both', linestyle='--')
+    ax_roc.legend(loc='lower right')
+    ax_th.set_xlabel("Threshold")
+    ax_th.set_ylabel("Probability")
+    ax_th.grid(True, which='both', linestyle='--')
+    ax_th.legend(loc='best', fontsize=10)
+    fig.tight_layout()
+
+
+def plot_noise_floor(statistics, calibrations: list = (), view_title: bool = True) -> None:
+    """
+    Plot the histogram and the exceedance probability (fraction of the samples above a threshold) of the
+    noise-only metric from a `calibration.MetricStatistics` sketch, with the calibrated thresholds
+    (`calibration.ThresholdCalibration`).
+    """
+    title = "Noise floor of the metric"
+    fig, (ax_hist, ax_exc) = plt.subplots(1, 2, figsize=classical, num=title)
+    use_latex()
+    if view_title:
+        plt.suptitle(title, fontsize=14, fontweight="bold")
+
+    edges, counts = statistics.histogram
+    ax_hist.stairs(counts / max(statistics.n_samples, 1), edges, color=colors["metric"], fill=True)
+    ax_hist.set_xscale('log')
+    ax_hist.set_xlabel("Normalized metric $N[d]$")
+    ax_hist.set_ylabel("Fraction of the samples")
+    ax_hist.grid(True, which='both', linestyle='--')
+
+    thresholds = edges[(edges >= statistics.min) & (edges <= statistics.max)]
+    ax_exc.loglog(thresholds, statistics.exceedance(thresholds), color=colors["metric"])
+    for calibration in calibrations:
+        label = f"$P_{{fa}} = {calibration.pfa:g}$" + (f": {calibration.register}" if calibration.from_register else "")
+        ax_hist.axvline(calibration.threshold, color=colors["threshold"], linestyle='-.')
+        ax_exc.axvline(calibration.threshold, color=colors["threshold"], linestyle='-.', label=label)
+    ax_exc.set_xlabel("Normalized threshold")
+    ax_exc.set_ylabel("False alarm probability")
+    ax_exc.grid(True, which='both', linestyle='--')
+    if calibrations:
+        ax_exc.legend(loc='lower left', fontsize=10)
+    fig.tight_layout()
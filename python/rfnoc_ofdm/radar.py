@@ -0,0 +1,531 @@
+from dataclasses import dataclass
+
+import numpy as np
+import scipy.fft
+from scipy.signal import CZT, get_window
+
+"""
+Note: The range-Doppler maps follow the convention of `ofdmFrame.delay_doppler`: FFT along the
+      OFDM symbols (Doppler, zero padded to N * zeropad_P and shifted so that the zero Doppler is
+      in the middle) and IFFT along the subcarriers (delay, zero padded to K * zeropad_N).
+      `get_target_channel` synthesizes the channel of point targets with the same convention.
+"""
+
+# numpy >= 2.0 FFTs support single precision and can write into an existing array
+_NUMPY_FFT_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+
+def fft_into(x: np.ndarray, out: np.ndarray, n: int, axis: int, inverse: bool = False) -> np.ndarray:
+    """
+    FFT (or IFFT) of x along axis, zero padded to n, written in out (which may be x itself).
+    """
+    if _NUMPY_FFT_OUT:
+        transform = np.fft.ifft if inverse else np.fft.fft
+        return transform(x, n=n, axis=axis, out=out)
+    transform = scipy.fft.ifft if inverse else scipy.fft.fft
+    out[...] = transform(x, n=n, axis=axis, overwrite_x=x is out)
+    return out
+
+
+def get_radar_window(window, length: int, chebyshev_attenuation: float = 100) -> np.ndarray:
+    """
+    Get a tapering window.
+
+    Parameters:
+    - window: None or "rect" (no window), "hann", "chebyshev", or any `scipy.signal.get_window` window
+    - length: Window length                                                    [# of samples]
+    - chebyshev_attenuation: Side lobes attenuation of the Chebyshev window    [dB]
+    """
+    if window is None or window == "rect":
+        return np.ones(length)
+    if window == "hann":
+        return get_window("hann", length)
+    if window == "chebyshev":
+        return get_window(("chebwin", chebyshev_attenuation), length)
+    return get_window(window, length)
+
+
+def get_doppler_axis(n_doppler: int, zeropad_P: int = 1) -> np.ndarray:
+    """
+    Signed Doppler bin (of the map without zero padding) of each row of a range-Doppler map.
+    The Doppler shift of the maps (ifftshift) puts the zero Doppler in row (n_doppler + 1) // 2.
+
+    Parameters:
+    - n_doppler: Number of rows of the map (N * zeropad_P)
+    - zeropad_P: Zero padding of the Doppler axis                               [int] >= 1
+    """
+    return (np.arange(n_doppler) - (n_doppler + 1) // 2) / zeropad_P
+
+
+class RangeDopplerProcessor:
+    """
+    Range-Doppler processor for one or a stack of channel estimates (B x N x K).
+
+    The processor is configured once: the windows (including the Doppler shift, applied as a phase
+    ramp on the input) are precomputed, and the input/output buffers are allocated at the first call
+    and reused by the next calls with the same batch size. The Doppler FFT is performed in place in
+    the output buffer.
+    """
+
+    def __init__(self, N: int, K: int, zeropad_P: int = 1, zeropad_N: int = 1,
+                 window=None, dtype: type = np.complex128, chebyshev_attenuation: float = 100
+        ) -> None:
+        """
+        Initialize a RangeDopplerProcessor.
+
+        Parameters:
+        - N: Number of OFDM symbols of the channel estimates                [# of symbols] >= 1
+        - K: Number of subcarriers of the channel estimates                 [# of subcarriers] >= 1
+        - zeropad_P: Zero padding for the Doppler shift                     [int] >= 1
+        - zeropad_N: Zero padding for the range shift                       [int] >= 1
+        - window: Window applied on both axes (see `get_radar_window`)      [None, rect, hann, chebyshev, ...]
+        - dtype: Complex type of the maps                                   [complex64, complex128]
+        - chebyshev_attenuation: Side lobes attenuation of the Chebyshev window [dB]
+        """
+        if N < 1 or K < 1 or zeropad_P < 1 or zeropad_N < 1:
+            raise ValueError("Invalid range-Doppler parameters")
+
+        self.N = N
+        self.K = K
+        self.zeropad_P = zeropad_P
+        self.zeropad_N = zeropad_N
+        self.dtype = np.dtype(dtype)
+        self.n_doppler = N * zeropad_P
+        self.n_delay = K * zeropad_N
+        self.doppler_axis = get_doppler_axis(self.n_doppler, zeropad_P)
+
+        # Windows, the Doppler shift (ifftshift of the output) is a phase ramp along the symbols
+        shift = self.n_doppler // 2
+        ramp_t = np.exp(-2j * np.pi * shift * np.arange(N) / self.n_doppler)
+        weights_t = get_radar_window(window, N, chebyshev_attenuation) * ramp_t
+        weights_f = get_radar_window(window, K, chebyshev_attenuation)
+        self.weights = (weights_t[:, np.newaxis] * weights_f[np.newaxis, :]).astype(self.dtype)
+
+        # Buffers, allocated for a given batch size
+        self._batch_size = None
+        self._weighted = None
+        self._maps = None
+
+    def _allocate(self, batch_size: int) -> None:
+        """
+        (Re)allocate the buffers for a given batch size.
+        """
+        if batch_size != self._batch_size:
+            self._batch_size = batch_size
+            self._weighted = np.empty((batch_size, self.N, self.K), dtype=self.dtype)
+            self._maps = np.empty((batch_size, self.n_doppler, self.n_delay), dtype=self.dtype)
+
+    def process(self, H: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        Compute the range-Doppler map(s) of the channel estimate(s).
+
+        Parameters:
+        - H: Channel estimates                          [N x K] or [B x N x K]
+        - out: Output array [B x N * zeropad_P x K * zeropad_N], by default the internal buffer of
+               the processor is returned: it is overwritten at the next call (copy it to keep it)
+
+        Returns:
+        - maps: Range-Doppler maps                      [N * zeropad_P x K * zeropad_N] or [B x ...]
+        """
+        single = H.ndim == 2
+        H = H[np.newaxis] if single else H
+        if H.shape[1:] != (self.N, self.K):
+            raise ValueError(f"Invalid channel estimates shape: expected (B, {self.N}, {self.K}), got {H.shape}")
+
+        batch_size = H.shape[0]
+        self._allocate(batch_size)
+        maps = self._maps if out is None else out
+        if maps.shape != (batch_size, self.n_doppler, self.n_delay):
+            raise ValueError(f"Invalid output shape: expected {(batch_size, self.n_doppler, self.n_delay)}, got {maps.shape}")
+
+        # Windowing (and Doppler shift) + IFFT along the subcarriers of the N symbols
+        np.multiply(H, self.weights, out=self._weighted)
+        fft_into(self._weighted, maps[:, :self.N, :], n=self.n_delay, axis=2, inverse=True)
+
+        # Zero padding + FFT along the OFDM symbols, in place
+        maps[:, self.N:, :] = 0
+        fft_into(maps, maps, n=self.n_doppler, axis=1)
+        return maps[0] if single else maps
+
+
+class RangeDopplerZoom:
+    """
+    High resolution range-Doppler map over a region of interest, computed with a chirp-Z (Bluestein)
+    transform along each axis: the delay-Doppler spectrum is evaluated on an arbitrary fine grid
+    of the given window only, instead of zero padding the full map.
+
+    The axes are expressed in bins of the map without zero padding:
+    - Doppler bins are signed, 0 being the zero Doppler (row (N * zeropad_P + 1) // 2 of `RangeDopplerProcessor`,
+      whose rows are at the Doppler bins `RangeDopplerProcessor.doppler_axis`, see `get_doppler_axis`);
+    - delay bins go from 0 to K (column c of `RangeDopplerProcessor` is the delay bin c / zeropad_N).
+    The amplitude matches the one of `RangeDopplerProcessor` without zero padding on the delay axis.
+    """
+
+    def __init__(self, N: int, K: int, doppler_bins: tuple[float, float], delay_bins: tuple[float, float],
+                 n_doppler: int, n_delay: int, window=None, chebyshev_attenuation: float = 100
+        ) -> None:
+        """
+        Initialize a RangeDopplerZoom.
+
+        Parameters:
+        - N: Number of OFDM symbols of the channel estimates                [# of symbols] >= 1
+        - K: Number of subcarriers of the channel estimates                 [# of subcarriers] >= 1
+        - doppler_bins: First and last Doppler bins of the window           [bins]
+        - delay_bins: First and last delay bins of the window               [bins]
+        - n_doppler: Number of points of the Doppler axis                   [# of points] >= 1
+        - n_delay: Number of points of the delay axis                       [# of points] >= 1
+        - window: Window applied on both axes (see `get_radar_window`)      [None, rect, hann, chebyshev, ...]
+        - chebyshev_attenuation: Side lobes attenuation of the Chebyshev window [dB]
+        """
+        if N < 1 or K < 1 or n_doppler < 1 or n_delay < 1:
+            raise ValueError("Invalid range-Doppler zoom parameters")
+
+        self.N = N
+        self.K = K
+        self.doppler_axis = np.linspace(doppler_bins[0], doppler_bins[1], n_doppler)
+        self.delay_axis = np.linspace(delay_bins[0], delay_bins[1], n_delay)
+        doppler_step = self.doppler_axis[1] - self.doppler_axis[0] if n_doppler > 1 else 0
+        delay_step = self.delay_axis[1] - self.delay_axis[0] if n_delay > 1 else 0
+
+        # Doppler: X(v) = sum_n h[n] exp(-2j pi n v / N), evaluated on z_k = exp(2j pi v_k / N)
+        self._czt_doppler = CZT(N, n_doppler,
+                                w=np.exp(-2j * np.pi * doppler_step / N),
+                                a=np.exp(2j * np.pi * self.doppler_axis[0] / N))
+        # Delay: x(t) = 1/K sum_k H[k] exp(2j pi k t / K), evaluated on z_k = exp(-2j pi t_k / K)
+        self._czt_delay = CZT(K, n_delay,
+                              w=np.exp(2j * np.pi * delay_step / K),
+                              a=np.exp(-2j * np.pi * self.delay_axis[0] / K))
+
+        weights_t = get_radar_window(window, N, chebyshev_attenuation)
+        weights_f = get_radar_window(window, K, chebyshev_attenuation)
+        self.weights = weights_t[:, np.newaxis] * weights_f[np.newaxis, :] / K
+
+    def process(self, H: np.ndarray) -> np.ndarray:
+        """
+        Compute the zoomed range-Doppler map(s) of the channel estimate(s).
+
+        Parameters:
+        - H: Channel estimates                          [N x K] or [B x N x K]
+
+        Returns:
+        - maps: Zoomed range-Doppler maps               [n_doppler x n_delay] or [B x n_doppler x n_delay]
+        """
+        if H.shape[-2:] != (self.N, self.K):
+            raise ValueError(f"Invalid channel estimates shape: expected (..., {self.N}, {self.K}), got {H.shape}")
+        maps = self._czt_delay(H * self.weights, axis=-1)
+        return self._czt_doppler(maps, axis=-2)
+
+
+class SlidingRangeDoppler:
+    """
+    Streaming range-Doppler processor with a sliding coherent processing interval (CPI).
+
+    The channel estimates are pushed symbol by symbol (or by blocks of symbols). The range profile of
+    each symbol (IFFT along the subcarriers) is computed once, when the symbol arrives, and stored in
+    a ring buffer of the last `n_cpi` profiles. Every `hop` symbols, only the Doppler FFT over the
+    profiles of the current CPI is computed to produce a new map. The maps follow the convention of
+    `RangeDopplerProcessor` with N = n_cpi (the Doppler phase reference is the first symbol of the CPI).
+    """
+
+    def __init__(self, K: int, n_cpi: int, hop: int = 1, zeropad_P: int = 1, zeropad_N: int = 1,
+                 window=None, dtype: type = np.complex128, chebyshev_attenuation: float = 100
+        ) -> None:
+        """
+        Initialize a SlidingRangeDoppler.
+
+        Parameters:
+        - K: Number of subcarriers of the channel estimates                 [# of subcarriers] >= 1
+        - n_cpi: Number of OFDM symbols of the CPI                          [# of symbols] >= 1
+        - hop: Number of new symbols between two maps                       [# of symbols] >= 1
+        - zeropad_P: Zero padding for the Doppler shift                     [int] >= 1
+        - zeropad_N: Zero padding for the range shift                       [int] >= 1
+        - window: Window applied on both axes (see `get_radar_window`)      [None, rect, hann, chebyshev, ...]
+        - dtype: Complex type of the maps                                   [complex64, complex128]
+        - chebyshev_attenuation: Side lobes attenuation of the Chebyshev window [dB]
+        """
+        if K < 1 or n_cpi < 1 or hop < 1 or zeropad_P < 1 or zeropad_N < 1:
+            raise ValueError("Invalid sliding range-Doppler parameters")
+
+        self.K = K
+        self.n_cpi = n_cpi
+        self.hop = hop
+        self.dtype = np.dtype(dtype)
+        self.n_doppler = n_cpi * zeropad_P
+        self.n_delay = K * zeropad_N
+
+        # Windows, the Doppler shift (ifftshift of the output) is a phase ramp along the symbols of the CPI
+        shift = self.n_doppler // 2
+        ramp_t = np.exp(-2j * np.pi * shift * np.arange(n_cpi) / self.n_doppler)
+        self.weights_t = (get_radar_window(window, n_cpi, chebyshev_attenuation) * ramp_t).astype(self.dtype)[:, np.newaxis]
+        self.weights_f = get_radar_window(window, K, chebyshev_attenuation).astype(self.dtype)
+
+        # Ring buffer of the range profiles, and Doppler FFT buffer (zero padded)
+        self._profiles = np.zeros((n_cpi, self.n_delay), dtype=self.dtype)
+        self._weighted = np.empty((n_cpi, K), dtype=self.dtype)
+        self._map = np.zeros((self.n_doppler, self.n_delay), dtype=self.dtype)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Empty the ring buffer (e.g. after a discontinuity in the stream).
+        """
+        self._head = 0  # Slot of the next profile in the ring buffer
+        self.n_symbols = 0  # Number of symbols pushed since the last reset
+        self._next_map = self.n_cpi  # Number of symbols pushed when the next map is due
+
+    def _compute_map(self) -> np.ndarray:
+        """
+        Doppler FFT over the profiles of the current CPI (oldest profile first).
+        """
+        oldest = self.n_cpi - self._head
+        np.multiply(self._profiles[self._head:], self.weights_t[:oldest], out=self._map[:oldest])
+        np.multiply(self._profiles[:self._head], self.weights_t[oldest:], out=self._map[oldest:self.n_cpi])
+        self._map[self.n_cpi:] = 0
+        return fft_into(self._map, self._map, n=self.n_doppler, axis=0).copy()
+
+    def push(self, H: np.ndarray) -> list[np.ndarray]:
+        """
+        Push the channel estimates of new OFDM symbols.
+
+        Parameters:
+        - H: Channel estimates of the new symbols       [K] or [M x K]
+
+        Returns:
+        - maps: Range-Doppler maps completed by these symbols, oldest first (may be empty)
+                [n_cpi * zeropad_P x K * zeropad_N] each
+        """
+        H = np.atleast_2d(H)
+        if H.shape[1] != self.K:
+            raise ValueError(f"Invalid channel estimates shape: expected (M, {self.K}), got {H.shape}")
+
+        maps = []
+        start = 0
+        while start < H.shape[0]:
+            # Range profiles of the symbols up to the next map (or the end of the ring buffer), written in place
+            count = min(H.shape[0] - start, self._next_map - self.n_symbols, self.n_cpi - self._head)
+            weighted = np.multiply(H[start:start + count], self.weights_f, out=self._weighted[:count])
+            fft_into(weighted, self._profiles[self._head:self._head + count], n=self.n_delay, axis=1, inverse=True)
+
+            start += count
+            self.n_symbols += count
+            self._head = (self._head + count) % self.n_cpi
+            if self.n_symbols == self._next_map:
+                maps.append(self._compute_map())
+                self._next_map += self.hop
+        return maps
+
+
+#################
+# Target scenes #
+#################
+
+def _target_parameters(delays, dopplers, gains) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Broadcast the target parameters to per-scene arrays [B x P].
+    """
+    delays = np.asarray(delays, dtype=float)
+    dopplers = np.asarray(dopplers, dtype=float)
+    gains = np.ones(np.broadcast_shapes(delays.shape, dopplers.shape)) if gains is None else np.asarray(gains, dtype=complex)
+    shape = np.broadcast_shapes(delays.shape, dopplers.shape, gains.shape)
+    if len(shape) not in (1, 2):
+        raise ValueError(f"Invalid target parameters shape: expected (P,) or (B, P), got {shape}")
+    shape = shape if len(shape) == 2 else (1,) + shape
+    return (np.broadcast_to(delays, shape), np.broadcast_to(dopplers, shape), np.broadcast_to(gains, shape))
+
+
+def get_target_channel(N: int, K: int, delays, dopplers, gains=None, symbols: np.ndarray = None,
+                       dtype: type = np.complex128) -> np.ndarray:
+    """
+    Frequency-domain channel of point targets (doubly-dispersive channel), on the OFDM grid:
+
+        H[n, k] = sum_p gains[p] exp(2j pi dopplers[p] n / N) exp(-2j pi delays[p] k / K)
+
+    The channel is constant over an OFDM symbol (no inter-carrier interference), so each target is
+    the product of a Doppler ramp along the symbols and of a delay ramp along the subcarriers, and
+    the channel of a scene is a single matrix product (N x P) @ (P x K): the exponentials are only
+    computed (N + K) * P times per scene. The delays and Doppler shifts are in bins of the map without
+    zero padding (see `RangeDopplerZoom`), and may be fractional. A map estimated on a pilot grid with
+    one pilot symbol every Nt symbols (and one pilot subcarrier every Nf subcarriers) only resolves the
+    Doppler shifts within +-N / (2 * Nt) bins (and the delays below K / Nf bins) without aliasing.
+
+    Parameters:
+    - N: Number of OFDM symbols                                          [# of symbols] >= 1
+    - K: Number of subcarriers                                           [# of subcarriers] >= 1
+    - delays: Delay of each target                                       [bins] [P] or [B x P]
+    - dopplers: Doppler shift of each target (0 is the zero Doppler)     [bins] [P] or [B x P]
+    - gains: Complex amplitude of each target (default: 1)               [P] or [B x P]
+    - symbols: Indices of the symbols on the Doppler ramp (default: 0 to N - 1, -1 for the preamble)
+    - dtype: Complex type of the channel                                 [complex64, complex128]
+
+    Returns:
+    - H: Channel of each scene                                           [B x len(symbols) x K]
+    """
+    if N < 1 or K < 1:
+        raise ValueError("Invalid target channel parameters")
+    delays, dopplers, gains = _target_parameters(delays, dopplers, gains)
+    n = np.arange(N) if symbols is None else np.asarray(symbols)
+    k = np.arange(K)
+    ramps_t = (gains[:, np.newaxis, :] * np.exp(2j * np.pi * n[:, np.newaxis] * dopplers[:, np.newaxis, :] / N)).astype(dtype)
+    ramps_f = np.exp(-2j * np.pi * delays[:, :, np.newaxis] * k / K).astype(dtype)
+    return np.matmul(ramps_t, ramps_f)
+
+
+########
+# CFAR #
+########
+
+@dataclass(frozen=True)
+class Target:
+    """
+    Target detected on a range-Doppler map.
+
+    Attributes:
+    - doppler_idx, delay_idx: Row and column of the detection in the map
+    - doppler_bin, delay_bin: Position of the detection on the map axes
+    - snr: Power of the cell over the estimated noise power    [dB]
+    """
+    doppler_idx: int
+    delay_idx: int
+    doppler_bin: float
+    delay_bin: float
+    snr: float
+
+
+def _box_sums(sat: np.ndarray, rows: int, cols: int, half_height: int, half_width: int, offset: tuple[int, int]) -> np.ndarray:
+    """
+    Sums over the (2 * half_height + 1) x (2 * half_width + 1) boxes centered on each of the (rows x cols)
+    cells, from the summed-area table of a map padded by `offset` (rows, columns) on each side.
+    """
+    r0 = offset[0] - half_height
+    c0 = offset[1] - half_width
+    r1 = offset[0] + half_height + 1
+    c1 = offset[1] + half_width + 1
+    return (sat[r1:r1 + rows, c1:c1 + cols] - sat[r0:r0 + rows, c1:c1 + cols]
+            - sat[r1:r1 + rows, c0:c0 + cols] + sat[r0:r0 + rows, c0:c0 + cols])
+
+
+def _os_cfar_factor(n_train: int, rank: int, pfa: float) -> float:
+    """
+    Threshold factor of the OS-CFAR: solves prod_{i<rank} (n - i) / (n - i + alpha) = pfa by bisection.
+    """
+    i = np.arange(rank)
+    log_pfa = lambda alpha: np.sum(np.log((n_train - i) / (n_train - i + alpha)))
+    low, high = 0.0, 1.0
+    while log_pfa(high) > np.log(pfa):
+        high *= 2
+    for _ in range(100):
+        mid = (low + high) / 2
+        low, high = (mid, high) if log_pfa(mid) > np.log(pfa) else (low, mid)
+    return high
+
+
+def cfar_noise(power: np.ndarray, guard: tuple[int, int] = (2, 2), train: tuple[int, int] = (4, 4),
+               pfa: float = 1e-6, method: str = "ca", os_quantile: float = 0.75, circular_doppler: bool = True
+    ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Noise power estimation and CFAR threshold of each cell of a power map (see `cfar_detect`).
+
+    Returns:
+    - noise: Estimated noise power of each cell
+    - threshold: Detection threshold of each cell
+    """
+    if method not in ("ca", "os"):
+        raise ValueError(f"Invalid CFAR method: {method}")
+    rows, cols = power.shape
+    pad_rows = guard[0] + train[0]
+    pad_cols = guard[1] + train[1]
+    if circular_doppler and 2 * pad_rows + 1 > rows:
+        raise ValueError("The CFAR window is larger than the Doppler axis")
+
+    # Pad the map: wrap the Doppler axis, zeros (and no valid cell) outside of the delay axis
+    row_mode = "wrap" if circular_doppler else "constant"
+    padded = np.pad(np.pad(power, ((pad_rows, pad_rows), (0, 0)), mode=row_mode), ((0, 0), (pad_cols, pad_cols)))
+    valid = np.pad(np.pad(np.ones((rows, cols)), ((pad_rows, pad_rows), (0, 0)), mode=row_mode), ((0, 0), (pad_cols, pad_cols)))
+
+    if method == "ca":
+        # Summed-area tables of the power and of the valid cells
+        sums = []
+        for grid in (padded, valid):
+            sat = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1))
+            np.cumsum(np.cumsum(grid, axis=0), axis=1, out=sat[1:, 1:])
+            outer = _box_sums(sat, rows, cols, pad_rows, pad_cols, (pad_rows, pad_cols))
+            inner = _box_sums(sat, rows, cols, guard[0], guard[1], (pad_rows, pad_cols))
+            sums.append(outer - inner)
+        train_sum, n_train = sums
+        n_train = np.maximum(np.rint(n_train), 1)
+        noise = np.maximum(train_sum, 0) / n_train
+        threshold = noise * n_train * (pfa ** (-1 / n_train) - 1)
+    else:
+        # Ordered statistic of the training cells, computed by blocks of rows to bound the memory
+        windows = np.lib.stride_tricks.sliding_window_view(np.where(valid > 0, padded, np.nan), (2 * pad_rows + 1, 2 * pad_cols + 1))
+        train_mask = np.ones((2 * pad_rows + 1, 2 * pad_cols + 1), dtype=bool)
+        train_mask[train[0]:train[0] + 2 * guard[0] + 1, train[1]:train[1] + 2 * guard[1] + 1] = False
+        n_cells = int(np.sum(train_mask))
+        rank = max(1, int(np.ceil(os_quantile * n_cells)))
+        factor = _os_cfar_factor(n_cells, rank, pfa)
+        noise = np.empty((rows, cols))
+        block = max(1, (1 << 22) // (cols * n_cells))
+        for start in range(0, rows, block):
+            cells = windows[start:start + block][..., train_mask]
+            n_valid = np.sum(~np.isnan(cells), axis=-1)
+            cells = np.sort(cells, axis=-1)  # NaN (outside of the map) are sorted last
+            k = np.clip(np.ceil(os_quantile * n_valid).astype(int), 1, None) - 1
+            noise[start:start + block] = np.take_along_axis(cells, k[..., np.newaxis], axis=-1)[..., 0]
+        threshold = factor * noise
+
+    return noise, threshold
+
+
+def cfar_detect(range_doppler_map: np.ndarray, guard: tuple[int, int] = (2, 2), train: tuple[int, int] = (4, 4),
+                pfa: float = 1e-6, method: str = "ca", os_quantile: float = 0.75, circular_doppler: bool = True,
+                peaks_only: bool = True, doppler_axis: np.ndarray = None, delay_axis: np.ndarray = None
+    ) -> list[Target]:
+    """
+    2-D CFAR detection on the power |range_doppler_map|^2.
+
+    The noise power of each cell is estimated on the training cells around it (a rectangle of
+    guard + train cells on each side, minus the guard rectangle and the cell itself). For the
+    cell-averaging CFAR, the training sums come from a summed-area table, so the cost is O(N * K)
+    whatever the window size. The Doppler axis (rows) wraps around, the delay axis (columns) is
+    truncated at the edges of the map.
+
+    Parameters:
+    - range_doppler_map: Complex range-Doppler map (a real map is used as the power directly)
+    - guard: Number of guard cells on each side                     (Doppler, delay)
+    - train: Number of training cells on each side, after the guard  (Doppler, delay)
+    - pfa: Probability of false alarm per cell
+    - method: ca (cell averaging) or os (ordered statistic)
+    - os_quantile: Rank of the ordered statistic, as a fraction of the training cells (OS-CFAR only)
+    - circular_doppler: Wrap the Doppler axis around (set to False for zoomed maps)
+    - peaks_only: Keep only the detections that are local maxima of their 3 x 3 neighbourhood
+    - doppler_axis: Doppler bin of each row (default: signed bins of `RangeDopplerProcessor`, see `get_doppler_axis`)
+    - delay_axis: Delay bin of each column (default: column index)
+
+    Returns:
+    - targets: Detected targets, sorted by decreasing SNR
+    """
+    power = np.abs(range_doppler_map) ** 2 if np.iscomplexobj(range_doppler_map) else np.asarray(range_doppler_map, dtype=float)
+    rows, cols = power.shape
+    noise, threshold = cfar_noise(power, guard, train, pfa, method, os_quantile, circular_doppler)
+
+    detections = power > threshold
+    if peaks_only:
+        neighbours = np.pad(power, 1, mode="constant")
+        if circular_doppler:
+            neighbours[0, 1:-1], neighbours[-1, 1:-1] = power[-1], power[0]
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if dr or dc:
+                    detections &= power >= neighbours[1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols]
+
+    if doppler_axis is None:
+        doppler_axis = get_doppler_axis(rows)
+    if delay_axis is None:
+        delay_axis = np.arange(cols)
+    doppler_idx, delay_idx = np.nonzero(detections)
+    with np.errstate(divide="ignore", over="ignore"):  # Noiseless maps: clamp the ratio to the largest float
+        ratio = np.minimum(power[doppler_idx, delay_idx] / noise[doppler_idx, delay_idx], np.finfo(float).max)
+    snr = 10 * np.log10(ratio)
+    order = np.argsort(-snr)
+    return [Target(int(doppler_idx[i]), int(delay_idx[i]), float(doppler_axis[doppler_idx[i]]),
+                   float(delay_axis[delay_idx[i]]), float(snr[i])) for i in order]
@@ -1,6 +1,6 @@
-from numpy import array, zeros, reshape
-from numpy import sqrt, exp, sign, angle, imag, real
-from numpy import complex64, pi
+from numpy import array, zeros, reshape, stack, argsort, clip, mod, rint, minimum, broadcast_to
+from numpy import sqrt, exp, sign, angle, imag, real, cos
+from numpy import complex64, float32, intp, pi
 
 
 ##############
@@ -127,6 +127,96 @@ def inverse_mapping(symb, const="BPSK"):
         raise InputError("Unknown constellation specified : " + const)
     return out.astype(int)
 
+def soft_demapping(symb, const="BPSK", noise_var=1.0):
+    """
+    Computes the max-log log-likelihood ratios (LLRs) of the bits carried by the symbol stream <symb>,
+    using the constellation defined by <const>. Closed forms of the max-log approximation are used
+    for each bit (no search over the constellation), so the cost is close to the one of inverse_mapping.
+    The LLR of a bit b is log(P(b=0|y)/P(b=1|y)): positive values favour 0, and the sign of the LLRs
+    gives the same decisions as inverse_mapping.
+
+    Parameters
+    ----------
+    symb : Numpy complex 1D array
+        Input (equalized) symbol stream.
+    const : String
+        Constellation :
+            - "BPSK"  : BPSK constellation;
+            - "QPSK"  : QPSK constellation;
+            - "16QAM" : 16-QAM constellation;
+            - "16PSK" : 16-PSK constellation.
+    noise_var : Float or numpy float 1D array
+        Complex noise variance E[|n|^2] of each symbol (e.g. N0 / |H|^2 after equalization).
+
+    Raises
+    ------
+    InputError
+        Raised when an incorrect constellation is specified.
+
+    Returns
+    -------
+    Numpy float32 1D array
+        Output LLR stream, in the same bit order as inverse_mapping.
+    """
+    
+    symb = array(symb)
+    inv_var = broadcast_to(1 / array(noise_var, dtype=float), symb.shape)
+    
+    if const == "BPSK":
+        out = 4 * real(symb) * inv_var
+    elif const == "QPSK":
+        llr_I = 2 * sqrt(2) * real(symb) * inv_var
+        llr_Q = 2 * sqrt(2) * imag(symb) * inv_var
+        out = reshape(stack([llr_I, llr_Q], axis=-1), (symb.size*2,))
+    elif const == "16QAM":
+        d = 1 / sqrt(10)
+        def sign_llr(x):
+            # Bit set for positive values, levels {-3d, -d} (0) and {d, 3d} (1)
+            return -4 * d * (2*x - clip(x, -2*d, 2*d))
+        def magnitude_llr(x):
+            # Bit set for the inner levels (+-d)
+            return 4 * d * (abs(x) - 2*d)
+        symb_I, symb_Q = real(symb), imag(symb)
+        llrs = [sign_llr(symb_Q), magnitude_llr(symb_Q), sign_llr(symb_I), magnitude_llr(symb_I)]
+        out = reshape(stack([llr * inv_var for llr in llrs], axis=-1), (symb.size*4,))
+    elif const == "16PSK":
+        # Position of the symbol on the circle, in units of the constellation spacing
+        pos = mod((angle(symb) - _PSK16_angles[0]) / (2*pi/16), 16)
+        nearest = mod(rint(pos), 16).astype(intp)
+        delta = pos - nearest
+        delta = delta - 16 * (delta > 8)
+        scale = 2 * abs(symb) * inv_var
+        cos_same = cos(delta * (2*pi/16))
+        llrs = []
+        for b in range(4):
+            # The closest point carrying the decided bit value is the nearest point itself, the closest
+            # point with the flipped bit is found on the left or on the right of it
+            dist_flip = minimum(_PSK16_left[nearest, b] + delta, _PSK16_right[nearest, b] - delta)
+            sign_b = 1 - 2 * _PSK16_labels[nearest, b]
+            llrs.append(scale * sign_b * (cos_same - cos(dist_flip * (2*pi/16))))
+        out = reshape(stack(llrs, axis=-1), (symb.size*4,))
+    else:
+        raise InputError("Unknown constellation specified : " + const)
+    return out.astype(float32)
+
+def _psk16_tables():
+    """
+    Precomputes the 16-PSK tables used by soft_demapping: the points angles in circular order, their
+    bit labels, and for each point and each bit the distance (in points) to the closest point with the
+    flipped bit on the left and on the right.
+    """
+    labels_by_point = array([[(i >> (3 - b)) & 1 for b in range(4)] for i in range(16)])
+    angles = mod(angle(PSK16_const), 2*pi)
+    order = argsort(angles)
+    labels = labels_by_point[order]
+    left = zeros((16, 4))
+    right = zeros((16, 4))
+    for j in range(16):
+        for b in range(4):
+            left[j, b] = next(o for o in range(1, 17) if labels[(j - o) % 16, b] != labels[j, b])
+            right[j, b] = next(o for o in range(1, 17) if labels[(j + o) % 16, b] != labels[j, b])
+    return angles[order], labels, left, right
+
 # Variables
 bits = [0,1]
 BPSK_const = symbol_mapping(bits,"BPSK")
@@ -136,3 +226,4 @@ bits = [0,0,0,0,0,0,0,1,0,0,1,0,0,0,1,1,0,1,0,0,0,1,0,1,0,1,1,0,0,1,1,1, \
         1,0,0,0,1,0,0,1,1,0,1,0,1,0,1,1,1,1,0,0,1,1,0,1,1,1,1,0,1,1,1,1]
 QAM16_const = symbol_mapping(bits,"16QAM")
 PSK16_const = symbol_mapping(bits,"16PSK")
+_PSK16_angles, _PSK16_labels, _PSK16_left, _PSK16_right = _psk16_tables()
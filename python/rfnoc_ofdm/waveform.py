@@ -0,0 +1,157 @@
+import hashlib
+import struct
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .capture import get_sample_dtype, sc16_to_complex64
+
+"""
+Note: Binary waveform file, read by `tx_waveforms_radar` and `ofdmFrame.load_tsymbols_txt`.
+      A 128-byte little-endian header is followed by the interleaved I/Q samples (float32 pairs for
+      fc32, int16 pairs for sc16). The samples are normalized so that the largest I/Q component is
+      `peak` (0.7 by default, as the text export); sc16 samples are scaled to the int16 full scale.
+
+      offset  size  field
+      0       8     magic "RFNOCWAV"
+      8       2     version (uint16)
+      10      2     sample format (uint16): 0 = fc32, 1 = sc16
+      12      4     header size (uint32)
+      16      8     number of samples (uint64)
+      24      8     scale (float64): stored sample = scale * time domain symbol (before the sc16 full scale)
+      32      24    K, CP, M, N, Nt, Nf (uint32)
+      56      8     preamble modulation (ASCII, zero padded)
+      64      8     payload modulation (ASCII, zero padded)
+      72      8     random seed of the frame (uint64)
+      80      32    SHA-256 digest of the sample bytes
+      112     16    reserved (zeros)
+"""
+
+WAVEFORM_MAGIC = b"RFNOCWAV"
+WAVEFORM_VERSION = 1
+WAVEFORM_HEADER_SIZE = 128
+WAVEFORM_FORMATS = ("fc32", "sc16")
+
+# Full scale of the sc16 samples
+SC16_FULL_SCALE = 32767
+
+_HEADER_STRUCT = struct.Struct("<8sHHIQd6I8s8sQ32s16x")
+
+
+@dataclass(frozen=True)
+class WaveformHeader:
+    """
+    Header of a binary waveform file (see the layout above).
+    """
+    fmt: str
+    n_samples: int
+    scale: float
+    K: int
+    CP: int
+    M: int
+    N: int
+    Nt: int
+    Nf: int
+    preamble_mod: str
+    payload_mod: str
+    random_seed: int
+    digest: bytes = field(repr=False)
+    version: int = WAVEFORM_VERSION
+
+    def pack(self) -> bytes:
+        """
+        Serialize the header (128 bytes).
+        """
+        return _HEADER_STRUCT.pack(
+            WAVEFORM_MAGIC, self.version, WAVEFORM_FORMATS.index(self.fmt), WAVEFORM_HEADER_SIZE,
+            self.n_samples, self.scale, self.K, self.CP, self.M, self.N, self.Nt, self.Nf,
+            self.preamble_mod.encode("ascii"), self.payload_mod.encode("ascii"), self.random_seed, self.digest)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "WaveformHeader":
+        """
+        Parse a header, raise a ValueError if the data is not a waveform header.
+        """
+        if len(data) < WAVEFORM_HEADER_SIZE or data[:len(WAVEFORM_MAGIC)] != WAVEFORM_MAGIC:
+            raise ValueError("Not a binary waveform file")
+        (_, version, fmt, header_size, n_samples, scale, K, CP, M, N, Nt, Nf,
+         preamble_mod, payload_mod, random_seed, digest) = _HEADER_STRUCT.unpack(data[:WAVEFORM_HEADER_SIZE])
+        if version != WAVEFORM_VERSION or header_size != WAVEFORM_HEADER_SIZE or fmt >= len(WAVEFORM_FORMATS):
+            raise ValueError(f"Unsupported waveform file (version {version}, format {fmt})")
+        return cls(WAVEFORM_FORMATS[fmt], n_samples, scale, K, CP, M, N, Nt, Nf,
+                   preamble_mod.rstrip(b"\0").decode("ascii"), payload_mod.rstrip(b"\0").decode("ascii"),
+                   random_seed, digest, version)
+
+
+def is_waveform_file(path: str) -> bool:
+    """
+    True if the file starts with the binary waveform magic.
+    """
+    with open(path, "rb") as file:
+        return file.read(len(WAVEFORM_MAGIC)) == WAVEFORM_MAGIC
+
+
+def write_waveform(path: str, tsymbols: np.ndarray, fmt: str = "fc32", peak: float = 0.7, **params) -> WaveformHeader:
+    """
+    Normalize and write time domain symbols to a binary waveform file.
+
+    Parameters:
+    - path: Output file
+    - tsymbols: Time domain symbols
+    - fmt: Sample format                                [fc32, sc16]
+    - peak: Largest I/Q component after normalization   ]0, 1]
+    - params: Frame parameters saved in the header (K, CP, M, N, Nt, Nf, preamble_mod, payload_mod, random_seed)
+
+    Returns:
+    - header: The header written in the file
+    """
+    if fmt not in WAVEFORM_FORMATS:
+        raise ValueError(f"Invalid waveform format: {fmt}")
+    tsymbols = np.asarray(tsymbols)
+    iq = np.empty((len(tsymbols), 2), dtype=get_sample_dtype(fmt))
+    scale = peak / max(np.max(np.abs(tsymbols.real)), np.max(np.abs(tsymbols.imag)), np.finfo(float).tiny)
+    if fmt == "fc32":
+        iq[:, 0] = tsymbols.real * scale
+        iq[:, 1] = tsymbols.imag * scale
+    else:
+        iq[:, 0] = np.rint(tsymbols.real * (scale * SC16_FULL_SCALE))
+        iq[:, 1] = np.rint(tsymbols.imag * (scale * SC16_FULL_SCALE))
+
+    header = WaveformHeader(
+        fmt=fmt, n_samples=len(tsymbols), scale=float(scale),
+        K=params.get("K", 0), CP=params.get("CP", 0), M=params.get("M", 0), N=params.get("N", 0),
+        Nt=params.get("Nt", 0), Nf=params.get("Nf", 0),
+        preamble_mod=params.get("preamble_mod", ""), payload_mod=params.get("payload_mod", ""),
+        random_seed=int(params.get("random_seed", 0)),
+        digest=hashlib.sha256(iq.data).digest())
+    with open(path, "wb") as file:
+        file.write(header.pack())
+        iq.tofile(file)
+    return header
+
+
+def read_waveform(path: str, verify: bool = True) -> tuple[WaveformHeader, np.ndarray]:
+    """
+    Read a binary waveform file.
+
+    Parameters:
+    - path: Waveform file
+    - verify: Check the SHA-256 digest of the samples
+
+    Returns:
+    - header: The header of the file
+    - samples: The normalized samples, as sent by `tx_waveforms_radar` before its `--ampl` gain (complex64)
+    """
+    with open(path, "rb") as file:
+        header = WaveformHeader.unpack(file.read(WAVEFORM_HEADER_SIZE))
+        iq = np.fromfile(file, dtype=get_sample_dtype(header.fmt), count=2 * header.n_samples)
+    if iq.shape[0] != 2 * header.n_samples:
+        raise ValueError(f"Truncated waveform file: expected {header.n_samples} samples, got {iq.shape[0] // 2}")
+    if verify and hashlib.sha256(iq.data).digest() != header.digest:
+        raise ValueError("Corrupted waveform file: the digest of the samples does not match the header")
+
+    if header.fmt == "fc32":
+        return header, iq.view(np.complex64)
+    samples = sc16_to_complex64(iq.reshape(-1, 2))
+    samples /= SC16_FULL_SCALE
+    return header, samples
@@ -1,5 +1,9 @@
 import numpy as np
 
+import sys
+sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
+from rfnoc_ofdm.capture import read_samples
+
 class complexSignal:
     """
     Class to handle complex signals.
@@ -96,15 +100,10 @@ def clip_real_to_16_bits(signal: np.ndarray) -> np.ndarray:
 
 def read_sc16_file(filename: str) -> np.ndarray:
     """
-    Load a file containing sc16 format complex samples.
+    Load a file containing sc16 format complex samples (memory mapped and converted to complex64 by chunks,
+    see `capture.read_samples`).
     """
-    with open(filename, 'rb') as file:
-        data = np.fromfile(file, dtype=np.int16)
-    data = data.astype(np.complex64)
-    signal = data[0::2] + 1j * data[1::2]
-    signal.reshape(-1, 1)
-    signal = np.squeeze(signal)
-    return signal
+    return read_samples(filename, "sc16")
 
 
 def moving_sum(signal: np.ndarray, window_size: int) -> np.ndarray:
@@ -1,13 +1,14 @@
-import tqdm
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
 import sys
 sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
 from rfnoc_ofdm.ofdm_frame import ofdmFrame
+from rfnoc_ofdm.channel import ChannelSimulator
+from rfnoc_ofdm.experiments import run_experiment
 from rfnoc_ofdm.metric_calculator import metric_schmidl, metric_minn, metric_wilson, moving_sum
-from rfnoc_ofdm.detector import find_max_idx
+from rfnoc_ofdm.detector import find_max_idx, sweep_thresholds
+from rfnoc_ofdm.plotting import plot_roc
 
 from plotting import plot_cdfs, plot_schmidl_cox
 
@@ -83,33 +84,75 @@ def get_sync_idx_error(ofdm_frame: ofdmFrame, threshold: float = 0.5, plot: bool
     }
 
 
-#####################################################
-# CDF of Sync Index Error over multiple experiments #
-#####################################################
-n_exp = 2000
-metric_results = []
-metric_avg_results = []
-for _ in tqdm.tqdm(range(n_exp), desc="Simulating OFDM frames"):
-    ofdm_frame = ofdmFrame(K=64, CP=16, M=4, N=4, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1)
-    ofdm_frame.add_paths([1, 0.25], [0, 2], 10)
-    
-    # Get the sync index error
-    sync_idx, sync_idx_avg = get_sync_idx_error(ofdm_frame, threshold=0.5)
-    metric_results.append(sync_idx)
-    metric_avg_results.append(sync_idx_avg)
-df_results = pd.DataFrame(metric_results)
-df_avg_results = pd.DataFrame(metric_avg_results)  
+def apply_channel(ofdm_frames: list[ofdmFrame], gains, delays, snr: float, seed=None) -> None:
+    """
+    Received signal of frames (as one batch): multipath channel, then AWGN at the SNR of each payload.
+    """
+    channel = ChannelSimulator(gains, delays, seed=seed)
+    tsymbols_rx = channel.apply(np.stack([ofdm_frame.tsymbols for ofdm_frame in ofdm_frames]), snr_db=snr,
+                                signal_power=[ofdm_frame.get_payload_power() for ofdm_frame in ofdm_frames])
+    for ofdm_frame, tsymbols in zip(ofdm_frames, tsymbols_rx):
+        ofdm_frame.tsymbols_rx = tsymbols
 
-# Plot both dataframes
-plot_cdfs(df_results, ofdm_frame, False, title="CDF of Sync Index Error on metrics")
-plt.savefig("sync_index_error_metrics.pdf")
-plot_cdfs(df_avg_results, ofdm_frame, True, title="CDF of Sync Index Error on averaged metrics averaged")
-plt.savefig("sync_index_error_metrics_avg.pdf")
+
+def sync_trial(params: dict, generators: list[np.random.Generator]) -> list[dict]:
+    """
+    Trials of the study (a chunk at once): new frames through the multipath channel as one batch, sync
+    index errors of each metric. The noise of each frame is drawn from the generator of its trial.
+    """
+    ofdm_frames = [ofdmFrame(K=64, CP=16, M=4, N=4, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1,
+                             random_seed=int(generator.integers(2**32))) for generator in generators]
+    apply_channel(ofdm_frames, params["Gains"], params["Delays"], params["SNR"], seed=generators)
+    results = []
+    for ofdm_frame in ofdm_frames:
+        sync_idx, sync_idx_avg = get_sync_idx_error(ofdm_frame, threshold=0.5)
+        results.append({**sync_idx, **sync_idx_avg})
+    return results
 
 
-##############################################
-# Plot the different metrics on a same frame #
-##############################################
-ofdm_frame = ofdmFrame(K=64, CP=16, M=4, N=4, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1)
-ofdm_frame.add_paths([1, 0.25], [0, 2], 10)
-_, _ = get_sync_idx_error(ofdm_frame, threshold=0.5, plot=True)
+if __name__ == "__main__":
+    #####################################################
+    # CDF of Sync Index Error over multiple experiments #
+    #####################################################
+    n_exp = 2000
+    grid = {"Gains": [(1, 0.25)], "Delays": [(0, 2)], "SNR": 10}
+    results = run_experiment(sync_trial, grid, n_trials=n_exp, seed=0, output="sync_index_error_results.csv",
+                             vectorized=True, desc="Simulating OFDM frames")
+    df_results = results[["Schmidl \& Cox", "Minn", "Wilson"]]
+    df_avg_results = results[["Schmidl \& Cox averaged", "Minn averaged", "Wilson averaged"]]
+    
+    # Plot both dataframes
+    ofdm_frame = ofdmFrame(K=64, CP=16, M=4, N=4, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1, random_seed=0)
+    plot_cdfs(df_results, ofdm_frame, False, title="CDF of Sync Index Error on metrics")
+    plt.savefig("sync_index_error_metrics.pdf")
+    plot_cdfs(df_avg_results, ofdm_frame, True, title="CDF of Sync Index Error on averaged metrics averaged")
+    plt.savefig("sync_index_error_metrics_avg.pdf")
+    
+    
+    ##############################################
+    # Plot the different metrics on a same frame #
+    ##############################################
+    ofdm_frame = ofdmFrame(K=64, CP=16, M=4, N=4, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1, random_seed=0)
+    apply_channel([ofdm_frame], [1, 0.25], [0, 2], 10, seed=0)
+    _, _ = get_sync_idx_error(ofdm_frame, threshold=0.5, plot=True)
+    
+    
+    ################################################
+    # ROC of the detector threshold on the metrics #
+    ################################################
+    n_roc = 200
+    thresholds = np.linspace(0, 1, 101)
+    metrics = {"Schmidl \& Cox": [], "Minn": [], "Wilson": []}
+    ofdm_frames = [ofdmFrame(K=64, CP=16, M=4, N=4, preamble_mod="BPSK", payload_mod="QPSK", Nt=3, Nf=1, random_seed=i)
+                   for i in range(n_roc)]
+    apply_channel(ofdm_frames, [1, 0.25], [0, 2], 10, seed=0)
+    for ofdm_frame in ofdm_frames:
+        for name, metric in zip(metrics, (metric_schmidl, metric_minn, metric_wilson)):
+            _, _, M = metric(ofdm_frame)
+            metrics[name].append(M / np.max(M))
+    sweeps = {name: sweep_thresholds(values, thresholds, ofdm_frame.preamble_tlen, tolerance=ofdm_frame.CP * ofdm_frame.M)
+              for name, values in metrics.items()}
+    for name, sweep in sweeps.items():
+        print(f"{name}: recommended threshold {sweep.recommend():.2f}")
+    plot_roc(sweeps, view_title=False)
+    plt.savefig("roc_metrics.pdf")
@@ -0,0 +1,57 @@
+import os
+from timeit import default_timer as timer
+import pandas as pd
+import numpy as np
+
+import sys
+sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
+from rfnoc_ofdm.capture import read_samples
+from rfnoc_ofdm.compressed import compress_capture
+
+folder = "../../data/long_raw.signal"
+results = []
+nb_experiments = 5
+frame_len = 2 * 257 * (1024 + 128) * 4  # Samples read for one frame (--nsamps of the captures)
+configurations = [("zlib", 1), ("zlib", 6), ("lzma", 1)]
+
+
+# Benchmark of the compressed captures against the raw .dat files: size on disk, compression time,
+# throughput of a full read and of a random frame read
+rng = np.random.default_rng(0)
+for filename in os.listdir(folder):
+    if not filename.endswith(".sc16.dat"):
+        continue
+    file_path = os.path.join(folder, filename)
+    raw_size = os.path.getsize(file_path)
+    n_samples = raw_size // 4
+
+    for codec, level in [("raw", None)] + configurations:
+        path = file_path
+        compress_time = 0
+        if codec != "raw":
+            path = file_path + f".{codec}{level}.cz"
+            start = timer()
+            compress_capture(file_path, path, fmt="sc16", codec=codec, level=level)
+            compress_time = timer() - start
+
+        for _ in range(nb_experiments):
+            start = timer()
+            samples = read_samples(path, "sc16")
+            full_read = timer() - start
+
+            offset = int(rng.integers(0, max(1, n_samples - frame_len)))
+            start = timer()
+            read_samples(path, "sc16", offset, min(frame_len, n_samples - offset))
+            frame_read = timer() - start
+
+            results.append((filename, codec if level is None else f"{codec}-{level}", os.path.getsize(path) / raw_size,
+                            compress_time, n_samples / full_read / 1e6, frame_read * 1000))
+
+        if codec != "raw":
+            os.remove(path)
+
+
+# Save results to CSV
+df = pd.DataFrame(results, columns=['Filename', 'Codec', 'Size ratio', 'Compression (s)', 'Full read (MS/s)', 'Frame read (ms)'])
+df.to_csv("compressed_capture_results.csv", index=False)
+print(df.groupby('Codec')[['Size ratio', 'Compression (s)', 'Full read (MS/s)', 'Frame read (ms)']].mean())
@@ -0,0 +1,59 @@
+import copy
+import os
+import tracemalloc
+from timeit import default_timer as timer
+import pandas as pd
+
+import sys
+sys.path.append('/usr/local/lib/python3.10/site-packages')  # Make sure python find the rfnoc_ofdm package
+from rfnoc_ofdm.ofdm_frame import ofdmFrame
+from rfnoc_ofdm.pipeline import ReceiverPipeline
+
+folder = "../../data/long_raw.signal"
+results = []
+nb_experiments = 5
+
+
+# Benchmark of the receiver chain (correlation synchronization -> demodulation -> channel estimation ->
+# equalization -> BER -> range-Doppler map) on each capture: ofdmFrame methods vs ReceiverPipeline
+reference = ofdmFrame(K=1024, CP=128, M=4, N=256, preamble_mod="BPSK", payload_mod="QPSK", Nt=4, Nf=1, random_seed=42)
+pipeline = ReceiverPipeline(reference, sync="correlation", delay_doppler=True)
+
+
+def frame_chain(path: str) -> float:
+    ofdm_frame = copy.copy(reference)
+    ofdm_frame.load_tysmbol_bin(path)
+    sync_idx = ofdm_frame.get_frame_synchronization_idx() + ofdm_frame.preamble_tlen - (ofdm_frame.CP // 2 * ofdm_frame.M)
+    ofdm_frame.tsymbols_rx = ofdm_frame.tsymbols_rx[sync_idx:]
+    ofdm_frame.demodulate_frame()
+    ofdm_frame.estimate_channel()
+    ofdm_frame.equalize()
+    ber = ofdm_frame.compute_ber()
+    ofdm_frame.delay_doppler()
+    return ber
+
+
+def pipeline_chain(path: str) -> float:
+    return pipeline.process(path).ber
+
+
+for filename in sorted(os.listdir(folder)):
+    if not filename.endswith(".fc32.dat"):
+        continue
+    path = os.path.join(folder, filename)
+
+    for name, chain in [("ofdmFrame", frame_chain), ("ReceiverPipeline", pipeline_chain)]:
+        for _ in range(nb_experiments):
+            tracemalloc.start()
+            start = timer()
+            ber = chain(path)
+            elapsed = timer() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append((filename, name, ber, elapsed * 1000, peak / 2**20))
+
+
+# Save results to CSV
+df = pd.DataFrame(results, columns=['Filename', 'Chain', 'BER', 'Time (ms)', 'Peak allocation (MiB)'])
+df.to_csv("receiver_pipeline_results.csv", index=False)
+print(df.groupby('Chain')[['BER', 'Time (ms)', 'Peak allocation (MiB)']].mean())
@@ -1,6 +1,3 @@
-import os
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 
 import sys
@@ -9,6 +6,8 @@ from rfnoc_ofdm.ofdm_frame import ofdmFrame
 from rfnoc_ofdm.plotting import colors, long
 from rfnoc_ofdm.metric_calculator import metric_schmidl, moving_sum
 from rfnoc_ofdm.detector import find_max_idx
+from rfnoc_ofdm.catalog import build_catalog
+from rfnoc_ofdm.dataset import CaptureDataset
 
 folder = "../../data/long_schmidl_cox.signal_detected_idx"
 
@@ -23,34 +22,24 @@ Nf = 1
 random_seed = 42
 threshold = 300
 
-def get_last_sample_as_uint32(filename: str) -> tuple:
+def get_start_forwarding_idx(detected_point: int) -> int:
     """
-    Get the last sample of the received signal as uint32 (sc16 format => 2x uint16).
+    Get the start forwarding index from the point detected by the FPGA (the last sample of the received
+    signal as uint32, read by the catalog from the trailer of the file).
     """
-    with open(filename, "rb") as file:
-        data = np.fromfile(file, dtype=np.uint16)
-        detected_point = data[-2] * 2**16 + data[-1]
-        start_forwaring = detected_point + (K // 2) * M - (CP // 2) * M  # Add the detector counter delay
-    return detected_point, start_forwaring
+    return detected_point + (K // 2) * M - (CP // 2) * M  # Add the detector counter delay
 
-errors = []
-for filename in os.listdir(folder):
-    if not filename.endswith(".dat"):
-        continue
-    
+def detection_error(ofdm_frame, capture):
+    filename = capture["Filename"]
     print(f"Processing {filename}...")
     
-    # Create the frame pilots and load received data
-    ofdm_frame = ofdmFrame(K=K, CP=CP, M=M, N=N, preamble_mod=preamble_mod, payload_mod=payload_mod, Nt=Nt, Nf=Nf, random_seed=random_seed)
-    ofdm_frame.load_tysmbol_bin(folder + "/" + filename, type="sc16")
-    
     # Get the detected point from the file
-    detected_point, start_forwaring = get_last_sample_as_uint32(folder + "/" + filename)
+    start_forwaring = get_start_forwarding_idx(int(capture["Detected point"]))
     
     # Check that we have enough samples before detected point to perform post-processing synchronization
     if start_forwaring < ofdm_frame.preamble_tlen:
         print(f"Not enough samples before detected point in {filename}.")
-        continue
+        return {"Index Error": None}
     
     # Synchronization
     _, _, M_schmidl = metric_schmidl(ofdm_frame)
@@ -75,10 +64,18 @@ for filename in os.listdir(folder):
     
     # Compute the index error
     index_error = sync_idx - start_forwaring
-    errors.append((filename, index_error))
+    return {"Index Error": index_error}
+
+    
+if __name__ == "__main__":
+    # The reference frame is sent once to each worker, the measurements are processed in parallel
+    ofdm_frame = ofdmFrame(K=K, CP=CP, M=M, N=N, preamble_mod=preamble_mod, payload_mod=payload_mod, Nt=Nt, Nf=Nf, random_seed=random_seed)
+    catalog = build_catalog(folder, recursive=False)
+    dataset = CaptureDataset(folder, ofdm_frame, fmt="sc16", catalog=catalog[catalog["Detected point"].notna()])
+    df = dataset.map(detection_error).dropna(subset=["Index Error"]).astype({"Index Error": int})
     
-# Save the results to a CSV file
-df = pd.DataFrame(errors, columns=['Filename', 'Index Error'])
-df.reset_index(inplace=True)
-df.to_csv(folder + "/sync_idx_errors_results.csv", index=False)
-df.to_csv("sync_idx_errors_results.csv", index=False)
+    # Save the results to a CSV file
+    df = df[["Filename", "Index Error"]].reset_index(drop=True)
+    df.reset_index(inplace=True)
+    df.to_csv(folder + "/sync_idx_errors_results.csv", index=False)
+    df.to_csv("sync_idx_errors_results.csv", index=False)